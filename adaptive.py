@@ -0,0 +1,83 @@
+"""
+Adaptive difficulty. Each student has an Elo-style rating per topic, and
+every difficulty label has a fixed rating; a first answer moves the
+student's rating toward the outcome in O(1). The next question is drawn
+from the index's difficulty bucket the student is expected to answer
+correctly about TARGET_SUCCESS of the time.
+"""
+import time
+from typing import NamedTuple
+
+# Elo parameters
+DEFAULT_RATING = 1500.0
+SCALE = 400.0
+# A new student (DEFAULT_RATING) is expected to get about 64% of Medium questions right, so starts there
+DIFFICULTY_RATINGS = {'Easy': 1200.0, 'Medium': 1400.0, 'Hard': 1600.0}
+# New ratings move fast and settle as answers accumulate
+K_MAX = 64.0
+K_MIN = 16.0
+SETTLE_ANSWERS = 5
+# Aim for questions a student gets right about 70% of the time
+TARGET_SUCCESS = 0.7
+# Random draws from a bucket before falling back to a scan of its unused rows
+DRAW_ATTEMPTS = 8
+
+
+class Ability(NamedTuple):
+    """One student's rating in one topic."""
+    rating: float = DEFAULT_RATING
+    answered: int = 0
+    updated_at: float = 0.0
+
+
+def difficulty_rating(difficulty):
+    """The fixed rating of a difficulty label; unknown or missing labels count as Medium."""
+    return DIFFICULTY_RATINGS.get(difficulty.strip() if isinstance(difficulty, str) else difficulty, DIFFICULTY_RATINGS['Medium'])
+
+
+def expected_score(rating, difficulty):
+    """Probability that a student with this rating answers a question of this difficulty correctly."""
+    return 1.0 / (1.0 + 10.0 ** ((difficulty_rating(difficulty) - rating) / SCALE))
+
+
+def update_ability(ability, difficulty, correct, now=None):
+    """Applies one answer to a question of the given difficulty and returns the updated Ability."""
+    k = K_MIN + (K_MAX - K_MIN) * SETTLE_ANSWERS / (SETTLE_ANSWERS + ability.answered)
+    rating = ability.rating + k * (float(correct) - expected_score(ability.rating, difficulty))
+    return Ability(rating, ability.answered + 1, time.time() if now is None else now)
+
+
+def difficulty_order(ability, difficulties):
+    """Orders difficulty labels from the best match for the student's rating to the worst."""
+    return sorted(difficulties, key=lambda difficulty: (abs(expected_score(ability.rating, difficulty) - TARGET_SUCCESS), difficulty))
+
+
+def _draw(row_ids, rng, exclude):
+    # Rejection sampling is O(1) while most of the bucket is unused; scan only when it is nearly spent
+    for _ in range(DRAW_ATTEMPTS):
+        row_id = int(row_ids[rng.randrange(len(row_ids))])
+        if row_id not in exclude:
+            return row_id
+    remaining = [int(row_id) for row_id in row_ids if int(row_id) not in exclude]
+    return rng.choice(remaining) if remaining else None
+
+
+def pick_question(index, event_name, topics, abilities, rng, exclude=()):
+    """
+    Picks the next question for an adaptive drill: a random topic, then the
+    difficulty bucket (index['rows'][event][topic][difficulty]) closest to
+    the student's ability in that topic, skipping rows in `exclude` (a set).
+    `abilities` maps (event, topic) to Ability. Returns a row ID, or None
+    once every question in the topics has been used.
+    """
+    by_topic = index['rows'].get(event_name, {})
+    topics = [topic for topic in topics if topic in by_topic]
+    rng.shuffle(topics)
+    for topic in topics:
+        buckets = by_topic[topic]
+        ability = abilities.get((event_name, topic), Ability())
+        for difficulty in difficulty_order(ability, [difficulty for difficulty, row_ids in buckets.items() if len(row_ids)]):
+            row_id = _draw(buckets[difficulty], rng, exclude)
+            if row_id is not None:
+                return row_id
+    return None
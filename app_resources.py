@@ -0,0 +1,100 @@
+"""
+Process-wide resources of the Streamlit app: the question bank and its
+reloader, derived per-version structures, the image store, the progress
+store and the metrics endpoint.
+
+They live in their own module because Streamlit re-executes code.py on
+every rerun, and re-applying @st.cache_resource there means hashing each
+function's source again every time. Imported once, the decorators run
+once per process.
+"""
+import os
+
+import streamlit as st
+
+import profiling
+from asset_store import AssetStore
+from bank_reloader import BankReloader
+from grading import compile_answer_rules
+from practice_pack import render_pack
+from progress_store import ProgressStore
+from question_bank import QuestionBank, load_bank
+from search_index import SearchIndex, question_documents
+
+# Data locations, overridable so deployments and benchmarks can point at other files
+QUESTIONS_PATH = os.environ.get("SCIOLY_QUESTIONS_PATH", "questions_full.csv")
+PROGRESS_DB_PATH = os.environ.get("SCIOLY_PROGRESS_DB", "progress.db")
+# Seconds between checks of the question CSV for updates; 0 turns hot reload off
+RELOAD_INTERVAL_SECONDS = float(os.environ.get("SCIOLY_RELOAD_INTERVAL", "2"))
+# Question images: the content-addressed store and the byte budget of its in-memory cache
+ASSET_DIR = os.environ.get("SCIOLY_ASSET_DIR", "assets")
+ASSET_CACHE_BYTES = int(float(os.environ.get("SCIOLY_ASSET_CACHE_MB", "64")) * 1024 * 1024)
+# Seed for drill sampling, so a deployment (or a ?seed= link) reproduces the same drills; unset draws fresh ones
+SAMPLER_SEED = os.environ.get("SCIOLY_SAMPLER_SEED") or None
+# Worker processes for a coach's exam batch; the app shares its server with every student, so it builds in-process by default
+EXAM_PROCESSES = max(1, int(os.environ.get("SCIOLY_EXAM_PROCESSES", "1")))
+
+
+def load_question_bank(path):
+    """
+    Loads the question data into a columnar QuestionBank, memory-mapping the
+    compiled .qbank file when it exists and falling back to parsing the CSV.
+    The bank is read-only and shared by every session in the process, so
+    session state only ever holds integer row IDs into it.
+    """
+    try:
+        with profiling.span("load_questions"):
+            return load_bank(path)
+    except FileNotFoundError:
+        st.error(f"Error: The file '{path}' was not found. Please ensure it is in your GitHub repository's root folder.")
+    except ValueError as e:
+        st.error(f"Error: {e}")
+    except Exception as e:
+        st.error(f"An unexpected error occurred while loading the data: {e}")
+    return QuestionBank.empty()
+
+
+@st.cache_resource
+def get_bank_reloader(path):
+    """Loads the bank once per process and starts watching its CSV for updates."""
+    return BankReloader(path, load_question_bank(path), interval=RELOAD_INTERVAL_SECONDS).start()
+
+
+# Derived structures are cached per bank version; the previous one is kept for drills still using it
+@st.cache_resource(max_entries=2)
+def load_search_index(path, version, _bank):
+    """Builds the keyword index over question, hint and explanation once per bank version, on first search."""
+    with profiling.span("build_search_index"):
+        return SearchIndex(question_documents(_bank))
+
+
+@st.cache_resource(max_entries=2)
+def load_answer_rules(path, version, _bank):
+    """Compiles the tolerant grading rules for every short-answer question once per bank version."""
+    with profiling.span("compile_answer_rules"):
+        return compile_answer_rules(_bank)
+
+
+@st.cache_resource(max_entries=16)
+def load_practice_pack(path, version, _bank, event_name, topics, minutes, drill_size):
+    """Renders an offline practice pack once per bank version and selection, shared by every student who asks for it."""
+    with profiling.span("render_practice_pack"):
+        return render_pack(_bank, event_name, list(topics), minutes, drill_size)
+
+
+@st.cache_resource
+def get_asset_store(root):
+    """Opens the question image store once per process; its byte cache is shared by every session."""
+    return AssetStore(root, os.path.dirname(os.path.abspath(QUESTIONS_PATH)), cache_bytes=ASSET_CACHE_BYTES)
+
+
+@st.cache_resource
+def get_progress_store(path):
+    """Opens the SQLite attempt log shared by every session in the process."""
+    return ProgressStore(path)
+
+
+@st.cache_resource
+def start_metrics_endpoint(port):
+    """Starts the Prometheus-style /metrics endpoint once per process."""
+    return profiling.start_metrics_server(port)
@@ -0,0 +1,289 @@
+"""
+Question images. Files live in a content-addressed store (objects named by
+their SHA-256) with display-sized thumbnails generated once and kept next
+to them; bytes are served through a process-wide LRU cache bounded in
+bytes, so sessions only ever hold references.
+
+The bank's optional `image` column holds either a reference to a stored
+object ('sha256:<hex>') or a file path relative to the question CSV, which
+is added to the store the first time it is shown. Paths leading outside the
+CSV's folder are refused.
+
+    python asset_store.py add images/*.png     # store files, print their references
+    python asset_store.py thumbs questions_full.csv     # pre-build every thumbnail
+"""
+import argparse
+import hashlib
+import io
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DIGEST_PREFIX = "sha256:"
+DIGEST_PATTERN = re.compile(r"^(?:sha256:)?([0-9a-f]{64})$")
+# Thumbnails fit in a THUMBNAIL_SIZE square, about the width of the centered layout
+THUMBNAIL_SIZE = 720
+JPEG_QUALITY = 85
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+# Background threads warming the cache for the next question
+PREFETCH_WORKERS = 2
+
+
+def file_digest(path):
+    """SHA-256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_digest(ref):
+    """The hex digest of an object reference, or None if ref is a file path."""
+    match = DIGEST_PATTERN.match(str(ref).strip().lower())
+    return match.group(1) if match else None
+
+
+def contained_path(base_dir, ref):
+    """
+    The real path a relative file reference names under base_dir, or None if
+    it leads outside base_dir (an absolute path, '..' or a symlink out).
+    """
+    base = os.path.realpath(base_dir)
+    path = os.path.realpath(os.path.join(base, ref))
+    return path if os.path.commonpath([base, path]) == base else None
+
+
+class ByteLRU:
+    """Thread-safe least-recently-used cache of bytes values, bounded by their total size."""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Caches value, evicting the least recently used entries to stay within max_bytes. Oversized values are not kept."""
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._items[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class AssetStore:
+    """
+    Content-addressed image store under `root` (objects/ and thumbs/, fanned
+    out by the first two hex digits). Path references are resolved against
+    `source_dir`. Reads go through one ByteLRU shared by all sessions.
+    """
+
+    def __init__(self, root, source_dir='.', cache_bytes=DEFAULT_CACHE_BYTES, thumbnail_size=THUMBNAIL_SIZE):
+        self.root = root
+        self.source_dir = source_dir
+        self.thumbnail_size = thumbnail_size
+        self.cache = ByteLRU(cache_bytes)
+        # (path, size, mtime) -> digest, so a path is hashed once until the file changes
+        self._paths = {}
+        # Missing paths and unreadable objects, so each is reported once rather than on every rerun
+        self._missing = set()
+        self._unreadable = set()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+
+    def _thumbnail_path(self, digest):
+        return os.path.join(self.root, 'thumbs', digest[:2], f"{digest}-{self.thumbnail_size}")
+
+    def _write(self, path, write):
+        # Written under a temporary name and renamed, so readers never see a partial file
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                write(f)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def add(self, path):
+        """Copies a file into the store (once per content) and returns its reference."""
+        digest = file_digest(path)
+        if not os.path.exists(self._object_path(digest)):
+            with open(path, 'rb') as source:
+                self._write(self._object_path(digest), lambda f: shutil.copyfileobj(source, f))
+        return DIGEST_PREFIX + digest
+
+    def resolve(self, ref):
+        """
+        The digest a reference points to, adding a referenced file to the
+        store on first use. Returns None for empty references and for
+        missing objects or files.
+        """
+        if not isinstance(ref, str) or not ref.strip():
+            return None
+        digest = parse_digest(ref)
+        if digest is not None:
+            return digest if os.path.exists(self._object_path(digest)) else None
+
+        path = contained_path(self.source_dir, ref.strip())
+        if path is None:
+            if ref not in self._missing:
+                self._missing.add(ref)
+                logger.warning("Question image %s is outside %s; ignoring it", ref, self.source_dir)
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            if path not in self._missing:
+                self._missing.add(path)
+                logger.warning("Question image %s not found", path)
+            return None
+        signature = (path, stat.st_size, stat.st_mtime_ns)
+        digest = self._paths.get(signature)
+        if digest is None:
+            digest = parse_digest(self.add(path))
+            with self._lock:
+                self._paths[signature] = digest
+        return digest
+
+    def _read(self, key, path, build=None):
+        data = self.cache.get(key)
+        if data is not None:
+            return data
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            if build is None:
+                return None
+            data = build()
+            if data is None:
+                return None
+            self._write(path, lambda f: f.write(data))
+        self.cache.put(key, data)
+        return data
+
+    def image(self, ref):
+        """The full-size bytes of a referenced image, or None."""
+        digest = self.resolve(ref)
+        return self._read(('image', digest), self._object_path(digest)) if digest else None
+
+    def thumbnail(self, ref):
+        """
+        The bytes of a referenced image scaled to fit THUMBNAIL_SIZE (PNG for
+        images with transparency or a palette, JPEG otherwise), built and saved
+        on first use. Images already small enough are served as they are.
+        Returns None for missing or unreadable images.
+        """
+        digest = self.resolve(ref)
+        if digest is None or digest in self._unreadable:
+            return None
+        return self._read(('thumbnail', digest), self._thumbnail_path(digest), lambda: self._make_thumbnail(digest))
+
+    def _make_thumbnail(self, digest):
+        from PIL import Image, ImageOps
+
+        try:
+            with Image.open(self._object_path(digest)) as image:
+                if max(image.size) <= self.thumbnail_size:
+                    with open(self._object_path(digest), 'rb') as f:
+                        return f.read()
+                image = ImageOps.exif_transpose(image)
+                image.thumbnail((self.thumbnail_size, self.thumbnail_size))
+                buffer = io.BytesIO()
+                if image.mode in ('RGBA', 'LA', 'P') or 'transparency' in image.info:
+                    image.save(buffer, format='PNG', optimize=True)
+                else:
+                    image.convert('RGB').save(buffer, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+                return buffer.getvalue()
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            logger.warning("Could not make a thumbnail of %s: %s", digest, e)
+            self._unreadable.add(digest)
+            return None
+
+    def prefetch(self, ref):
+        """Loads a thumbnail into the cache on a background thread; returns at once."""
+        if not isinstance(ref, str) or not ref.strip():
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(PREFETCH_WORKERS, thread_name_prefix="asset-prefetch")
+        self._executor.submit(self._prefetch, ref)
+
+    def _prefetch(self, ref):
+        try:
+            self.thumbnail(ref)
+        except OSError:
+            logger.exception("Prefetching question image %s failed", ref)
+
+    def stats(self):
+        """Cache occupancy and hit counts, for the profiling panel."""
+        cache = self.cache
+        return {'entries': len(cache), 'bytes': cache.size, 'max_bytes': cache.max_bytes, 'hits': cache.hits, 'misses': cache.misses}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the content-addressed store of question images.")
+    parser.add_argument('--root', default=os.environ.get("SCIOLY_ASSET_DIR", "assets"), help="Store directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help="Add image files and print their references")
+    add.add_argument('files', nargs='+')
+    thumbs = commands.add_parser('thumbs', help="Build the thumbnail of every image a question bank refers to")
+    thumbs.add_argument('csv_path', nargs='?', default=os.environ.get("SCIOLY_QUESTIONS_PATH", "questions_full.csv"))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if args.command == 'add':
+        store = AssetStore(args.root)
+        for path in args.files:
+            print(f"{store.add(path)}  {path}")
+        return
+
+    from question_bank import load_bank
+
+    bank = load_bank(args.csv_path)
+    store = AssetStore(args.root, os.path.dirname(os.path.abspath(args.csv_path)), cache_bytes=0)
+    images = bank.columns.get('image')
+    refs = sorted({images[row] for row in range(len(images)) if isinstance(images[row], str) and images[row].strip()}) if images is not None else []
+    missing = sum(1 for ref in refs if store.thumbnail(ref) is None)
+    logger.info("Built thumbnails for %d image(s); %d missing or unreadable", len(refs) - missing, missing)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Hot reload of the question bank. A BankReloader polls the question CSV from
+a daemon thread; once a change has settled, the new bank is loaded in the
+background, diffed against the current one by question key, and swapped in
+with a single reference assignment. Sessions hold on to the BankVersion
+their drill started with, so only new drills see the new questions.
+"""
+import logging
+import os
+import threading
+import time
+from typing import NamedTuple
+
+from question_bank import load_bank
+
+logger = logging.getLogger(__name__)
+
+# Fields compared to tell an edited question from an unchanged one
+DIFF_COLUMNS = ['answer', 'difficulty', 'hint', 'explanation']
+
+
+class BankVersion(NamedTuple):
+    """One immutable generation of the question bank."""
+    version: int
+    bank: object
+    loaded_at: float
+    diff: dict
+
+
+def source_signature(path):
+    """(size, mtime) of a file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _same(old_value, new_value):
+    # Nulls come back as None or NaN depending on the storage format
+    if not isinstance(old_value, str) and not isinstance(new_value, str):
+        return True
+    return old_value == new_value
+
+
+def diff_banks(old_bank, new_bank):
+    """Counts the questions added, removed, edited and unchanged between two banks, matched by question key."""
+    old_rows = dict(zip(old_bank.keys.tolist(), range(len(old_bank))))
+    added = edited = unchanged = 0
+    for new_row, key in enumerate(new_bank.keys.tolist()):
+        old_row = old_rows.pop(key, None)
+        if old_row is None:
+            added += 1
+        elif all(_same(old_bank.columns[column][old_row], new_bank.columns[column][new_row]) for column in DIFF_COLUMNS):
+            unchanged += 1
+        else:
+            edited += 1
+    return {'added': added, 'removed': len(old_rows), 'edited': edited, 'unchanged': unchanged}
+
+
+class BankReloader:
+    """
+    Owns the newest BankVersion for one question CSV and replaces it when
+    the file changes. `current` is only ever reassigned, never mutated, so
+    readers need no lock.
+    """
+
+    def __init__(self, path, bank, interval=2.0, loader=load_bank):
+        self.path = path
+        self.interval = interval
+        self.loader = loader
+        self.current = BankVersion(1, bank, time.time(), {})
+        self._signature = source_signature(path)
+        self._pending = self._signature
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts the watcher thread (a no-op when the interval is 0)."""
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="bank-reloader", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Question bank reload check failed")
+
+    def check(self):
+        """
+        Reloads the bank if the CSV changed and has stopped changing since the
+        previous check. Returns the new BankVersion, or None if nothing was
+        swapped in.
+        """
+        with self._lock:
+            signature = source_signature(self.path)
+            if signature is None or signature == self._signature:
+                return None
+            if signature != self._pending:
+                # Still being written; wait for it to settle
+                self._pending = signature
+                return None
+
+            self._signature = signature
+            started = time.perf_counter()
+            try:
+                bank = self.loader(self.path)
+            except Exception:
+                logger.exception("Could not reload %s, keeping version %d", self.path, self.current.version)
+                return None
+
+            old = self.current
+            diff = diff_banks(old.bank, bank)
+            self.current = BankVersion(old.version + 1, bank, time.time(), diff)
+            logger.info("Reloaded %s as version %d in %.1f ms (%s)", self.path, self.current.version,
+                        (time.perf_counter() - started) * 1000, ", ".join(f"{name}={count}" for name, count in diff.items()))
+            return self.current
@@ -0,0 +1,231 @@
+"""
+Headless load test for the drill flow.
+
+Simulates students walking the whole app (pick an event, start a drill,
+answer / use hints / reveal answers, move on, reach the summary) through
+Streamlit's AppTest driver, against synthetic question banks of any size,
+and reports rerun latency percentiles, throughput, memory per session and
+the size of each session's serialized drill state.
+
+    python bench_drill.py --rows 1000 100000 1000000 --students 20 --processes 2
+
+Each worker process stands in for one Streamlit server process: its
+students share one question bank and their reruns are interleaved
+round-robin, as they would be on a single server.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import tempfile
+import time
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+from question_bank import compile_bank, load_bank
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "code.py")
+MODES = ["Study Mode", "Timed Drill", "Spaced Review", "Adaptive"]
+
+
+def make_synthetic_bank(rows, path, events=6, topics_per_event=8, seed=0):
+    """Writes a question CSV with the same columns as questions_full.csv."""
+    rng = np.random.default_rng(seed)
+    ids = pd.Series(np.arange(rows)).astype(str)
+    event_codes = rng.integers(0, events, rows)
+    topic_codes = rng.integers(0, topics_per_event, rows)
+    answers = rng.integers(1, 5, rows)
+
+    df = pd.DataFrame({
+        'event': "Event " + pd.Series(event_codes).astype(str),
+        'topic': "Topic " + pd.Series(event_codes).astype(str) + "." + pd.Series(topic_codes).astype(str),
+        'question': "Synthetic question " + ids + "?",
+    })
+    for option in range(1, 5):
+        df[f'options__00{option}'] = f"Option {option} for " + ids
+    df['answer'] = "Option " + pd.Series(answers).astype(str) + " for " + ids
+    df['subtopic'] = ""
+    df['difficulty'] = np.array(['Easy', 'Medium', 'Hard'])[rng.integers(0, 3, rows)]
+    df['hint'] = "Hint for question " + ids
+    df['explanation'] = "Explanation for question " + ids
+    df.to_csv(path, index=False)
+    return path
+
+
+def current_rss_bytes():
+    """Resident set size of this process (falls back to the peak on non-Linux systems)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class SimulatedStudent:
+    """One browser session, advanced one rerun at a time by `step()`."""
+
+    def __init__(self, student_no, seed, with_student_id):
+        self.app = AppTest.from_file(APP_PATH, default_timeout=120)
+        self.rng = random.Random(seed)
+        self.student_id = f"bench-{student_no}" if with_student_id else ""
+        self.mode = self.rng.choice(MODES)
+        self.stage = 'start'
+        self.done = False
+
+    def _buttons(self, *labels):
+        return [button for button in self.app.button if button.label in labels]
+
+    def _answer(self):
+        if self.app.radio:
+            choice = self.app.radio[-1]
+            return choice.set_value(self.rng.choice(choice.options))
+        return self.app.text_input[-1].input("benchmark answer")
+
+    def step(self):
+        """Performs the student's next action and returns the rerun latency in seconds."""
+        app = self.app
+        if self.stage == 'start':
+            action, self.stage = app, 'login'
+        elif self.stage == 'login' and self.student_id:
+            action, self.stage = app.text_input[0].input(self.student_id), 'home'
+        elif self.stage in ('login', 'home'):
+            action, self.stage = self.rng.choice(self._buttons(*[b.label for b in app.button if b.label.startswith("Start ") and b.label.endswith(" Drill")])).click(), 'mode'
+        elif self.stage == 'mode':
+            action, self.stage = app.radio[0].set_value(self.mode), 'begin'
+        elif self.stage == 'begin':
+            action, self.stage = self._buttons("Start Drill")[0].click(), 'question'
+        elif self._buttons("View Summary", "Next Question"):
+            action = self._buttons("View Summary", "Next Question")[0].click()
+        elif self._buttons("Show Hint", "Reveal Answer"):
+            action = self.rng.choice(self._buttons("Show Hint", "Reveal Answer")).click()
+        elif self._buttons("Check Answer"):
+            check = self._buttons("Check Answer")[0]
+            # Picking an answer is its own rerun; it enables the Check Answer button
+            action = self._answer() if check.disabled else check.click()
+        else:
+            # Summary screen (or an empty drill): the walk is over
+            self.done = True
+            return None
+
+        started = time.perf_counter()
+        action.run()
+        elapsed = time.perf_counter() - started
+        if app.exception:
+            raise RuntimeError(f"App raised during the {self.stage} stage: {app.exception[0].value}")
+        return elapsed
+
+
+def run_worker(args):
+    """Runs a group of students interleaved in one process and returns their measurements."""
+    questions_path, progress_path, first_student, student_count, seed, with_student_id = args
+    os.environ["SCIOLY_QUESTIONS_PATH"] = questions_path
+    os.environ["SCIOLY_PROGRESS_DB"] = progress_path
+
+    # Load the bank once up front so it is not counted as per-session memory
+    load_started = time.perf_counter()
+    bank = load_bank(questions_path)
+    load_ms = (time.perf_counter() - load_started) * 1000
+    del bank
+
+    warmup = SimulatedStudent(-1, seed, False)
+    warmup.step()
+    baseline_rss = current_rss_bytes()
+
+    students = [SimulatedStudent(n, seed + n, with_student_id) for n in range(first_student, first_student + student_count)]
+    latencies = []
+    started = time.perf_counter()
+    while not all(student.done for student in students):
+        for student in students:
+            if not student.done:
+                elapsed = student.step()
+                if elapsed is not None:
+                    latencies.append(elapsed)
+    wall = time.perf_counter() - started
+    state_bytes = [len(json.dumps(student.app.session_state['drill'].to_dict())) for student in students]
+    return {
+        'latencies': latencies,
+        'state_bytes': state_bytes,
+        'wall_seconds': wall,
+        'session_bytes': max(current_rss_bytes() - baseline_rss, 0),
+        'students': student_count,
+        'load_ms': load_ms,
+    }
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def benchmark(rows, students, processes, seed, with_student_id, compiled, workdir):
+    """Runs one bank size and returns a summary dict."""
+    questions_path = os.path.join(workdir, f"bench_{rows}.csv")
+    if not os.path.exists(questions_path):
+        make_synthetic_bank(rows, questions_path, seed=seed)
+    if compiled:
+        compile_bank(questions_path)
+    progress_path = os.path.join(workdir, f"bench_{rows}.db")
+
+    processes = max(1, min(processes, students))
+    shares = [students // processes + (1 if i < students % processes else 0) for i in range(processes)]
+    jobs = []
+    first = 0
+    for share in shares:
+        jobs.append((questions_path, progress_path, first, share, seed, with_student_id))
+        first += share
+
+    with Pool(processes) as pool:
+        results = pool.map(run_worker, jobs)
+    wall = max(result['wall_seconds'] for result in results)
+
+    latencies = [latency for result in results for latency in result['latencies']]
+    return {
+        'rows': rows,
+        'students': students,
+        'processes': processes,
+        'load_ms': statistics.mean(result['load_ms'] for result in results),
+        'reruns': len(latencies),
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'throughput_rps': len(latencies) / wall if wall else 0.0,
+        'mb_per_session': sum(result['session_bytes'] for result in results) / students / 2**20,
+        'state_bytes': statistics.mean(size for result in results for size in result['state_bytes']),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless load test of the drill flow.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 100_000, 1_000_000], help="Synthetic bank sizes to test")
+    parser.add_argument('--students', type=int, default=10, help="Simulated students per bank")
+    parser.add_argument('--processes', type=int, default=1, help="Worker processes (one per simulated server process)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--student-ids', action='store_true', help="Log in each student so the progress store is exercised")
+    parser.add_argument('--compiled', action='store_true', help="Compile each bank to .qbank before the run")
+    parser.add_argument('--workdir', help="Where synthetic banks are written (default: a temporary directory)")
+    parser.add_argument('--json', help="Also write the results to this JSONL file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = args.workdir or tmp
+        header = f"{'rows':>9} {'load ms':>9} {'reruns':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'reruns/s':>9} {'MB/session':>10} {'state B':>8}"
+        print(header)
+        print('-' * len(header))
+        for rows in args.rows:
+            result = benchmark(rows, args.students, args.processes, args.seed, args.student_ids, args.compiled, workdir)
+            print(f"{result['rows']:>9} {result['load_ms']:>9.1f} {result['reruns']:>7} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+                  f"{result['p99_ms']:>8.1f} {result['throughput_rps']:>9.1f} {result['mb_per_session']:>10.2f} {result['state_bytes']:>8.0f}")
+            if args.json:
+                with open(args.json, 'a') as f:
+                    f.write(json.dumps(result) + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+import html
+
+import pandas as pd
+
+# Export formats: file extension, MIME type and button label
+FORMATS = {
+    'txt': ('txt', 'text/plain', "Download as Plain Text (.txt)"),
+    'md': ('md', 'text/markdown', "Download as Markdown (.md)"),
+    'topics': ('md', 'text/markdown', "Download Grouped by Topic (.md)"),
+    'html': ('html', 'text/html', "Download Printable Page (.html)"),
+}
+
+PRINTABLE_HEAD = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: Georgia, serif; max-width: 48rem; margin: 2rem auto; line-height: 1.45; }}
+h1 {{ font-size: 1.6rem; border-bottom: 2px solid #333; }}
+h2 {{ font-size: 1.2rem; margin-top: 1.5rem; }}
+li {{ margin-bottom: 0.6rem; white-space: pre-line; }}
+@media print {{ body {{ margin: 0; font-size: 11pt; }} h2 {{ break-after: avoid; }} li {{ break-inside: avoid; }} }}
+</style></head><body>
+<h1>{title}</h1>
+"""
+
+
+def generate_cheat_sheet_phrase(question_data):
+    """Generates a concise phrase for the cheat sheet."""
+    # Prioritize explanation if it exists, otherwise fall back to Q&A
+    if 'explanation' in question_data and pd.notna(question_data['explanation']):
+        return question_data['explanation']
+    else:
+        return f"Q: {question_data['question']}\nA: {question_data['answer']}"
+
+
+class CheatSheet:
+    """
+    The missed questions of a drill, built up one entry at a time. Each
+    question appears once no matter how often it is missed; the on-screen
+    text is rendered at most once per change and downloads are streamed on
+    demand.
+    """
+
+    def __init__(self, title="Cheat Sheet"):
+        self.title = title
+        self._entries = {}
+        self._rendered = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, question_id):
+        return question_id in self._entries
+
+    def add(self, question_id, question_data):
+        """Adds a missed question; repeated misses of the same question are ignored."""
+        if question_id in self._entries:
+            return False
+        self._entries[question_id] = (question_data['topic'], generate_cheat_sheet_phrase(question_data))
+        self._rendered.clear()
+        return True
+
+    def stream(self, fmt):
+        """Yields the export in chunks, one entry at a time, without building it in memory."""
+        if fmt in ('txt', 'md'):
+            for _, phrase in self._entries.values():
+                yield f"- {phrase}\n\n"
+        elif fmt == 'topics':
+            yield f"# {self.title}\n\n"
+            for topic, phrases in self._by_topic().items():
+                yield f"## {topic}\n\n"
+                for phrase in phrases:
+                    yield f"- {phrase}\n\n"
+        elif fmt == 'html':
+            yield PRINTABLE_HEAD.format(title=html.escape(self.title))
+            for topic, phrases in self._by_topic().items():
+                yield f"<h2>{html.escape(str(topic))}</h2>\n<ul>\n"
+                for phrase in phrases:
+                    yield f"<li>{html.escape(str(phrase))}</li>\n"
+                yield "</ul>\n"
+            yield "</body></html>\n"
+        else:
+            raise ValueError(f"Unknown cheat sheet format {fmt!r}; expected one of {list(FORMATS)}.")
+
+    def render(self, fmt='txt'):
+        """Returns the whole export as one string, cached until the next add()."""
+        if fmt not in self._rendered:
+            self._rendered[fmt] = ''.join(self.stream(fmt))
+        return self._rendered[fmt]
+
+    def download(self, fmt):
+        """
+        Returns the callable behind a download button: it streams the export
+        only when the button is clicked, from a snapshot of the current
+        entries so later misses don't change a pending download.
+        """
+        snapshot = CheatSheet(self.title)
+        snapshot._entries = dict(self._entries)
+        return lambda: ''.join(snapshot.stream(fmt)).encode('utf-8')
+
+    def _by_topic(self):
+        grouped = {}
+        for topic, phrase in self._entries.values():
+            grouped.setdefault(topic, []).append(phrase)
+        return grouped
@@ -1,11 +1,32 @@
 import pandas as pd
 import streamlit as st
-import random
 import os
 import time
+import math
+import datetime
+import functools
+
+import profiling
+from app_resources import (
+    ASSET_DIR, EXAM_PROCESSES, PROGRESS_DB_PATH, QUESTIONS_PATH, SAMPLER_SEED, get_asset_store, get_bank_reloader, get_progress_store, load_answer_rules,
+    load_practice_pack, load_search_index, start_metrics_endpoint,
+)
+from cheat_sheet import FORMATS, CheatSheet
+from drill_state import DrillState
+from grading import grade
+from practice_pack import read_results
+from progress_store import day_number
+from adaptive import Ability, pick_question, update_ability
+from review_scheduler import Card, ReviewQueue, grade_from_outcome, new_card, review
+from sampler import DEFAULT_DRILL_SIZE, DEFAULT_PER_TOPIC, STRATEGIES, make_rng, sample_drill
+from tournament import Section, exams_zip, generate_exams
+
+# Times the whole script run when profiling is on (reruns cut short by st.rerun() are not recorded)
+rerun_span = profiling.span("rerun")
 
 # --- Custom CSS for Styling ---
-st.markdown("""
+# Style-only HTML goes to Streamlit's event container, so it takes no room in the layout
+APP_CSS = """
 <style>
 /* Base styles for all buttons and radio buttons */
 div.stButton > button, label.st-bu {
@@ -51,302 +72,865 @@ div.stButton > button:hover, label.st-bu:hover {
     color: #666;
     margin-top: 5px;
 }
+</style>
+"""
 
-/* Timer styles */
-.timer-text-green {
+# --- Client-side Countdown ---
+# The countdown ticks in the browser, so a Timed Drill costs the server nothing
+# between clicks. The deadline itself is still enforced server-side.
+TIMER_HTML = """
+<style>
+body {{ margin: 0; font-family: "Source Sans Pro", sans-serif; }}
+.timer-text-green {{
     font-size: 2.5rem;
     font-weight: bold;
     color: #4CAF50; /* Green */
     text-align: center;
-}
-.timer-text-red {
+}}
+.timer-text-red {{
     font-size: 2.5rem;
     font-weight: bold;
     color: #FF5733; /* Red */
     text-align: center;
     animation: pulse 1s infinite;
-}
+}}
 
-@keyframes pulse {
-    0% { transform: scale(1); }
-    50% { transform: scale(1.05); }
-    100% { transform: scale(1); }
-}
+@keyframes pulse {{
+    0% {{ transform: scale(1); }}
+    50% {{ transform: scale(1.05); }}
+    100% {{ transform: scale(1); }}
+}}
 </style>
-""", unsafe_allow_html=True)
+<div id="timer" class="timer-text-green"></div>
+<script>
+const deadline = performance.now() + {time_left_ms};
+const timer = document.getElementById("timer");
+function tick() {{
+    const remaining = Math.max(0, deadline - performance.now()) / 1000;
+    const minutes = Math.floor(remaining / 60);
+    const seconds = Math.floor(remaining % 60);
+    timer.textContent = String(minutes).padStart(2, "0") + ":" + String(seconds).padStart(2, "0");
+    timer.className = remaining <= 30 ? "timer-text-red" : "timer-text-green";
+    if (remaining > 0) {{
+        setTimeout(tick, 250);
+    }}
+}}
+tick();
+</script>
+"""
 
 
 # --- Load Data ---
-@st.cache_data
+# The pseudo-event a mock tournament runs under, and the modes that run against a clock
+TOURNAMENT_EVENT = "Mock Tournament"
+TIMED_MODES = ("Timed Drill", "Mock Tournament")
+# Prepared questions kept per session (the current one, the next one and a little slack)
+PREPARED_QUESTIONS_KEPT = 4
+
+def active_bank_version():
+    """The bank version this session works against: the one its drill started on, otherwise the newest."""
+    return st.session_state.drill.bank_version or get_bank_reloader(QUESTIONS_PATH).current
+
 def load_questions():
-    """Loads the question data from a local CSV file."""
-    try:
-        df = pd.read_csv("questions_full.csv")
+    """Returns the question bank for this session's active version."""
+    return active_bank_version().bank
 
-        # Combine individual option columns into a single 'options' list
-        option_cols = [col for col in df.columns if col.startswith('options__')]
-        if not option_cols:
-            st.error("Error: 'options__' columns not found in the CSV data.")
-            return []
-            
-        df['options'] = df[option_cols].apply(
-            lambda row: [str(item).strip() for item in row if pd.notna(item)], 
-            axis=1
-        )
-        df = df.drop(columns=option_cols)
-        
-        # Infer question type based on options
-        df['type'] = df['options'].apply(lambda x: 
-            'true/false' if set(x) == {'True', 'False'} else
-            'multiple-choice' if len(x) > 1 else
-            'short-answer'
-        )
-        
-        # Clean up the dataframe and return as a list of dictionaries
-        questions_list = df.to_dict('records')
-        
-        # Filter out any rows that are missing 'event' or 'topic' keys
-        questions_list = [q for q in questions_list if 'event' in q and 'topic' in q and pd.notna(q['event']) and pd.notna(q['topic'])]
-        
-        return questions_list
-    except FileNotFoundError:
-        st.error("Error: The file 'questions_full.csv' was not found. Please ensure it is in your GitHub repository's root folder.")
-        return []
-    except Exception as e:
-        st.error(f"An unexpected error occurred while loading the data: {e}")
-        return []
+def is_correct_answer(prepared, user_answer):
+    """Short answers are graded against their compiled rule; option answers must match exactly."""
+    if prepared['rule'] is not None:
+        return grade(prepared['rule'], user_answer)
+    return str(user_answer).strip().lower() == str(prepared['data']['answer']).strip().lower()
+
+def sampler_seed():
+    """The drill sampling seed from the ?seed= query parameter or SCIOLY_SAMPLER_SEED, or None for fresh drills."""
+    seed = st.query_params.get("seed") or SAMPLER_SEED
+    if seed is None:
+        return None
+    try:
+        return int(seed)
+    except ValueError:
+        # Any other text still seeds the generator reproducibly
+        return seed
 
 # --- Initialize Session State ---
 def initialize_session_state():
     """Initializes all necessary session state variables."""
-    if 'questions_data' not in st.session_state:
-        st.session_state.questions_data = load_questions()
-    if 'event' not in st.session_state:
-        st.session_state.event = None
-    if 'selected_topics' not in st.session_state:
-        st.session_state.selected_topics = []
-    if 'questions_list' not in st.session_state:
-        st.session_state.questions_list = []
-    if 'current_question_index' not in st.session_state:
-        st.session_state.current_question_index = 0
-    if 'score' not in st.session_state:
-        st.session_state.score = 0
-    if 'attempted_questions' not in st.session_state:
-        st.session_state.attempted_questions = 0
-    if 'incorrect_questions' not in st.session_state:
-        st.session_state.incorrect_questions = []
-    if 'show_answer' not in st.session_state:
-        st.session_state.show_answer = False
-    if 'last_answer_state' not in st.session_state:
-        st.session_state.last_answer_state = None
-    if 'show_cheat_sheet' not in st.session_state:
-        st.session_state.show_cheat_sheet = False
-    if 'hint_revealed' not in st.session_state:
-        st.session_state.hint_revealed = False
-    if 'awaiting_action_after_incorrect' not in st.session_state:
-        st.session_state.awaiting_action_after_incorrect = False
-    if 'user_answer' not in st.session_state:
-        st.session_state.user_answer = ""
-    if 'topic_stats' not in st.session_state:
-        st.session_state.topic_stats = {}
-    if 'hints_used' not in st.session_state:
-        st.session_state.hints_used = 0
-    if 'show_exit_confirmation' not in st.session_state:
-        st.session_state.show_exit_confirmation = False
-    if 'mode' not in st.session_state:
-        st.session_state.mode = None
-    if 'timer_end_time' not in st.session_state:
-        st.session_state.timer_end_time = None
-    if 'start_time' not in st.session_state:
-        st.session_state.start_time = None
+    # Everything that belongs to the current drill; see drill_state.DrillState
+    if 'drill' not in st.session_state:
+        st.session_state.drill = DrillState()
+    if 'exam_batch' not in st.session_state:
+        st.session_state.exam_batch = None
+    # (level, message) about the last offline results import, shown on the home page
+    if 'offline_import' not in st.session_state:
+        st.session_state.offline_import = None
+    # Sampler settings and per-student history; kept across drills in a session
+    if 'sampler_strategy' not in st.session_state:
+        st.session_state.sampler_strategy = 'uniform'
+    if 'per_topic_cap' not in st.session_state:
+        st.session_state.per_topic_cap = DEFAULT_PER_TOPIC
+    if 'drill_size' not in st.session_state:
+        st.session_state.drill_size = DEFAULT_DRILL_SIZE
+    if 'sampler_seed' not in st.session_state:
+        st.session_state.sampler_seed = sampler_seed()
+    if 'sampler_rng' not in st.session_state:
+        st.session_state.sampler_rng = make_rng(st.session_state.sampler_seed)
+    if 'question_misses' not in st.session_state:
+        st.session_state.question_misses = {}
+    if 'seen_questions' not in st.session_state:
+        st.session_state.seen_questions = set()
+    if 'student_id' not in st.session_state:
+        st.session_state.student_id = ""
+    # The student's all-time (attempted, correct), loaded on login and bumped with every recorded attempt
+    if 'all_time_totals' not in st.session_state:
+        st.session_state.all_time_totals = (0, 0)
+    if 'review_queues' not in st.session_state:
+        st.session_state.review_queues = {}
+    # Adaptive difficulty ratings, keyed by (event, topic)
+    if 'topic_abilities' not in st.session_state:
+        st.session_state.topic_abilities = {}
+    # Render-ready questions, keyed by (bank version, row ID): the current one and the prefetched next one
+    if 'prepared_questions' not in st.session_state:
+        st.session_state.prepared_questions = {}
 
 
+def load_student_progress(student_id):
+    """Switches to a student ID and loads their saved misses and seen questions for the sampler."""
+    st.session_state.student_id = student_id
+    if student_id:
+        store = get_progress_store(PROGRESS_DB_PATH)
+        st.session_state.question_misses = store.miss_counts(student_id)
+        st.session_state.seen_questions = store.seen_questions(student_id)
+        st.session_state.review_queues = build_review_queues(store.review_cards(student_id))
+        st.session_state.topic_abilities = {
+            (event_name, topic): Ability(rating, answered, updated_at)
+            for event_name, topic, rating, answered, updated_at in store.abilities(student_id)
+        }
+        st.session_state.all_time_totals = store.totals(student_id)
+    else:
+        st.session_state.question_misses = {}
+        st.session_state.seen_questions = set()
+        st.session_state.review_queues = {}
+        st.session_state.topic_abilities = {}
+        st.session_state.all_time_totals = (0, 0)
+
+def question_key(row_id):
+    """The stable key of a row in the active bank; what the progress store and student history use."""
+    return int(load_questions().keys[row_id])
+
+def build_review_queues(rows):
+    """Groups saved review cards (keyed by question key) into one due-date queue per event."""
+    questions_data = load_questions()
+    row_ids = questions_data.rows_for_keys([row[0] for row in rows]).tolist()
+    cards_by_event = {}
+    for (question_id, ease, interval_days, repetitions, due_at), row_id in zip(rows, row_ids):
+        if row_id >= 0:
+            event_name = questions_data.columns['event'][row_id]
+            cards_by_event.setdefault(event_name, []).append(Card(question_id, ease, interval_days, repetitions, due_at))
+    return {event_name: ReviewQueue(cards) for event_name, cards in cards_by_event.items()}
+
+def student_history_rows(questions_data):
+    """Translates the session's miss counts and seen questions from question keys to row IDs of a bank."""
+    miss_keys = list(st.session_state.question_misses)
+    miss_rows = questions_data.rows_for_keys(miss_keys).tolist()
+    miss_counts = {row_id: st.session_state.question_misses[key] for key, row_id in zip(miss_keys, miss_rows) if row_id >= 0}
+    seen_rows = questions_data.rows_for_keys(list(st.session_state.seen_questions))
+    return miss_counts, set(seen_rows[seen_rows >= 0].tolist())
+
+def schedule_review(row_id, quality):
+    """
+    Reschedules a question in the student's spaced-repetition queue for its
+    event. Grading the same question again (a retry after a hint) replaces
+    its earlier grade rather than counting as a second review.
+    """
+    event_name = load_questions().columns['event'][row_id]
+    review_queue = st.session_state.review_queues.setdefault(event_name, ReviewQueue())
+    key = question_key(row_id)
+    drill = st.session_state.drill
+    if drill.review_base is None:
+        drill.review_base = review_queue.get(key) or new_card(key)
+    card = review(drill.review_base, quality)
+    review_queue.push(card)
+    if st.session_state.student_id:
+        get_progress_store(PROGRESS_DB_PATH).save_review_card(st.session_state.student_id, card)
+
+def record_ability(question_data, correct):
+    """Moves the student's rating in the question's topic by one answer and saves it when they have an ID."""
+    ability_key = (question_data['event'], question_data['topic'])
+    ability = update_ability(st.session_state.topic_abilities.get(ability_key, Ability()), question_data['difficulty'], correct)
+    st.session_state.topic_abilities[ability_key] = ability
+    if st.session_state.student_id:
+        get_progress_store(PROGRESS_DB_PATH).save_ability(st.session_state.student_id, *ability_key, ability)
+
+def record_attempt(row_id, outcome):
+    """Queues an attempt in the progress store when the student has entered an ID."""
+    if not st.session_state.student_id:
+        return
+    attempted, correct = st.session_state.all_time_totals
+    st.session_state.all_time_totals = (attempted + (outcome != 'revealed'), correct + (outcome == 'correct'))
+    question_data = get_question(row_id)
+    get_progress_store(PROGRESS_DB_PATH).record_attempt(
+        st.session_state.student_id,
+        question_key(row_id),
+        question_data['event'],
+        question_data['topic'],
+        question_data['difficulty'] if pd.notna(question_data['difficulty']) else None,
+        outcome,
+        hint_used=st.session_state.drill.hint_revealed,
+    )
+
 # --- Callback Functions ---
 def set_event(event_name):
     """Callback to set the event and move to the next screen."""
-    st.session_state.event = event_name
+    st.session_state.drill.event = event_name
+    st.session_state.offline_import = None
 
 def start_drill():
-    """Callback to get questions and start the drill."""
-    st.session_state.questions_list = get_questions_for_event(st.session_state.event, st.session_state.selected_topics)
-    st.session_state.current_question_index = 0
-    st.session_state.show_cheat_sheet = False
-    st.session_state.hint_revealed = False
-    st.session_state.show_answer = False
-    st.session_state.last_answer_state = None
-    st.session_state.awaiting_action_after_incorrect = False
-    st.session_state.user_answer = ""
-    st.session_state.topic_stats = {}
-    st.session_state.hints_used = 0
-    st.session_state.show_exit_confirmation = False
+    """Callback to get questions and start the drill on the newest bank version."""
+    drill = st.session_state.drill
+    drill.bank_version = get_bank_reloader(QUESTIONS_PATH).current
+    if drill.mode == "Spaced Review":
+        prepare_drill(get_review_questions(drill.event, drill.selected_topics))
+    elif drill.mode == "Adaptive":
+        # Adaptive drills grow one question at a time, each picked after the previous answer
+        prepare_drill(get_adaptive_questions(drill.event, drill.selected_topics))
+    else:
+        prepare_drill(get_questions_for_event(drill.event, drill.selected_topics))
+
+def start_tournament(events, questions_per_section, minutes_per_section):
+    """Callback to build a mock tournament: one timed section per event, in the order chosen."""
+    st.session_state.drill.bank_version = get_bank_reloader(QUESTIONS_PATH).current
+    st.session_state.drill.mode = "Mock Tournament"
+    st.session_state.drill.selected_topics = []
+    questions_list, sections = [], []
+    for event_name in events:
+        topics = get_event_topics(event_name)
+        row_ids = get_questions_for_event(event_name, topics, per_topic=math.ceil(questions_per_section / max(len(topics), 1)), drill_size=questions_per_section)
+        # sample_drill keeps small drills in topic order; a section is shuffled like tournament.build_exam's
+        st.session_state.sampler_rng.shuffle(row_ids)
+        if row_ids:
+            sections.append((event_name, len(questions_list), len(questions_list) + len(row_ids), minutes_per_section * 60))
+            questions_list.extend(row_ids)
+    st.session_state.drill.tournament_sections = sections
+    prepare_drill(questions_list)
+
+def start_search_drill(query, row_ids, bank_version):
+    """Callback to start a Study Mode drill on the questions matching a search."""
+    st.session_state.drill.bank_version = bank_version
+    st.session_state.drill.event = f"Search: {query}"
+    st.session_state.drill.mode = "Study Mode"
+    st.session_state.drill.selected_topics = []
+    st.session_state.drill.search_keys = bank_version.bank.keys[row_ids].tolist()
+    prepare_drill(row_ids)
+
+def prepare_drill(questions_list):
+    """Starts the drill on questions_list, resetting the per-drill state."""
+    drill = st.session_state.drill
+    drill.start(questions_list)
+    st.session_state.seen_questions.update(load_questions().keys[drill.questions_list].tolist())
     
     # Start a fixed 5-minute timer for Timed Drill
-    if st.session_state.mode == "Timed Drill":
+    if drill.mode == "Timed Drill":
         total_time_seconds = 300  # 5 minutes
-        st.session_state.start_time = time.time()
-        st.session_state.timer_end_time = st.session_state.start_time + total_time_seconds
+        drill.start_time = time.time()
+        drill.timer_end_time = drill.start_time + total_time_seconds
+    elif drill.mode == "Mock Tournament":
+        start_section_timer()
 
 def check_answer_callback():
     """Checks the user's answer and updates the score."""
-    current_question = st.session_state.questions_list[st.session_state.current_question_index]
-    correct_answer = current_question['answer']
+    row_id = st.session_state.drill.questions_list[st.session_state.drill.current_question_index]
+    prepared = prepared_question(row_id)
+    current_question = prepared['data']
+
+    # Answers submitted after the Timed Drill deadline end the drill instead
+    if timed_drill_expired():
+        end_timed_drill()
+        return
     
     # Update topic stats
     topic = current_question['topic']
-    if topic not in st.session_state.topic_stats:
-        st.session_state.topic_stats[topic] = {'attempted': 0, 'correct': 0}
+    if topic not in st.session_state.drill.topic_stats:
+        st.session_state.drill.topic_stats[topic] = {'attempted': 0, 'correct': 0}
         
-    st.session_state.topic_stats[topic]['attempted'] += 1
-    st.session_state.attempted_questions += 1
-    
-    if str(st.session_state.user_answer).strip().lower() == str(correct_answer).strip().lower():
-        st.session_state.score += 1
-        st.session_state.topic_stats[topic]['correct'] += 1
-        st.session_state.last_answer_state = 'correct'
-        st.session_state.show_answer = True
+    st.session_state.drill.topic_stats[topic]['attempted'] += 1
+    st.session_state.drill.attempted_questions += 1
+
+    correct = is_correct_answer(prepared, st.session_state.drill.user_answer)
+    # Scheduled as soon as it is graded, so the last answer of a drill that times out still counts
+    schedule_review(row_id, grade_from_outcome(correct, st.session_state.drill.hint_revealed))
+    # Only the first answer to a question moves the rating; a retry after a hint does not
+    if not st.session_state.drill.hint_revealed:
+        record_ability(current_question, correct)
+
+    if correct:
+        st.session_state.drill.score += 1
+        st.session_state.drill.topic_stats[topic]['correct'] += 1
+        st.session_state.drill.last_answer_state = 'correct'
+        st.session_state.drill.show_answer = True
+        record_attempt(row_id, 'correct')
     else:
-        st.session_state.last_answer_state = 'incorrect'
-        st.session_state.awaiting_action_after_incorrect = True
-        st.session_state.incorrect_questions.append(current_question)
+        st.session_state.drill.last_answer_state = 'incorrect'
+        st.session_state.drill.awaiting_action_after_incorrect = True
+        add_to_cheat_sheet(row_id)
+        key = question_key(row_id)
+        st.session_state.question_misses[key] = st.session_state.question_misses.get(key, 0) + 1
+        record_attempt(row_id, 'incorrect')
 
 def next_question():
     """Moves to the next question in the list."""
-    st.session_state.current_question_index += 1
-    st.session_state.show_answer = False
-    st.session_state.last_answer_state = None
-    st.session_state.hint_revealed = False
-    st.session_state.awaiting_action_after_incorrect = False
-    st.session_state.user_answer = ""
-    st.session_state.show_exit_confirmation = False
+    drill = st.session_state.drill
+    if drill.mode == "Adaptive" and drill.current_question_index + 1 == len(drill.questions_list):
+        drill.questions_list = drill.questions_list + get_adaptive_questions(drill.event, drill.selected_topics)
+    drill.current_question_index += 1
+    drill.clear_question()
+    section = current_section()
+    if section is not None and drill.current_question_index == section[1]:
+        start_section_timer()
 
 def return_to_event_selection():
     """Resets all state and returns to the event selection screen."""
-    st.session_state.event = None
-    st.session_state.questions_list = []
-    st.session_state.current_question_index = 0
-    st.session_state.score = 0
-    st.session_state.attempted_questions = 0
-    st.session_state.incorrect_questions = []
-    st.session_state.show_answer = False
-    st.session_state.selected_topics = []
-    st.session_state.last_answer_state = None
-    st.session_state.show_cheat_sheet = False
-    st.session_state.hint_revealed = False
-    st.session_state.awaiting_action_after_incorrect = False
-    st.session_state.user_answer = ""
-    st.session_state.topic_stats = {}
-    st.session_state.hints_used = 0
-    st.session_state.show_exit_confirmation = False
-    st.session_state.mode = None # Reset mode
-    st.session_state.timer_end_time = None
-    st.session_state.start_time = None
+    st.session_state.drill.reset()
 
 def reset_practice_session():
-    """Resets the state for a new practice session."""
-    st.session_state.questions_list = []
-    st.session_state.current_question_index = 0
-    st.session_state.score = 0
-    st.session_state.attempted_questions = 0
-    st.session_state.incorrect_questions = []
-    st.session_state.show_answer = False
-    st.session_state.selected_topics = []
-    st.session_state.last_answer_state = None
-    st.session_state.show_cheat_sheet = False
-    st.session_state.hint_revealed = False
-    st.session_state.awaiting_action_after_incorrect = False
-    st.session_state.user_answer = ""
-    st.session_state.topic_stats = {}
-    st.session_state.hints_used = 0
-    st.session_state.show_exit_confirmation = False
-    st.session_state.timer_end_time = None
-    st.session_state.start_time = None
+    """
+    Resets the state for a new practice session on the same event and mode.
+    A search drill has no topics to pick, so it restarts on the same
+    questions in the newest bank version.
+    """
+    drill = st.session_state.drill
+    drill.reset(keep_selection=True)
+    if drill.search_keys:
+        drill.bank_version = get_bank_reloader(QUESTIONS_PATH).current
+        row_ids = load_questions().rows_for_keys(drill.search_keys)
+        prepare_drill(row_ids[row_ids >= 0].tolist())
+
 
+def add_to_cheat_sheet(row_id):
+    """Records a missed question and adds it to the cheat sheet (once per question)."""
+    st.session_state.drill.incorrect_questions.append(row_id)
+    if st.session_state.drill.cheat_sheet is None:
+        st.session_state.drill.cheat_sheet = CheatSheet(f"SciOly {st.session_state.drill.event} Cheat Sheet")
+    with profiling.span("cheat_sheet_add"):
+        st.session_state.drill.cheat_sheet.add(row_id, get_question(row_id))
 
 def toggle_cheat_sheet(state):
     """Callback to show/hide the cheat sheet."""
-    st.session_state.show_cheat_sheet = state
+    st.session_state.drill.show_cheat_sheet = state
+
+def import_offline_results():
+    """
+    Callback to record the attempts in an uploaded practice pack results file
+    under the current student. Files exported under another Student ID are
+    refused; attempts imported before, and attempts on questions no longer
+    in the bank, are skipped.
+    """
+    upload = st.session_state.offline_results
+    if upload is None:
+        return
+    try:
+        results = read_results(upload.getvalue(), st.session_state.student_id)
+    except ValueError as e:
+        st.session_state.offline_import = ('error', f"Could not import {upload.name}: {e}.")
+        return
+
+    questions_data = load_questions()
+    row_ids = questions_data.rows_for_keys([attempt['key'] for attempt in results['attempts']]).tolist()
+    attempts = []
+    for attempt, row_id in zip(results['attempts'], row_ids):
+        if row_id < 0:
+            continue
+        question_data = questions_data.question(row_id)
+        attempts.append((
+            attempt['id'], attempt['key'], question_data['event'], question_data['topic'],
+            question_data['difficulty'] if pd.notna(question_data['difficulty']) else None,
+            attempt['outcome'], attempt['hint_used'], attempt['answered_at'],
+        ))
+    store = get_progress_store(PROGRESS_DB_PATH)
+    store.import_attempts(st.session_state.student_id, attempts)
+    store.flush()
+
+    attempted_before = st.session_state.all_time_totals[0]
+    load_student_progress(st.session_state.student_id)
+    added = st.session_state.all_time_totals[0] - attempted_before
+    missing = len(results['attempts']) - len(attempts)
+    st.session_state.offline_import = ('success', (
+        f"Imported {added} new attempt(s) from {upload.name}"
+        + (f"; {len(attempts) - added} were already imported" if len(attempts) > added else "")
+        + (f"; {missing} on questions no longer in the bank were skipped" if missing else "")
+        + "."
+    ))
 
 def show_hint():
     """Callback to show the hint and allow re-answering."""
-    st.session_state.hint_revealed = True
-    st.session_state.awaiting_action_after_incorrect = False
-    st.session_state.user_answer = ""
-    st.session_state.show_answer = False
-    st.session_state.hints_used += 1
+    st.session_state.drill.hint_revealed = True
+    st.session_state.drill.awaiting_action_after_incorrect = False
+    st.session_state.drill.user_answer = ""
+    st.session_state.drill.show_answer = False
+    st.session_state.drill.hints_used += 1
 
 def reveal_answer():
     """Callback to reveal the answer and move to the next question."""
-    st.session_state.show_answer = True
-    st.session_state.awaiting_action_after_incorrect = False
-    st.session_state.incorrect_questions.append(st.session_state.questions_list[st.session_state.current_question_index])
+    st.session_state.drill.show_answer = True
+    st.session_state.drill.awaiting_action_after_incorrect = False
+    row_id = st.session_state.drill.questions_list[st.session_state.drill.current_question_index]
+    add_to_cheat_sheet(row_id)
+    record_attempt(row_id, 'revealed')
 
 def show_exit_confirmation():
     """Callback to trigger the exit confirmation popup."""
-    st.session_state.show_exit_confirmation = True
+    st.session_state.drill.show_exit_confirmation = True
+
+def hide_exit_confirmation():
+    """Callback to dismiss the exit confirmation popup."""
+    st.session_state.drill.show_exit_confirmation = False
 
 # --- Helper Functions ---
-def get_questions_for_event(event_name, topics):
+def timed_drill_expired():
+    """True once a Timed Drill's (or the current tournament section's) deadline has passed."""
+    return st.session_state.drill.mode in TIMED_MODES and st.session_state.drill.timer_end_time is not None and time.time() >= st.session_state.drill.timer_end_time
+
+def end_timed_drill():
+    """Jumps to the next tournament section, or past the last question so the summary screen is shown."""
+    drill = st.session_state.drill
+    section = current_section()
+    if section is not None and section[2] < len(drill.questions_list):
+        drill.current_question_index = section[2]
+        drill.clear_question()
+        start_section_timer()
+    else:
+        drill.current_question_index = len(drill.questions_list)
+
+def current_section():
+    """The mock tournament section holding the current question, or None outside a tournament."""
+    for section in st.session_state.drill.tournament_sections:
+        if section[1] <= st.session_state.drill.current_question_index < section[2]:
+            return section
+    return None
+
+def start_section_timer():
+    """Starts the clock for the tournament section holding the current question."""
+    section = current_section()
+    if section is not None:
+        st.session_state.drill.start_time = time.time()
+        st.session_state.drill.timer_end_time = st.session_state.drill.start_time + section[3]
+
+def render_drill_timer(time_left):
+    """
+    Shows the Timed Drill countdown. The browser ticks the clock; a fragment
+    reruns once, just after the deadline, to end the drill on the server.
     """
-    Gathers a specified number of questions for a selected event and topics,
-    following the new logic of 5 questions per topic, up to a maximum of 10.
+    st.iframe(TIMER_HTML.format(time_left_ms=int(time_left * 1000)), height=70)
+
+    @st.fragment(run_every=time_left + 0.5)
+    def watch_timer_expiry():
+        if timed_drill_expired():
+            end_timed_drill()
+            st.rerun()
+
+    watch_timer_expiry()
+
+def get_questions_for_event(event_name, topics, per_topic=None, drill_size=None):
     """
-    if not st.session_state.questions_data:
+    Gathers a specified number of questions for a selected event and topics
+    using the chosen sampling strategy: up to `per_topic` questions per
+    topic and at most `drill_size` in total (the session's `per_topic_cap`
+    and `drill_size`, 5 and 10 by default, unless given).
+    Returns row IDs into the shared question bank.
+    """
+    questions_data = load_questions()
+    if not questions_data:
         return []
     
-    event_questions = [q for q in st.session_state.questions_data if q['event'] == event_name]
-    
-    final_questions = []
-    
     # If all topics are selected, or no topics are selected, get all topics for the event
     if 'All of the Above' in topics or not topics:
-        topics_to_select_from = sorted(list(set(q['topic'] for q in event_questions)))
+        topics_to_select_from = get_event_topics(event_name)
     else:
         topics_to_select_from = topics
     
-    # Select up to 5 questions for each chosen topic
-    for topic in topics_to_select_from:
-        topic_questions = [q for q in event_questions if q['topic'] == topic]
-        random.shuffle(topic_questions)
-        final_questions.extend(topic_questions[:5])
-
-    # If the total is less than 10, return all questions
-    if len(final_questions) < 10:
-        return final_questions
-    else:
-        # If the total is 10 or more, shuffle and return the first 10
-        random.shuffle(final_questions)
-        return final_questions[:10]
-
-def generate_cheat_sheet_phrase(question_data):
-    """Generates a concise phrase for the cheat sheet."""
-    # Prioritize explanation if it exists, otherwise fall back to Q&A
-    if 'explanation' in question_data and pd.notna(question_data['explanation']):
-        return question_data['explanation']
+    with profiling.span("get_questions_for_event"):
+        miss_counts, seen = student_history_rows(questions_data)
+        return sample_drill(
+            questions_data.index,
+            event_name,
+            topics_to_select_from,
+            strategy=st.session_state.sampler_strategy,
+            per_topic=per_topic or st.session_state.per_topic_cap,
+            drill_size=drill_size or st.session_state.drill_size,
+            rng=st.session_state.sampler_rng,
+            context={'miss_counts': miss_counts, 'seen': seen},
+        )
+
+def get_adaptive_questions(event_name, topics):
+    """
+    Picks the next question of an Adaptive drill from the difficulty bucket
+    that best fits the student's current rating in a random chosen topic.
+    Returns a list of at most one row ID (none once the drill is full or
+    the topics are used up).
+    """
+    if len(st.session_state.drill.questions_list) >= st.session_state.drill_size:
+        return []
+    if 'All of the Above' in topics or not topics:
+        topics = get_event_topics(event_name)
+    with profiling.span("pick_adaptive_question"):
+        row_id = pick_question(
+            load_questions().index,
+            event_name,
+            list(topics),
+            st.session_state.topic_abilities,
+            st.session_state.sampler_rng,
+            exclude=set(st.session_state.drill.questions_list),
+        )
+    return [] if row_id is None else [row_id]
+
+def offline_pack_renderer(event_name, topics, minutes):
+    """
+    Returns the callable behind the offline practice pack download button.
+    Streamlit runs it on another thread only when the button is clicked,
+    so everything it needs from the session is bound here.
+    """
+    if 'All of the Above' in topics or not topics:
+        topics = get_event_topics(event_name)
+    bank_version = active_bank_version()
+    return functools.partial(load_practice_pack, QUESTIONS_PATH, bank_version.version, bank_version.bank,
+                             event_name, tuple(topics), minutes, st.session_state.drill_size)
+
+def drill_length():
+    """Questions in the current drill; an Adaptive drill counts the ones still to be picked."""
+    if st.session_state.drill.mode == "Adaptive":
+        return max(st.session_state.drill_size, len(st.session_state.drill.questions_list))
+    return len(st.session_state.drill.questions_list)
+
+def get_review_questions(event_name, topics):
+    """
+    Builds a Spaced Review drill: the event's most overdue cards first, then
+    new questions from the chosen topics if fewer than `drill_size` are due.
+    """
+    questions_data = load_questions()
+    review_queue = st.session_state.review_queues.get(event_name, ReviewQueue())
+    due_keys = [card.card_id for card in review_queue.due(time.time(), limit=st.session_state.drill_size)]
+    due_questions = [row_id for row_id in questions_data.rows_for_keys(due_keys).tolist() if row_id >= 0]
+    if len(due_questions) >= st.session_state.drill_size:
+        return due_questions
+
+    new_questions = [row_id for row_id in get_questions_for_event(event_name, topics) if int(questions_data.keys[row_id]) not in review_queue]
+    return due_questions + new_questions[:st.session_state.drill_size - len(due_questions)]
+
+def is_admin():
+    """True when the page was opened with ?admin=<SCIOLY_ADMIN_KEY>."""
+    admin_key = os.environ.get("SCIOLY_ADMIN_KEY")
+    return bool(admin_key) and st.query_params.get("admin") == admin_key
+
+def render_profiling_panel():
+    """Admin-only sidebar panel with per-span timings and exports."""
+    st.header("Profiling")
+    stats = profiling.summary()
+    if stats:
+        st.dataframe(pd.DataFrame.from_dict(stats, orient='index').round(2), use_container_width=True)
     else:
-        return f"Q: {question_data['question']}\nA: {question_data['answer']}"
+        st.caption("No spans recorded yet.")
+    bank_version = get_bank_reloader(QUESTIONS_PATH).current
+    changes = ", ".join(f"{count} {name}" for name, count in bank_version.diff.items())
+    st.caption(f"Question bank version {bank_version.version} ({len(bank_version.bank)} questions), loaded {time.strftime('%H:%M:%S', time.localtime(bank_version.loaded_at))}" + (f": {changes}" if changes else ""))
+    duplicates = bank_version.bank.duplicates
+    near = "not checked on CSV loads" if duplicates['near'] is None else f"{len(duplicates['near'])} near-duplicate pair(s)"
+    st.caption(f"Duplicates: {len(duplicates['exact'])} exact group(s) (first copy served), {near}; see `python dedup.py`.")
+    bank_timings = bank_version.bank.timings
+    if bank_timings:
+        st.caption("Question bank load: " + ", ".join(f"{step} {ms:.1f}" for step, ms in bank_timings.items()))
+    assets = get_asset_store(ASSET_DIR).stats()
+    st.caption(f"Image cache: {assets['entries']} item(s), {assets['bytes'] / 2**20:.1f} of {assets['max_bytes'] / 2**20:.0f} MB, "
+               f"{assets['hits']} hit(s), {assets['misses']} miss(es)")
+    st.download_button("Download metrics (Prometheus)", data=profiling.prometheus_text(), file_name="scioly_metrics.txt", mime="text/plain")
+    st.download_button("Download spans (JSONL)", data=profiling.jsonl(), file_name="scioly_spans.jsonl", mime="application/x-ndjson")
+
+def is_coach():
+    """True when the page was opened with ?coach=<SCIOLY_COACH_KEY> (the admin key works too)."""
+    keys = [key for key in (os.environ.get("SCIOLY_COACH_KEY"), os.environ.get("SCIOLY_ADMIN_KEY")) if key]
+    return bool(keys) and st.query_params.get("coach") in keys
+
+def rollup_frame(rows, columns):
+    """Turns team_rollup rows into a DataFrame with an accuracy column."""
+    frame = pd.DataFrame(rows, columns=columns + ['Attempted', 'Correct', 'Revealed', 'Hints'])
+    frame['Accuracy (%)'] = (100 * frame['Correct'] / frame['Attempted'].where(frame['Attempted'] > 0)).round(1)
+    return frame
+
+def render_coach_dashboard():
+    """Team analytics for coaches, read from the progress store's daily rollups."""
+    st.header("Coach Dashboard 📊")
+    store = get_progress_store(PROGRESS_DB_PATH)
+    all_students = store.students()
+    if not all_students:
+        st.info("No attempts recorded yet. Students show up here once they practice with a Student ID.")
+        return
+
+    students = st.multiselect("Team:", options=all_students, default=all_students)
+    today = datetime.date.today()
+    date_range = st.date_input("Dates:", value=(today - datetime.timedelta(weeks=8), today))
+    first_date, last_date = (date_range[0], date_range[-1]) if date_range else (today, today)
+    first_day, last_day = day_number(first_date), day_number(last_date)
+
+    with profiling.span("coach_dashboard"):
+        attempted, correct, revealed, hints = store.team_rollup([], students, first_day, last_day)[0]
+        attempted, correct = attempted or 0, correct or 0
+        columns = st.columns(4)
+        columns[0].metric("Attempted", attempted)
+        columns[1].metric("Accuracy", f"{correct / attempted * 100:.1f}%" if attempted else "–")
+        columns[2].metric("Answers Revealed", revealed or 0)
+        columns[3].metric("Hints Used", hints or 0)
+
+        st.subheader("Accuracy by Topic")
+        by_topic = rollup_frame(store.team_rollup(['event', 'topic'], students, first_day, last_day), ['Event', 'Topic'])
+        st.dataframe(by_topic, use_container_width=True, hide_index=True)
+        if not by_topic.empty:
+            st.bar_chart(by_topic.set_index('Topic')['Accuracy (%)'])
+
+        st.subheader("Accuracy by Difficulty")
+        by_difficulty = rollup_frame(store.team_rollup(['event', 'difficulty'], students, first_day, last_day), ['Event', 'Difficulty'])
+        st.dataframe(by_difficulty, use_container_width=True, hide_index=True)
+
+        st.subheader("Weekly Trend")
+        by_day = rollup_frame(store.team_rollup(['day'], students, first_day, last_day), ['Day'])
+        if not by_day.empty:
+            by_day['Week'] = pd.to_datetime(by_day['Day'], unit='D').dt.to_period('W').dt.start_time
+            by_week = by_day.groupby('Week')[['Attempted', 'Correct']].sum()
+            by_week['Accuracy (%)'] = (100 * by_week['Correct'] / by_week['Attempted'].where(by_week['Attempted'] > 0)).round(1)
+            st.line_chart(by_week['Accuracy (%)'])
+            st.bar_chart(by_week['Attempted'])
+
+        st.subheader("Students")
+        st.dataframe(rollup_frame(store.team_rollup(['student_id'], students, first_day, last_day), ['Student']), use_container_width=True, hide_index=True)
+
+        st.subheader("Lowest Question Hit Rates")
+        st.caption("Across all students. Questions most students miss may be worded badly or have a wrong answer key.")
+        min_attempts = st.number_input("Minimum attempts:", min_value=1, max_value=500, value=5)
+        rows = store.question_hit_rates(first_day, last_day, min_attempts=min_attempts)
+        questions_data = load_questions()
+        row_ids = questions_data.rows_for_keys([row[0] for row in rows]).tolist()
+        hit_rates = pd.DataFrame([
+            {
+                'Event': event_name,
+                'Topic': topic,
+                'Question': questions_data.columns['question'][row_id] if row_id >= 0 else "(no longer in the bank)",
+                'Attempted': question_attempted,
+                'Hit Rate (%)': round(100 * question_correct / question_attempted, 1),
+                'Revealed': question_revealed,
+            }
+            for (_, event_name, topic, question_attempted, question_correct, question_revealed), row_id in zip(rows, row_ids)
+        ])
+        if hit_rates.empty:
+            st.caption("No question has enough attempts yet.")
+        else:
+            st.dataframe(hit_rates, use_container_width=True, hide_index=True)
+
+def generate_exam_batch(events, questions_per_section, minutes_per_section, variants, seed):
+    """
+    Callback to build a batch of printable, non-overlapping mock tournament
+    exams from the bank version on screen, with at most EXAM_PROCESSES workers.
+    """
+    sections = [Section(event_name, questions_per_section, minutes_per_section) for event_name in events]
+    with profiling.span("generate_exams"):
+        exams = generate_exams(load_questions(), sections, variants, processes=EXAM_PROCESSES, seed=seed,
+                               strategy=st.session_state.sampler_strategy)
+    st.session_state.exam_batch = {
+        'zip': exams_zip(exams),
+        'variants': len(exams),
+        'short': sum(1 for exam in exams if any(exam['shortfalls'])),
+    }
+
+def render_exam_generator():
+    """Coach tool for printing a unique mock tournament exam per student."""
+    st.subheader("Printable Mock Tournament Exams")
+    st.caption("Every version gets different questions, so a whole team can sit the same tournament without sharing answers.")
+    all_events = load_questions().index['events']
+    events = st.multiselect("Exam events, in section order:", options=list(all_events), default=list(all_events))
+    columns = st.columns(4)
+    questions_per_section = columns[0].number_input("Questions per section:", min_value=1, max_value=100, value=20, key="exam_questions")
+    minutes_per_section = columns[1].number_input("Minutes per section:", min_value=1, max_value=120, value=25, key="exam_minutes")
+    variants = columns[2].number_input("Versions:", min_value=1, max_value=500, value=15)
+    seed = columns[3].number_input("Seed:", min_value=0, value=0)
+    st.button("Generate Exams", disabled=not events, on_click=generate_exam_batch, args=(events, questions_per_section, minutes_per_section, variants, seed))
+
+    batch = st.session_state.exam_batch
+    if batch:
+        if batch['short']:
+            st.warning(f"{batch['short']} of {batch['variants']} version(s) came out short: the bank has too few questions for that many unique exams.")
+        st.download_button(f"Download {batch['variants']} exam(s) (zip)", data=batch['zip'], file_name="mock_tournament_exams.zip", mime="application/zip")
+
+def render_sidebar():
+    """
+    Drill progress, cheat sheet and exit controls. Reads only session state:
+    the all-time totals are loaded once per student and kept current by
+    record_attempt, so a rerun never queries the progress store.
+    """
+    drill = st.session_state.drill
+    with st.sidebar:
+        st.header("Progress")
+        st.write(f"**Score:** {drill.score}")
+        st.write(f"**Attempted:** {drill.attempted_questions}")
+        if drill.attempted_questions > 0:
+            accuracy = (drill.score / drill.attempted_questions) * 100
+            st.write(f"**Accuracy:** {accuracy:.2f}%")
+        all_time_attempted, all_time_correct = st.session_state.all_time_totals
+        if st.session_state.student_id and all_time_attempted > 0:
+            st.caption(f"All-time: {all_time_correct} of {all_time_attempted} correct ({all_time_correct / all_time_attempted * 100:.2f}%)")
+        
+        # "View Cheat Sheet" button
+        st.button("View Cheat Sheet", use_container_width=True, help="View all incorrect questions so far", on_click=toggle_cheat_sheet, args=(True,))
+
+        st.markdown("---")
+    
+        st.button("Reset Current Drill", use_container_width=True, help="Clear all progress for this event", on_click=reset_practice_session)
+
+        if drill.questions_list and drill.current_question_index / len(drill.questions_list) > 0.5:
+            st.button("Exit Drill", key="exit_drill_button", on_click=show_exit_confirmation, use_container_width=True, help="End the current drill and return to event selection")
+        else:
+            st.button("Exit Drill", key="exit_drill_button", on_click=return_to_event_selection, use_container_width=True, help="End the current drill and return to event selection")
+
+def get_event_topics(event_name):
+    """Returns the sorted topics for an event from the question index."""
+    return load_questions().index['topics'].get(event_name, ())
+
+def get_question(row_id):
+    """Returns the question dict for a row ID in the shared question bank."""
+    return load_questions().question(row_id)
+
+def prepared_question(row_id):
+    """
+    Returns everything the practice page needs for a question: the question
+    dict, its answer choices, hint, explanation and image reference (None
+    when missing) and its grading rule. Built once per session and bank
+    version, so reruns on the same question and the prefetched next question
+    skip the work. Image bytes are never kept here, only in the asset store's
+    shared cache.
+    """
+    bank_version = active_bank_version()
+    cache = st.session_state.prepared_questions
+    cache_key = (bank_version.version, row_id)
+    if cache_key not in cache:
+        with profiling.span("prepare_question"):
+            question_data = get_question(row_id)
+            if question_data['type'] == 'multiple-choice':
+                choices = question_data['options']
+            elif question_data['type'] == 'true/false':
+                choices = ['True', 'False']
+            else:
+                choices = None
+            prepared = {
+                'data': question_data,
+                'prompt': f"**Question:** {question_data['question']}",
+                'choices': choices,
+                'hint': question_data['hint'] if pd.notna(question_data.get('hint')) else None,
+                'explanation': question_data['explanation'] if pd.notna(question_data.get('explanation')) else None,
+                'image': question_data['image'] if isinstance(question_data.get('image'), str) and question_data['image'].strip() else None,
+                'image_caption': question_data['image_caption'] if isinstance(question_data.get('image_caption'), str) else None,
+                'rule': load_answer_rules(QUESTIONS_PATH, bank_version.version, bank_version.bank).get(row_id),
+            }
+        # Only the current and next questions are ever needed
+        while len(cache) >= PREPARED_QUESTIONS_KEPT:
+            cache.pop(next(iter(cache)))
+        cache[cache_key] = prepared
+    return cache[cache_key]
+
+def prefetch_next_question():
+    """
+    Prepares the next question while the student reads the feedback on this
+    one, so the Next Question rerun only looks it up; its image is loaded
+    into the asset cache in the background. An Adaptive drill picks its next
+    question here, right after the answer moved the rating.
+    """
+    next_index = st.session_state.drill.current_question_index + 1
+    if st.session_state.drill.mode == "Adaptive" and next_index == len(st.session_state.drill.questions_list):
+        st.session_state.drill.questions_list = st.session_state.drill.questions_list + get_adaptive_questions(st.session_state.drill.event, st.session_state.drill.selected_topics)
+    if next_index < len(st.session_state.drill.questions_list):
+        prepared = prepared_question(st.session_state.drill.questions_list[next_index])
+        if prepared['image'] is not None:
+            get_asset_store(ASSET_DIR).prefetch(prepared['image'])
+
+def render_question_image(prepared):
+    """Shows a question's image as a cached thumbnail, loading the full-size file only when asked for."""
+    if prepared['image'] is None:
+        return
+    store = get_asset_store(ASSET_DIR)
+    with profiling.span("question_image"):
+        thumbnail = store.thumbnail(prepared['image'])
+    if thumbnail is None:
+        st.caption("This question's image is unavailable.")
+        return
+    st.image(thumbnail, caption=prepared['image_caption'])
+    if st.toggle("Show full-size image", key=f"full_image_{st.session_state.drill.widget_key}"):
+        st.image(store.image(prepared['image']))
 
 # --- UI Layout and Logic ---
 st.set_page_config(page_title="SciOly Prep Tool", layout="centered", page_icon="✨")
+st.html(APP_CSS)
 
 st.title("SciOly Prep Tool")
 st.markdown("---")
 
 initialize_session_state()
 
+if profiling.ENABLED and os.environ.get("SCIOLY_METRICS_PORT"):
+    start_metrics_endpoint(int(os.environ["SCIOLY_METRICS_PORT"]))
+
 # Main conditional block to control page flow
-if st.session_state.event is None:
+if is_coach():
+    render_coach_dashboard()
+    render_exam_generator()
+
+elif st.session_state.drill.event is None:
     # Home Page: Event Selection
     st.header("Select an Event to Begin")
     st.markdown("### Welcome to the Science Olympiad Preparation Tool!")
     st.markdown("Use this app to study for your events by taking practice drills.")
+
+    student_id = st.text_input(
+        "Student ID (optional):",
+        value=st.session_state.student_id,
+        help="Enter your name or team ID to save your progress between visits.",
+    ).strip()
+    if student_id != st.session_state.student_id:
+        load_student_progress(student_id)
+        st.session_state.offline_import = None
+    if st.session_state.student_id:
+        st.file_uploader(
+            "Import offline practice results:",
+            type=["json"],
+            key="offline_results",
+            on_change=import_offline_results,
+            help="The results file exported from an offline practice pack; its attempts are added to this Student ID's progress.",
+        )
+    if st.session_state.offline_import:
+        level, message = st.session_state.offline_import
+        if level == 'error':
+            st.error(message)
+        else:
+            st.success(message)
+
+    search_query = st.text_input("Search questions by keyword:", placeholder="e.g. white dwarf").strip()
+    bank_version = active_bank_version()
+    if search_query and bank_version.bank:
+        with profiling.span("search"):
+            results = load_search_index(QUESTIONS_PATH, bank_version.version, bank_version.bank).search(search_query, limit=st.session_state.drill_size)
+        if results:
+            with st.expander(f"{len(results)} matching question(s)", expanded=True):
+                for row_id, _ in results:
+                    question_data = get_question(row_id)
+                    st.markdown(f"- **{question_data['event']} / {question_data['topic']}:** {question_data['question']}")
+            st.button("Drill on These Questions", use_container_width=True, on_click=start_search_drill, args=(search_query, [row_id for row_id, _ in results], bank_version))
+        else:
+            st.info("No questions match your search.")
     
-    if st.session_state.questions_data:
+    if bank_version.bank:
+        # Compile the grading rules before the first drill starts
+        load_answer_rules(QUESTIONS_PATH, bank_version.version, bank_version.bank)
+
         # Get all unique event names
-        all_events = sorted(list(set(q['event'] for q in st.session_state.questions_data if 'event' in q and pd.notna(q['event']))))
+        all_events = load_questions().index['events']
 
         # Dynamically create a card and button for each event
+        cards_span = profiling.span("event_cards")
         for event_name in all_events:
-            unique_topics = set(q['topic'] for q in st.session_state.questions_data if q['event'] == event_name)
+            unique_topics = get_event_topics(event_name)
 
             with st.container():
                 st.markdown(f"""
@@ -357,27 +941,89 @@ if st.session_state.event is None:
                 """, unsafe_allow_html=True)
                 
                 st.button(f"Start {event_name} Drill", key=f"start_{event_name}", use_container_width=True, on_click=set_event, args=(event_name,))
+        cards_span.stop()
+
+        with st.container():
+            st.markdown(f"""
+            <div class="event-card-container">
+                <div class="event-card-title">{TOURNAMENT_EVENT}</div>
+                <div class="event-card-subtitle">A full exam across several events, one timed section each</div>
+            </div>
+            """, unsafe_allow_html=True)
+            st.button("Start a Mock Tournament", key="start_tournament", use_container_width=True, on_click=set_event, args=(TOURNAMENT_EVENT,))
+    else:
+        st.warning("No question data found.")
+
+elif not st.session_state.drill.questions_list and st.session_state.drill.event == TOURNAMENT_EVENT:
+    # Mock Tournament Setup
+    st.header("Set Up a Mock Tournament 🏆")
+    st.markdown("Each event becomes a section with its own time limit. When a section's time runs out, the exam moves on to the next one.")
+
+    if load_questions():
+        all_events = load_questions().index['events']
+        tournament_events = st.multiselect("Events, in section order:", options=list(all_events), default=list(all_events))
+        questions_per_section = st.number_input("Questions per section:", min_value=1, max_value=100, value=20)
+        minutes_per_section = st.number_input("Minutes per section:", min_value=1, max_value=120, value=25)
+        st.session_state.sampler_strategy = st.selectbox(
+            "Question selection:",
+            options=list(STRATEGIES),
+            index=list(STRATEGIES).index(st.session_state.sampler_strategy),
+        )
+        st.button("Start Tournament", use_container_width=True, disabled=not tournament_events, on_click=start_tournament, args=(tournament_events, questions_per_section, minutes_per_section))
     else:
         st.warning("No question data found.")
+    st.button("Back to Events", on_click=return_to_event_selection)
 
-elif not st.session_state.questions_list:
+elif not st.session_state.drill.questions_list:
     # Mode and Topic Selection
-    st.header(f"Select Mode and Topics for {st.session_state.event} 📚")
+    st.header(f"Select Mode and Topics for {st.session_state.drill.event} 📚")
     
-    st.session_state.mode = st.radio(
+    st.session_state.drill.mode = st.radio(
         "Choose your drill mode:",
-        options=["Study Mode", "Timed Drill"],
+        options=["Study Mode", "Timed Drill", "Spaced Review", "Adaptive"],
         index=0,
     )
 
-    if st.session_state.questions_data:
-        topics = sorted(list(set(q['topic'] for q in st.session_state.questions_data if q['event'] == st.session_state.event)))
+    if st.session_state.drill.mode == "Spaced Review":
+        review_queue = st.session_state.review_queues.get(st.session_state.drill.event, ReviewQueue())
+        due_count = len(review_queue.due(time.time(), limit=st.session_state.drill_size))
+        st.caption(f"{due_count}{'+' if due_count == st.session_state.drill_size else ''} review(s) due now out of {len(review_queue)} card(s). Due reviews come from every topic in this event; new questions fill the rest of the drill.")
+        if not due_count and len(review_queue):
+            st.caption(f"Next review due {time.strftime('%b %d, %H:%M', time.localtime(review_queue.next_due_at()))}.")
+    elif st.session_state.drill.mode == "Adaptive":
+        st.caption("Each question is picked after your last answer: harder after right answers, easier after misses, per topic.")
+
+    # Only real bank events get topics, drill settings and a practice pack
+    if load_questions() and st.session_state.drill.event in load_questions().index['topics']:
+        topics = get_event_topics(st.session_state.drill.event)
         
-        st.session_state.selected_topics = st.multiselect(
+        st.session_state.drill.selected_topics = st.multiselect(
             "Choose one or more topics:",
-            options=["All of the Above"] + topics,
+            options=["All of the Above"] + list(topics),
             default=["All of the Above"]
         )
+
+        with st.expander("Drill Settings"):
+            st.session_state.sampler_strategy = st.selectbox(
+                "Question selection:",
+                options=list(STRATEGIES),
+                index=list(STRATEGIES).index(st.session_state.sampler_strategy),
+                help="uniform: any question; difficulty-stratified: a spread of Easy/Medium/Hard; weighted-misses: favors questions you got wrong; unseen-first: avoids repeats until a topic is used up",
+            )
+            st.session_state.per_topic_cap = st.number_input("Questions per topic:", min_value=1, max_value=50, value=st.session_state.per_topic_cap)
+            st.session_state.drill_size = st.number_input("Questions per drill:", min_value=1, max_value=100, value=st.session_state.drill_size)
+
+        with st.expander("Offline Practice Pack"):
+            st.caption("Download these topics as a single web page that works without internet: it grades answers and keeps time in the browser. Its exported results can be imported on the home page under your Student ID.")
+            pack_minutes = st.number_input("Timer minutes (0 for none):", min_value=0, max_value=180, value=0, key="pack_minutes")
+            st.download_button(
+                "Download Offline Practice Pack",
+                data=offline_pack_renderer(st.session_state.drill.event, st.session_state.drill.selected_topics, pack_minutes),
+                file_name=f"SciOly_{st.session_state.drill.event.replace(' ', '_')}_Practice_Pack.html",
+                mime="text/html",
+                on_click="ignore",
+                use_container_width=True,
+            )
         
         if st.button("Start Drill", use_container_width=True, on_click=start_drill):
             pass
@@ -388,47 +1034,40 @@ elif not st.session_state.questions_list:
         st.button("Back to Events", on_click=return_to_event_selection)
 
 else:
-    # Practice Mode (Study Mode or Timed Drill)
-    st.header(f"Practice Mode: {st.session_state.event} ({st.session_state.mode}) ✨")
+    # Practice Mode (Study Mode, Timed Drill or Mock Tournament)
+    if st.session_state.drill.mode == "Mock Tournament":
+        st.header(f"{TOURNAMENT_EVENT} 🏆")
+    else:
+        st.header(f"Practice Mode: {st.session_state.drill.event} ({st.session_state.drill.mode}) ✨")
     
     # Conditional logic for Exit Confirmation
-    if st.session_state.show_exit_confirmation:
+    if st.session_state.drill.show_exit_confirmation:
         with st.container(border=True):
             st.warning("Are you sure you want to exit? Your current progress will be lost.")
             col1, col2 = st.columns(2)
             with col1:
                 st.button("❌ Exit", on_click=return_to_event_selection, use_container_width=True)
             with col2:
-                st.button("✅ Stay", on_click=lambda: st.session_state.update(show_exit_confirmation=False), use_container_width=True)
+                st.button("✅ Stay", on_click=hide_exit_confirmation, use_container_width=True)
     else:
         # Display cheat sheet if the user has opted to view it
-        if st.session_state.show_cheat_sheet:
+        if st.session_state.drill.show_cheat_sheet:
             st.subheader("Current Cheat Sheet")
-            if st.session_state.incorrect_questions:
-                cheat_sheet_text = ""
-                for q_data in st.session_state.incorrect_questions:
-                    phrase = generate_cheat_sheet_phrase(q_data)
-                    cheat_sheet_text += f"- {phrase}\n\n"
-                    
-                st.text_area("Cheat Sheet Content", value=cheat_sheet_text, height=400, disabled=True)
+            if st.session_state.drill.cheat_sheet:
+                cheat_sheet = st.session_state.drill.cheat_sheet
+                render_span = profiling.span("cheat_sheet_render")
+                st.text_area("Cheat Sheet Content", value=cheat_sheet.render('txt'), height=400, disabled=True)
                 
-                st.download_button(
-                    label="Download as Plain Text (.txt)",
-                    data=cheat_sheet_text,
-                    file_name=f"SciOly_{st.session_state.event}_CheatSheet.txt",
-                    mime="text/plain"
-                )
-
-                markdown_content = ""
-                for q_data in st.session_state.incorrect_questions:
-                    markdown_content += f"- {generate_cheat_sheet_phrase(q_data)}\n\n"
-                    
-                st.download_button(
-                    label="Download as Markdown (.md)",
-                    data=markdown_content,
-                    file_name=f"SciOly_{st.session_state.event}_CheatSheet.md",
-                    mime="text/markdown"
-                )
+                # Downloads are streamed only when their button is clicked
+                for fmt, (extension, mime, label) in FORMATS.items():
+                    suffix = "_ByTopic" if fmt == 'topics' else ""
+                    st.download_button(
+                        label=label,
+                        data=cheat_sheet.download(fmt),
+                        file_name=f"SciOly_{st.session_state.drill.event}_CheatSheet{suffix}.{extension}",
+                        mime=mime
+                    )
+                render_span.stop()
 
             else:
                 st.info("Your cheat sheet is empty. Keep going!")
@@ -437,58 +1076,66 @@ else:
                 pass
                 
         # Display current question if not showing cheat sheet
-        elif st.session_state.questions_list and st.session_state.current_question_index < len(st.session_state.questions_list):
-            question_data = st.session_state.questions_list[st.session_state.current_question_index]
+        elif st.session_state.drill.questions_list and st.session_state.drill.current_question_index < len(st.session_state.drill.questions_list):
+            prepared = prepared_question(st.session_state.drill.questions_list[st.session_state.drill.current_question_index])
+            question_data = prepared['data']
             
-            progress_percentage = (st.session_state.current_question_index + 1) / len(st.session_state.questions_list)
-            st.progress(progress_percentage, text=f"Question {st.session_state.current_question_index + 1} of {len(st.session_state.questions_list)}")
+            progress_percentage = (st.session_state.drill.current_question_index + 1) / drill_length()
+            st.progress(progress_percentage, text=f"Question {st.session_state.drill.current_question_index + 1} of {drill_length()}")
             
+            section = current_section()
+            if section is not None:
+                section_number = st.session_state.drill.tournament_sections.index(section) + 1
+                st.caption(f"Section {section_number} of {len(st.session_state.drill.tournament_sections)}: {section[0]} "
+                           f"(question {st.session_state.drill.current_question_index - section[1] + 1} of {section[2] - section[1]}, {section[3] // 60:g} minutes)")
+
             st.subheader(f"Topic: {question_data['topic']}")
+            if st.session_state.drill.mode == "Adaptive":
+                ability = st.session_state.topic_abilities.get((question_data['event'], question_data['topic']), Ability())
+                st.caption(f"Your rating in this topic: {ability.rating:.0f} · {question_data['difficulty'] if isinstance(question_data['difficulty'], str) else 'Unrated'} question")
             
             # Timed Drill Timer
-            if st.session_state.mode == "Timed Drill" and not st.session_state.awaiting_action_after_incorrect:
-                time_left = st.session_state.timer_end_time - time.time()
+            if st.session_state.drill.mode in TIMED_MODES and not st.session_state.drill.awaiting_action_after_incorrect:
+                time_left = st.session_state.drill.timer_end_time - time.time()
                 
                 if time_left <= 0:
-                    st.session_state.current_question_index = len(st.session_state.questions_list)
+                    end_timed_drill()
                     st.rerun()
                 else:
-                    minutes, seconds = divmod(int(time_left), 60)
-                    timer_class = "timer-text-red" if time_left <= 30 else "timer-text-green"
-                    st.markdown(f'<div class="{timer_class}">{minutes:02d}:{seconds:02d}</div>', unsafe_allow_html=True)
+                    render_drill_timer(time_left)
 
-            st.write(f"**Question:** {question_data['question']}")
+            st.write(prepared['prompt'])
+            render_question_image(prepared)
             
             # Display hint if it has been revealed (and only if it's not a correct answer)
-            if st.session_state.hint_revealed and st.session_state.last_answer_state != 'correct' and 'hint' in question_data and pd.notna(question_data['hint']):
-                st.info(f"Hint: {question_data['hint']}")
+            if st.session_state.drill.hint_revealed and st.session_state.drill.last_answer_state != 'correct' and prepared['hint']:
+                st.info(f"Hint: {prepared['hint']}")
 
             # Determine widget based on question type
-            if question_data['type'] == 'multiple-choice':
-                st.session_state.user_answer = st.radio("Your answer:", question_data['options'], index=None)
-            elif question_data['type'] == 'true/false':
-                st.session_state.user_answer = st.radio("Your answer:", ['True', 'False'], index=None)
-            elif question_data['type'] == 'short-answer':
-                st.session_state.user_answer = st.text_input("Your answer:")
+            if prepared['choices'] is not None:
+                st.session_state.drill.user_answer = st.radio("Your answer:", prepared['choices'], index=None, key=f"answer_{st.session_state.drill.widget_key}")
+            else:
+                st.session_state.drill.user_answer = st.text_input("Your answer:", key=f"answer_{st.session_state.drill.widget_key}")
             
             # UI for answering the question
-            if not st.session_state.show_answer and not st.session_state.awaiting_action_after_incorrect:
-                if st.button("Check Answer", use_container_width=True, disabled=st.session_state.user_answer is None, on_click=check_answer_callback):
+            if not st.session_state.drill.show_answer and not st.session_state.drill.awaiting_action_after_incorrect:
+                if st.button("Check Answer", use_container_width=True, disabled=st.session_state.drill.user_answer is None, on_click=check_answer_callback):
                     pass
             
             # Check if this is the last question
-            is_last_question = st.session_state.current_question_index + 1 == len(st.session_state.questions_list)
+            is_last_question = st.session_state.drill.current_question_index + 1 == drill_length()
             next_button_label = "View Summary" if is_last_question else "Next Question"
             
             # UI for correct answer
-            if st.session_state.last_answer_state == 'correct':
+            if st.session_state.drill.last_answer_state == 'correct':
                 st.success("✅ Correct!")
-                if 'explanation' in question_data and pd.notna(question_data['explanation']):
-                    st.info(f"Explanation: {question_data['explanation']}")
+                if prepared['explanation']:
+                    st.info(f"Explanation: {prepared['explanation']}")
                 st.button(next_button_label, use_container_width=True, on_click=next_question)
+                prefetch_next_question()
                 
             # UI for incorrect answer, awaiting user action
-            elif st.session_state.awaiting_action_after_incorrect:
+            elif st.session_state.drill.awaiting_action_after_incorrect:
                 st.error("❌ Incorrect. Would you like to try again with a hint or reveal the answer?")
                 col1, col2 = st.columns(2)
                 with col1:
@@ -497,46 +1144,40 @@ else:
                     st.button("Reveal Answer", use_container_width=True, on_click=reveal_answer)
             
             # UI for revealed answer after incorrect action
-            elif st.session_state.show_answer and st.session_state.last_answer_state == 'incorrect':
-                if st.session_state.hint_revealed and 'hint' in question_data and pd.notna(question_data['hint']):
-                    st.info(f"Hint: {question_data['hint']}")
+            elif st.session_state.drill.show_answer and st.session_state.drill.last_answer_state == 'incorrect':
+                if st.session_state.drill.hint_revealed and prepared['hint']:
+                    st.info(f"Hint: {prepared['hint']}")
                 
                 st.error(f"❌ Incorrect. The correct answer is: **{question_data['answer']}**")
                 st.info("Question has been added to cheat sheet for review.")
                 
-                if 'explanation' in question_data and pd.notna(question_data['explanation']):
-                    st.info(f"Explanation: {question_data['explanation']}")
+                if prepared['explanation']:
+                    st.info(f"Explanation: {prepared['explanation']}")
                 st.button(next_button_label, use_container_width=True, on_click=next_question)
+                prefetch_next_question()
             
             st.markdown("---")
 
-            # Rerun the script only if the timer is still active and a choice hasn't been made
-            if st.session_state.mode == "Timed Drill" and not st.session_state.awaiting_action_after_incorrect:
-                time_left = st.session_state.timer_end_time - time.time()
-                if time_left > 0:
-                    time.sleep(1)
-                    st.rerun()
-
         else:
             # End of Drill screen
             st.header("Drill Complete! 🎉")
-            st.write(f"Fantastic job! You've successfully completed the practice drill for **{st.session_state.event}**.")
+            st.write(f"Fantastic job! You've successfully completed the practice drill for **{st.session_state.drill.event}**.")
 
             # Overall Summary
             st.subheader("Drill Summary")
-            if st.session_state.attempted_questions > 0:
-                accuracy = (st.session_state.score / st.session_state.attempted_questions) * 100
-                st.write(f"You answered **{st.session_state.score}** out of **{st.session_state.attempted_questions}** questions correctly, for an overall accuracy of **{accuracy:.2f}%**.")
-                st.write(f"You used hints **{st.session_state.hints_used}** time(s).")
+            if st.session_state.drill.attempted_questions > 0:
+                accuracy = (st.session_state.drill.score / st.session_state.drill.attempted_questions) * 100
+                st.write(f"You answered **{st.session_state.drill.score}** out of **{st.session_state.drill.attempted_questions}** questions correctly, for an overall accuracy of **{accuracy:.2f}%**.")
+                st.write(f"You used hints **{st.session_state.drill.hints_used}** time(s).")
             else:
                 accuracy = 0
                 st.write("You didn't answer any questions during this session.")
             
             # Topic-by-topic summary with a bar chart
-            if st.session_state.topic_stats:
+            if st.session_state.drill.topic_stats:
                 st.subheader("Performance by Topic")
                 # Display text details below the chart
-                for topic, stats in st.session_state.topic_stats.items():
+                for topic, stats in st.session_state.drill.topic_stats.items():
                     if stats['attempted'] > 0:
                         topic_accuracy = (stats['correct'] / stats['attempted']) * 100
                         st.markdown(f"- **{topic}**: {stats['correct']} of {stats['attempted']} correct ({topic_accuracy:.2f}%)")
@@ -557,25 +1198,11 @@ else:
             if st.button("Start a New Drill", on_click=return_to_event_selection, use_container_width=True):
                 pass
             
-    # Sidebar UI elements
-    with st.sidebar:
-        st.header("Progress")
-        st.write(f"**Score:** {st.session_state.score}")
-        st.write(f"**Attempted:** {st.session_state.attempted_questions}")
-        if st.session_state.attempted_questions > 0:
-            accuracy = (st.session_state.score / st.session_state.attempted_questions) * 100
-            st.write(f"**Accuracy:** {accuracy:.2f}%")
-        
-        # "View Cheat Sheet" button
-        if st.button("View Cheat Sheet", use_container_width=True, help="View all incorrect questions so far", on_click=toggle_cheat_sheet, args=(True,)):
-            pass
+    render_sidebar()
 
-        st.markdown("---")
-    
-        if st.button("Reset Current Drill", use_container_width=True, help="Clear all progress for this event", on_click=reset_practice_session):
-            pass
+# Admin-only profiling panel, shown on every page
+if profiling.ENABLED and is_admin():
+    with st.sidebar:
+        render_profiling_panel()
 
-        if st.session_state.questions_list and st.session_state.current_question_index / len(st.session_state.questions_list) > 0.5:
-            st.button("Exit Drill", key="exit_drill_button", on_click=show_exit_confirmation, use_container_width=True, help="End the current drill and return to event selection")
-        else:
-            st.button("Exit Drill", key="exit_drill_button", on_click=return_to_event_selection, use_container_width=True, help="End the current drill and return to event selection")
+rerun_span.stop()
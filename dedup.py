@@ -0,0 +1,193 @@
+"""
+Duplicate detection for the question bank.
+
+Exact duplicates share a question key (see question_bank.question_keys).
+Near duplicates are found with MinHash signatures over word shingles and
+locality-sensitive hashing: only questions that agree on a whole band of
+their signature are compared, so the pass stays close to linear in the
+size of the bank instead of comparing every pair.
+
+    python dedup.py questions_full.csv
+"""
+import argparse
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# MinHash/LSH parameters: 16 bands of 4 rows put the LSH threshold near 0.5,
+# well below SIMILARITY_THRESHOLD, so few true near duplicates are missed
+NUM_PERMUTATIONS = 64
+BANDS = 16
+SHINGLE_SIZE = 3
+SIMILARITY_THRESHOLD = 0.8
+
+# Shingles hashed per chunk when computing signatures, to bound memory
+CHUNK_SHINGLES = 1 << 16
+# Fixed SipHash key, so shingle hashes (and the pairs found) are the same in every run
+SHINGLE_HASH_KEY = "scioly-shingles1"
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """The word n-grams of a text, joined by spaces (the whole text if it is shorter than one n-gram)."""
+    words = WORD_PATTERN.findall(str(text).lower())
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(shingle) for shingle in zip(*(words[i:] for i in range(size)))}
+
+
+def hash_shingles(shingle_sets):
+    """
+    Stable 32-bit hashes of each set's shingles, one uint64 array per set,
+    hashed in one vectorized pass with a fixed key.
+    """
+    flat = np.array([shingle for shingle_set in shingle_sets for shingle in shingle_set], dtype=object)
+    hashes = (pd.util.hash_array(flat, hash_key=SHINGLE_HASH_KEY, categorize=False) & np.uint64(0xFFFFFFFF)
+              if len(flat) else np.empty(0, dtype=np.uint64))
+    return np.split(hashes, np.cumsum([len(shingle_set) for shingle_set in shingle_sets])[:-1])
+
+
+def minhash_signatures(shingle_sets, num_permutations=NUM_PERMUTATIONS, seed=1):
+    """
+    Returns a (documents, num_permutations) uint64 array of MinHash values
+    from each document's array of shingle hashes,
+    one multiply-shift hash (a * x + b) >> 32 per permutation. Empty
+    documents get the maximum value in every slot.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 1 << 63, num_permutations, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 1 << 63, num_permutations, dtype=np.uint64)
+
+    lengths = np.fromiter((len(s) for s in shingle_sets), dtype=np.int64, count=len(shingle_sets))
+    signatures = np.full((len(shingle_sets), num_permutations), np.iinfo(np.uint64).max, dtype=np.uint64)
+    flat = np.concatenate(shingle_sets).astype(np.uint64) if len(shingle_sets) else np.empty(0, dtype=np.uint64)
+    starts = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=starts[1:])
+
+    first = 0
+    while first < len(lengths):
+        # Take whole documents until the chunk holds about CHUNK_SHINGLES shingles
+        last = max(int(np.searchsorted(starts, starts[first] + CHUNK_SHINGLES, side='right')) - 1, first + 1)
+        last = min(last, len(lengths))
+        chunk = flat[starts[first]:starts[last]]
+        if len(chunk):
+            hashed = (chunk[:, None] * a[None, :] + b[None, :]) >> np.uint64(32)
+            non_empty = np.flatnonzero(lengths[first:last])
+            offsets = starts[first:last][non_empty] - starts[first]
+            signatures[first + non_empty] = np.minimum.reduceat(hashed, offsets, axis=0)
+        first = last
+    return signatures
+
+
+def lsh_candidate_pairs(signatures, bands=BANDS):
+    """
+    Returns (anchors, members) arrays of document numbers whose signatures
+    agree on at least one whole band. Within a band bucket every member is
+    paired with the bucket's first document only, which keeps large buckets
+    linear.
+    """
+    rows_per_band = signatures.shape[1] // bands
+    multipliers = np.random.default_rng(0).integers(0, 1 << 63, rows_per_band, dtype=np.uint64) | np.uint64(1)
+    anchors, members = [], []
+    for band in range(bands):
+        columns = signatures[:, band * rows_per_band:(band + 1) * rows_per_band]
+        # One wrapping 64-bit hash per band; collisions only add candidates, which are verified later
+        band_hashes = (columns * multipliers).sum(axis=1, dtype=np.uint64)
+        order = np.argsort(band_hashes, kind='stable')
+        sorted_hashes = band_hashes[order]
+        same_as_previous = np.concatenate(([False], sorted_hashes[1:] == sorted_hashes[:-1]))
+        if not same_as_previous.any():
+            continue
+        bucket_starts = np.maximum.accumulate(np.where(same_as_previous, 0, np.arange(len(order))))
+        anchors.append(order[bucket_starts[same_as_previous]])
+        members.append(order[same_as_previous])
+    if not anchors:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(anchors), np.concatenate(members)
+
+
+def near_duplicate_pairs(texts, threshold=SIMILARITY_THRESHOLD):
+    """Returns (i, j, estimated Jaccard similarity) for texts that are near duplicates of each other, i < j."""
+    shingle_sets = [shingles(text) for text in texts]
+    candidates = np.flatnonzero([bool(s) for s in shingle_sets])
+    if len(candidates) < 2:
+        return []
+    signatures = minhash_signatures(hash_shingles([shingle_sets[i] for i in candidates]))
+
+    anchors, members = lsh_candidate_pairs(signatures)
+    similarities = (signatures[anchors] == signatures[members]).mean(axis=1)
+    close = similarities >= threshold
+    pairs = {}
+    for anchor, member, similarity in zip(candidates[anchors[close]].tolist(), candidates[members[close]].tolist(), similarities[close].tolist()):
+        i, j = sorted((anchor, member))
+        pairs[i, j] = similarity
+    return [(i, j, similarity) for (i, j), similarity in sorted(pairs.items())]
+
+
+def exact_duplicate_groups(keys):
+    """Returns the row IDs of every group of rows sharing a question key, first occurrence first."""
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1])))
+    ends = np.append(starts[1:], len(keys))
+    # Only groups of two or more rows are materialized
+    repeated = np.flatnonzero(ends - starts > 1)
+    return [order[starts[group]:ends[group]].tolist() for group in repeated.tolist()]
+
+
+def find_duplicates(keys, texts, threshold=SIMILARITY_THRESHOLD):
+    """
+    Finds exact duplicates by key and near duplicates among the remaining
+    rows. Returns a JSON-serializable report: {'exact': [[row, ...], ...],
+    'near': [[row_a, row_b, similarity], ...]}.
+    """
+    exact = exact_duplicate_groups(keys) if len(keys) else []
+    repeated = {row for group in exact for row in group[1:]}
+    rows = [row for row in range(len(keys)) if row not in repeated]
+    near = [
+        [rows[i], rows[j], round(similarity, 3)]
+        for i, j, similarity in near_duplicate_pairs([texts[row] for row in rows], threshold)
+    ]
+    return {'exact': exact, 'near': near}
+
+
+def bank_duplicates(bank):
+    """
+    A loaded bank's full duplicate report. Banks parsed straight from CSV
+    only know their exact duplicates, so the near-duplicate pass runs here.
+    """
+    if bank.duplicates['near'] is not None:
+        return bank.duplicates
+    from question_bank import question_texts
+
+    return find_duplicates(bank.keys, question_texts(pd.DataFrame({'question': bank.columns['question']}), bank.options))
+
+
+def format_report(bank, duplicates):
+    """Renders a bank's duplicate report as readable text."""
+    lines = [f"{len(bank)} questions: {len(duplicates['exact'])} exact duplicate group(s), {len(duplicates['near'])} near-duplicate pair(s)."]
+    answers = bank.columns['answer']
+    questions = bank.columns['question']
+    for group in duplicates['exact']:
+        conflicting = len({str(answers[row]) for row in group}) > 1
+        lines.append(f"\nExact duplicates (rows {', '.join(map(str, group))}){' with CONFLICTING answers' if conflicting else ''}; serving row {group[0]}:")
+        lines.append(f"  {questions[group[0]]}")
+    for row_a, row_b, similarity in duplicates['near']:
+        lines.append(f"\nNear duplicates (rows {row_a} and {row_b}, similarity {similarity:.2f}):")
+        lines.append(f"  {questions[row_a]}")
+        lines.append(f"  {questions[row_b]}")
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    from question_bank import load_bank
+
+    parser = argparse.ArgumentParser(description="Report exact and near-duplicate questions in a question bank.")
+    parser.add_argument('csv_path', nargs='?', default='questions_full.csv')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    bank = load_bank(args.csv_path)
+    print(format_report(bank, bank_duplicates(bank)))
@@ -0,0 +1,103 @@
+"""
+Per-drill session state. Everything that belongs to one drill lives on a
+single DrillState with __slots__, so a session holds one compact object
+instead of ~20 separate session keys, and every reset goes through one
+method that also bumps `generation` (used to key answer widgets, so a new
+drill or question never inherits the previous one's selection).
+"""
+
+# Field -> default, grouped by how long a value lives. Mutable defaults are built fresh on every reset.
+QUESTION_FIELDS = {
+    'show_answer': False,
+    'last_answer_state': None,
+    'hint_revealed': False,
+    'awaiting_action_after_incorrect': False,
+    'user_answer': "",
+    'show_exit_confirmation': False,
+    # The question's review card before its first grade, so a retry's grade replaces the first one instead of stacking on it
+    'review_base': None,
+}
+DRILL_FIELDS = {
+    'questions_list': list,
+    'current_question_index': 0,
+    'score': 0,
+    'attempted_questions': 0,
+    'incorrect_questions': list,
+    'cheat_sheet': None,
+    'show_cheat_sheet': False,
+    'topic_stats': dict,
+    'hints_used': 0,
+    'timer_end_time': None,
+    'start_time': None,
+    'bank_version': None,
+    'tournament_sections': list,
+}
+SELECTION_FIELDS = {
+    'event': None,
+    'mode': None,
+    'selected_topics': list,
+    # Question keys of a drill started from search results (which has no event to pick topics from)
+    'search_keys': list,
+}
+
+# Not serialized: the cheat sheet is rebuilt from incorrect_questions, the bank version is stored by number
+UNSERIALIZED_FIELDS = ('cheat_sheet', 'bank_version')
+
+
+def _default(value):
+    return value() if callable(value) else value
+
+
+class DrillState:
+    """The state of one drill: selection, questions, score, per-question flags and timers."""
+
+    __slots__ = ('generation', *SELECTION_FIELDS, *DRILL_FIELDS, *QUESTION_FIELDS)
+
+    def __init__(self):
+        self.generation = 0
+        self.reset()
+
+    def _assign(self, fields):
+        for name, default in fields.items():
+            setattr(self, name, _default(default))
+
+    def reset(self, keep_selection=False):
+        """
+        Clears the drill. With keep_selection the event, mode and search
+        results stay chosen (the topics are picked again), as when restarting
+        the same event.
+        """
+        kept = (self.event, self.mode, self.search_keys) if keep_selection else (None, None, [])
+        self._assign(SELECTION_FIELDS)
+        self._assign(DRILL_FIELDS)
+        self._assign(QUESTION_FIELDS)
+        self.event, self.mode, self.search_keys = kept
+        self.generation += 1
+
+    def start(self, questions_list):
+        """Begins a drill on questions_list, keeping the selection and score."""
+        self.questions_list = list(questions_list)
+        self.current_question_index = 0
+        self.show_cheat_sheet = False
+        self.topic_stats = {}
+        self.hints_used = 0
+        self.clear_question()
+
+    def clear_question(self):
+        """Clears the per-question flags before a new question is shown."""
+        self._assign(QUESTION_FIELDS)
+        self.generation += 1
+
+    @property
+    def widget_key(self):
+        """A key suffix unique to the current question of the current drill."""
+        return f"{self.generation}_{self.current_question_index}"
+
+    def to_dict(self):
+        """A JSON-serializable snapshot of the drill (the bank version is kept as its number)."""
+        data = {name: getattr(self, name) for name in self.__slots__ if name not in UNSERIALIZED_FIELDS}
+        data['questions_list'] = [int(row_id) for row_id in self.questions_list]
+        data['incorrect_questions'] = [int(row_id) for row_id in self.incorrect_questions]
+        data['tournament_sections'] = [list(section) for section in self.tournament_sections]
+        data['bank_version'] = self.bank_version.version if self.bank_version is not None else None
+        return data
@@ -0,0 +1,249 @@
+"""
+Tolerant grading for short-answer questions. Each answer is compiled once
+into an AnswerRule (normalized accepted forms, an optional numeric quantity
+in SI units and per-form typo budgets), so grading a click is a normalization pass
+over the student's answer plus a few set/number comparisons.
+
+Numbers are graded to the precision the answer is written with: whole
+numbers (years, counts) must match exactly, and otherwise a student's
+number may be off by half a unit in the answer's last written digit
+(9.81 accepts 9.812 but not 9.8). A student who rounds to fewer digits is
+also accepted if they keep at least three significant figures and the
+answer rounds to their number (6.02e23 for 6.022×10^23).
+
+Typos are only forgiven when the misspelling is not itself a real term:
+'alkene' is a different answer from 'alkane', not a typo of it.
+"""
+import re
+import unicodedata
+from typing import NamedTuple
+
+import numpy as np
+
+from search_index import edit_distance
+
+# Slack for floating-point error from unit conversion when comparing numbers
+FLOAT_SLACK = 1e-9
+# Fewest significant figures a student's rounded number may have to be graded at its own precision
+MIN_STUDENT_FIGURES = 3
+
+# Common equivalent answers, in normalized form; both directions are accepted
+ALIASES = {
+    'h2o': 'water',
+    'co2': 'carbon dioxide',
+    'o2': 'oxygen',
+    'nacl': 'sodium chloride',
+    'hr diagram': 'hertzsprung russell diagram',
+    'au': 'astronomical unit',
+    'ly': 'light year',
+    'pc': 'parsec',
+}
+
+# Science terms a typo of another term can land on (alkane/alkene, nitrate/nitrite),
+# in normalized form. A misspelling that spells one of these, or another answer in
+# the bank, is graded as that answer rather than forgiven as a typo.
+CONFUSABLE_TERMS = frozenset((
+    'alkane', 'alkene', 'alkyne', 'ethane', 'ethene', 'ethyne', 'propane', 'propene', 'propyne',
+    'butane', 'butene', 'butyne', 'alcohol', 'aldehyde',
+    'nitrate', 'nitrite', 'sulfate', 'sulfite', 'sulfide', 'chlorate', 'chlorite', 'chloride',
+    'phosphate', 'phosphite', 'carbonate', 'carbonite', 'hypochlorite', 'perchlorate',
+    'afferent', 'efferent', 'abduction', 'adduction', 'absorption', 'adsorption',
+    'hypertonic', 'hypotonic', 'hyperthermia', 'hypothermia', 'hyperglycemia', 'hypoglycemia',
+    'exothermic', 'endothermic', 'exergonic', 'endergonic', 'anabolism', 'catabolism',
+    'ileum', 'ilium', 'ionic', 'iconic', 'cation', 'anion', 'perigee', 'apogee',
+    'perihelion', 'aphelion', 'meteor', 'meteoroid', 'meteorite', 'cytosine', 'cytokine',
+    'thymine', 'thiamine', 'glucose', 'galactose', 'sucrose', 'fructose',
+))
+
+# Unit -> (dimension, factor to SI)
+UNITS = {
+    'm': ('length', 1.0), 'meter': ('length', 1.0), 'meters': ('length', 1.0), 'metre': ('length', 1.0), 'metres': ('length', 1.0),
+    'km': ('length', 1e3), 'kilometer': ('length', 1e3), 'kilometers': ('length', 1e3),
+    'cm': ('length', 1e-2), 'mm': ('length', 1e-3), 'nm': ('length', 1e-9),
+    'au': ('length', 1.495978707e11), 'ly': ('length', 9.4607e15), 'light year': ('length', 9.4607e15), 'light years': ('length', 9.4607e15),
+    'pc': ('length', 3.0857e16), 'parsec': ('length', 3.0857e16), 'parsecs': ('length', 3.0857e16), 'kpc': ('length', 3.0857e19), 'mpc': ('length', 3.0857e22),
+    'kg': ('mass', 1.0), 'g': ('mass', 1e-3), 'mg': ('mass', 1e-6), 'gram': ('mass', 1e-3), 'grams': ('mass', 1e-3),
+    'solar mass': ('mass', 1.989e30), 'solar masses': ('mass', 1.989e30), 'msun': ('mass', 1.989e30),
+    's': ('time', 1.0), 'sec': ('time', 1.0), 'second': ('time', 1.0), 'seconds': ('time', 1.0),
+    'min': ('time', 60.0), 'minute': ('time', 60.0), 'minutes': ('time', 60.0),
+    'h': ('time', 3600.0), 'hr': ('time', 3600.0), 'hour': ('time', 3600.0), 'hours': ('time', 3600.0),
+    'day': ('time', 86400.0), 'days': ('time', 86400.0),
+    'yr': ('time', 3.156e7), 'year': ('time', 3.156e7), 'years': ('time', 3.156e7),
+    'k': ('temperature', 1.0), 'kelvin': ('temperature', 1.0),
+    'j': ('energy', 1.0), 'kj': ('energy', 1e3), 'ev': ('energy', 1.602e-19),
+    'w': ('power', 1.0), 'kw': ('power', 1e3),
+    '%': ('ratio', 0.01), 'percent': ('ratio', 0.01),
+}
+
+NUMBER_PATTERN = re.compile(
+    r"^\s*(?P<mantissa>[-+]?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d*)?|[-+]?\.\d+)"
+    r"(?:\s*(?:e|E)\s*(?P<exp1>[-+]?\d+)|\s*(?:x|×|\*|·)\s*10\s*(?:\^|\*\*)\s*(?P<exp2>[-+]?\d+))?"
+    r"\s*(?P<unit>.*?)\s*$"
+)
+# Punctuation, except a decimal point between digits
+PUNCTUATION_PATTERN = re.compile(r"(?!(?<=\d)\.(?=\d))[^\w\s%]", re.UNICODE)
+ARTICLES = frozenset(('a', 'an', 'the'))
+SUPERSCRIPTS = str.maketrans("⁰¹²³⁴⁵⁶⁷⁸⁹⁻", "0123456789-")
+
+
+class Quantity(NamedTuple):
+    """A parsed number: its value in SI units, dimension (None for a bare number), the written unit's SI factor, the SI tolerance its precision implies and its significant figures."""
+    value: float
+    dimension: str = None
+    factor: float = 1.0
+    tolerance: float = 0.0
+    figures: int = 0
+
+
+class AnswerRule(NamedTuple):
+    """A compiled short answer: accepted normalized forms, an optional SI quantity, (form, typo budget) pairs and the real terms a typo must not spell."""
+    forms: frozenset
+    quantity: Quantity = None
+    fuzzy: tuple = ()
+    terms: frozenset = CONFUSABLE_TERMS
+
+
+def normalize(text):
+    """Lowercases, strips accents/punctuation/articles and crude plurals, and collapses whitespace."""
+    text = unicodedata.normalize('NFKC', str(text)).lower()
+    text = PUNCTUATION_PATTERN.sub(' ', text)
+    words = [word for word in text.split() if word not in ARTICLES]
+    return ' '.join(_singular(word) for word in words)
+
+
+def _singular(word):
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def parse_quantity(text):
+    """
+    Parses '6.022×10^23', '6.02e23', '1,000 km' or '5 solar masses' into a
+    Quantity. Returns None for non-numeric text or unknown units; a bare
+    number has dimension None. A whole number without an exponent has
+    tolerance 0; otherwise the tolerance is half a unit in the last digit.
+    """
+    text = unicodedata.normalize('NFKC', str(text)).translate(SUPERSCRIPTS)
+    match = NUMBER_PATTERN.match(text)
+    if not match:
+        return None
+    mantissa = match.group('mantissa').replace(',', '')
+    value = float(mantissa)
+    exponent = match.group('exp1') or match.group('exp2')
+    scale = 10.0 ** int(exponent) if exponent else 1.0
+    if '.' in mantissa or exponent:
+        decimals = len(mantissa.partition('.')[2])
+        tolerance = 0.5 * 10.0 ** -decimals * scale
+    else:
+        tolerance = 0.0
+    value *= scale
+    figures = len(re.sub(r"\D", "", mantissa).lstrip('0'))
+
+    unit = match.group('unit').strip().lower().rstrip('.')
+    if not unit:
+        return Quantity(value, None, 1.0, tolerance, figures)
+    if unit not in UNITS:
+        return None
+    dimension, factor = UNITS[unit]
+    return Quantity(value * factor, dimension, factor, tolerance * factor, figures)
+
+
+def compile_answer(answer, accepted=(), terms=CONFUSABLE_TERMS):
+    """
+    Compiles a correct answer (plus any extra accepted answers) into an
+    AnswerRule. `terms` are the real terms a forgiven typo must not spell,
+    usually answer_terms() of the whole bank.
+    """
+    forms = set()
+    for raw in (answer, *accepted):
+        if not isinstance(raw, str) or not raw.strip():
+            continue
+        form = normalize(raw)
+        forms.add(form)
+        for left, right in ALIASES.items():
+            if form == left:
+                forms.add(right)
+            elif form == right:
+                forms.add(left)
+
+    fuzzy = tuple((form, typo_budget(form)) for form in sorted(forms) if typo_budget(form))
+    return AnswerRule(frozenset(forms), parse_quantity(answer) if isinstance(answer, str) else None, fuzzy, terms)
+
+
+def typo_budget(form):
+    """Typos tolerated in an accepted form: none for short or numeric answers, up to two for long ones."""
+    if len(form) < 5 or any(char.isdigit() for char in form):
+        return 0
+    return 1 if len(form) < 10 else 2
+
+
+def quantities_match(expected, given):
+    """
+    Compares two parsed quantities within the expected answer's tolerance,
+    requiring matching units when both have one. A student's number with
+    at least MIN_STUDENT_FIGURES significant figures also matches if the
+    answer rounds to it.
+    """
+    given_value, given_tolerance = given.value, given.tolerance
+    if given.dimension is not None and expected.dimension is not None and given.dimension != expected.dimension:
+        return False
+    if given.dimension is None and expected.dimension is not None:
+        # A bare number is read in the units the answer was written in
+        given_value *= expected.factor
+        given_tolerance *= expected.factor
+    tolerance = expected.tolerance
+    if given.figures >= MIN_STUDENT_FIGURES:
+        tolerance = max(tolerance, given_tolerance)
+    slack = FLOAT_SLACK * max(abs(expected.value), abs(given_value))
+    return abs(expected.value - given_value) <= tolerance + slack
+
+
+def grade(rule, user_answer):
+    """True if the student's answer satisfies the compiled rule."""
+    if user_answer is None:
+        return False
+    if rule.quantity is not None:
+        given = parse_quantity(user_answer)
+        if given is not None:
+            return quantities_match(rule.quantity, given)
+
+    given_form = normalize(user_answer)
+    if given_form in rule.forms:
+        return True
+    if given_form in rule.terms:
+        return False
+    return any(edit_distance(given_form, form, budget) <= budget for form, budget in rule.fuzzy)
+
+
+def _accepted_answers(bank, aliases_column='accepted_answers'):
+    """Yields (row_id, answer, extra accepted answers) for every short-answer row of a QuestionBank."""
+    accepted = bank.columns.get(aliases_column)
+    for row_id in np.flatnonzero(np.asarray(bank.types) == 'short-answer').tolist():
+        extra = accepted[row_id] if accepted is not None else None
+        extra = extra.split('|') if isinstance(extra, str) else ()
+        yield row_id, bank.columns['answer'][row_id], extra
+
+
+def answer_terms(bank, aliases_column='accepted_answers'):
+    """The real terms a forgiven typo must not spell: CONFUSABLE_TERMS plus every short answer in the bank, normalized."""
+    terms = set(CONFUSABLE_TERMS)
+    for _, answer, extra in _accepted_answers(bank, aliases_column):
+        terms.update(normalize(raw) for raw in (answer, *extra) if isinstance(raw, str) and raw.strip())
+    return frozenset(terms)
+
+
+def compile_answer_rules(bank, aliases_column='accepted_answers'):
+    """
+    Compiles an AnswerRule for every short-answer row of a QuestionBank.
+    Extra accepted answers may be given in an optional '|'-separated column.
+    A typo that spells another answer in the bank is not forgiven.
+    Returns {row_id: AnswerRule}.
+    """
+    terms = answer_terms(bank, aliases_column)
+    return {
+        row_id: compile_answer(answer, extra, terms)
+        for row_id, answer, extra in _accepted_answers(bank, aliases_column)
+    }
@@ -0,0 +1,541 @@
+"""
+Offline practice packs: one self-contained HTML page per event and topic
+selection that runs drills with no server. The questions, hints,
+explanations and precompiled short-answer rules (grading.compile_answer)
+are embedded as gzip-compressed JSON; the page grades answers and keeps
+time in the browser, remembers attempts in localStorage, and exports them
+as a results file the app imports back into the progress store.
+
+    python practice_pack.py Astronomy --topic "Stellar Evolution" --topic Galaxies --minutes 20 -o astronomy_pack.html
+"""
+import argparse
+import base64
+import gzip
+import hashlib
+import html
+import json
+import logging
+import math
+import os
+
+import numpy as np
+
+from grading import FLOAT_SLACK, MIN_STUDENT_FIGURES, UNITS, answer_terms, compile_answer
+from search_index import edit_distance
+
+logger = logging.getLogger(__name__)
+
+PACK_FORMAT = "scioly-practice-pack"
+RESULTS_FORMAT = "scioly-practice-results"
+# Bumped whenever the results layout changes; older files are rejected
+RESULTS_VERSION = 1
+RESULT_OUTCOMES = ('correct', 'incorrect')
+# Longest attempt ID accepted from a results file
+MAX_ATTEMPT_ID = 64
+# Question keys are 63-bit (see question_bank.question_keys)
+MAX_QUESTION_KEY = 2**63 - 1
+
+PACK_TEMPLATE = """<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>__TITLE__</title>
+<style>
+body { font-family: system-ui, sans-serif; max-width: 44rem; margin: 1.5rem auto; padding: 0 1rem; line-height: 1.45; color: #222; }
+h1 { font-size: 1.5rem; margin-bottom: 0.2rem; }
+.muted { color: #666; font-size: 0.9rem; }
+.card { border: 1px solid #ddd; border-radius: 0.6rem; padding: 1rem 1.2rem; margin: 1rem 0; }
+button { font: inherit; padding: 0.45rem 1rem; border-radius: 0.4rem; border: 1px solid #999; background: #f4f4f4; cursor: pointer; margin: 0.3rem 0.3rem 0.3rem 0; }
+button.primary { background: #2b6cb0; border-color: #2b6cb0; color: white; }
+label.choice { display: block; padding: 0.35rem 0.2rem; }
+input[type=text], input[type=number] { font: inherit; padding: 0.35rem; }
+#timer { float: right; font-weight: bold; }
+#timer.low { color: #c53030; }
+.correct { color: #276749; font-weight: bold; }
+.incorrect { color: #c53030; font-weight: bold; }
+table { border-collapse: collapse; width: 100%; }
+td, th { border-bottom: 1px solid #eee; padding: 0.3rem; text-align: left; }
+.hidden { display: none; }
+</style></head><body>
+<h1>__TITLE__</h1>
+<p class="muted">Offline practice pack: __COUNT__ questions. Works without internet; your attempts stay in this browser until you export them.</p>
+
+<div id="start" class="card">
+  <p><label>Student ID: <input type="text" id="student"></label></p>
+  <p><label>Questions per drill: <input type="number" id="size" min="1" value="__DRILL_SIZE__"></label></p>
+  <p><label>Timer minutes (0 for none): <input type="number" id="minutes" min="0" value="__MINUTES__"></label></p>
+  <div id="topics"></div>
+  <button class="primary" id="begin">Start Drill</button>
+  <p id="history" class="muted"></p>
+  <button id="export">Export Results</button>
+  <button id="clear">Clear Saved Results</button>
+</div>
+
+<div id="drill" class="card hidden">
+  <div><span id="counter" class="muted"></span><span id="timer"></span></div>
+  <p class="muted" id="topic"></p>
+  <p><strong>Question:</strong> <span id="question"></span></p>
+  <form id="answer-form"></form>
+  <p id="hint" class="muted hidden"></p>
+  <div id="feedback" class="hidden"><p id="verdict"></p><p id="explanation"></p></div>
+  <button class="primary" id="submit">Submit Answer</button>
+  <button id="show-hint">Show Hint</button>
+  <button class="primary hidden" id="next">Next Question</button>
+  <button id="quit">End Drill</button>
+</div>
+
+<div id="summary" class="card hidden">
+  <h2>Drill Complete</h2>
+  <p id="score"></p>
+  <table id="topic-table"></table>
+  <div id="missed"></div>
+  <button class="primary" id="again">Practice Again</button>
+  <button id="export-summary">Export Results</button>
+</div>
+
+<noscript>This practice pack needs JavaScript.</noscript>
+<script type="application/octet-stream" id="pack-data">__DATA__</script>
+<script>
+"use strict";
+const ARTICLES = new Set(["a", "an", "the"]);
+const SUPERSCRIPTS = {"\\u2070": "0", "\\u00b9": "1", "\\u00b2": "2", "\\u00b3": "3", "\\u2074": "4", "\\u2075": "5", "\\u2076": "6", "\\u2077": "7", "\\u2078": "8", "\\u2079": "9", "\\u207b": "-"};
+const NUMBER_PATTERN = /^\\s*([-+]?(?:\\d{1,3}(?:,\\d{3})+|\\d+)(?:\\.\\d*)?|[-+]?\\.\\d+)(?:\\s*[eE]\\s*([-+]?\\d+)|\\s*(?:x|\\u00d7|\\*|\\u00b7)\\s*10\\s*(?:\\^|\\*\\*)\\s*([-+]?\\d+))?\\s*(.*?)\\s*$/;
+const PUNCTUATION_PATTERN = /(?!(?<=\\d)\\.(?=\\d))[^\\p{L}\\p{N}_\\s%]/gu;
+const $ = (id) => document.getElementById(id);
+
+let pack = null;
+let log = {student: "", attempts: []};
+let drill = null;
+
+// --- Grading (mirrors grading.py) ---
+function singular(word) {
+  if (word.length > 4 && word.endsWith("ies")) return word.slice(0, -3) + "y";
+  if (word.length > 3 && word.endsWith("s") && !word.endsWith("ss")) return word.slice(0, -1);
+  return word;
+}
+function normalize(text) {
+  text = String(text).normalize("NFKC").toLowerCase().replace(PUNCTUATION_PATTERN, " ");
+  return text.split(/\\s+/).filter((word) => word && !ARTICLES.has(word)).map(singular).join(" ");
+}
+function parseQuantity(text) {
+  text = String(text).normalize("NFKC").replace(/[\\u2070\\u00b9\\u00b2\\u00b3\\u2074-\\u2079\\u207b]/g, (c) => SUPERSCRIPTS[c]);
+  const match = NUMBER_PATTERN.exec(text);
+  if (!match) return null;
+  const mantissa = match[1].replace(/,/g, "");
+  const exponent = match[2] || match[3];
+  const scale = exponent ? Math.pow(10, parseInt(exponent, 10)) : 1;
+  const decimals = mantissa.includes(".") ? mantissa.split(".")[1].length : 0;
+  const tolerance = mantissa.includes(".") || exponent ? 0.5 * Math.pow(10, -decimals) * scale : 0;
+  const value = parseFloat(mantissa) * scale;
+  const figures = mantissa.replace(/\\D/g, "").replace(/^0+/, "").length;
+  const unit = match[4].trim().toLowerCase().replace(/\\.+$/, "");
+  if (!unit) return [value, null, 1, tolerance, figures];
+  if (!Object.prototype.hasOwnProperty.call(pack.units, unit)) return null;
+  const [dimension, factor] = pack.units[unit];
+  return [value * factor, dimension, factor, tolerance * factor, figures];
+}
+function quantitiesMatch(expected, given) {
+  let givenValue = given[0];
+  let givenTolerance = given[3];
+  if (given[1] !== null && expected[1] !== null && given[1] !== expected[1]) return false;
+  if (given[1] === null && expected[1] !== null) {
+    givenValue *= expected[2];
+    givenTolerance *= expected[2];
+  }
+  const tolerance = given[4] >= pack.min_student_figures ? Math.max(expected[3], givenTolerance) : expected[3];
+  const slack = pack.float_slack * Math.max(Math.abs(expected[0]), Math.abs(givenValue));
+  return Math.abs(expected[0] - givenValue) <= tolerance + slack;
+}
+function editDistance(a, b, limit) {
+  if (Math.abs(a.length - b.length) > limit) return limit + 1;
+  let before = null;
+  let previous = Array.from({length: b.length + 1}, (_, j) => j);
+  for (let i = 1; i <= a.length; i++) {
+    const current = [i];
+    for (let j = 1; j <= b.length; j++) {
+      current[j] = Math.min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] === b[j - 1] ? 0 : 1));
+      if (before && i > 1 && j > 1 && a[i - 1] === b[j - 2] && a[i - 2] === b[j - 1]) current[j] = Math.min(current[j], before[j - 2] + 1);
+    }
+    if (Math.min(...current) > limit) return limit + 1;
+    before = previous;
+    previous = current;
+  }
+  return previous[b.length];
+}
+function isCorrect(question, answer) {
+  const rule = question.rule;
+  if (!rule) return String(answer).trim().toLowerCase() === String(question.answer).trim().toLowerCase();
+  if (rule.quantity) {
+    const given = parseQuantity(answer);
+    if (given) return quantitiesMatch(rule.quantity, given);
+  }
+  const form = normalize(answer);
+  if (rule.forms.includes(form)) return true;
+  if (rule.terms.includes(form)) return false;
+  return rule.fuzzy.some(([accepted, budget]) => editDistance(form, accepted, budget) <= budget);
+}
+
+// --- Saved attempts ---
+function storageKey() { return "scioly-pack-" + pack.id; }
+function saveLog() {
+  try { localStorage.setItem(storageKey(), JSON.stringify(log)); } catch (e) { /* private browsing: keep results in memory */ }
+}
+function loadLog() {
+  try { log = JSON.parse(localStorage.getItem(storageKey())) || log; } catch (e) { /* nothing saved yet */ }
+}
+function attemptId() {
+  const bytes = crypto.getRandomValues(new Uint8Array(12));
+  return Array.from(bytes, (b) => b.toString(16).padStart(2, "0")).join("");
+}
+function exportResults() {
+  const results = {
+    format: pack.results_format, version: pack.results_version, pack: pack.id, event: pack.event,
+    student_id: $("student").value.trim(), exported_at: Date.now() / 1000, attempts: log.attempts,
+  };
+  const link = document.createElement("a");
+  link.href = URL.createObjectURL(new Blob([JSON.stringify(results)], {type: "application/json"}));
+  link.download = "scioly_results_" + pack.event.replace(/\\W+/g, "_") + "_" + new Date().toISOString().slice(0, 10) + ".json";
+  document.body.append(link);
+  link.click();
+  link.remove();
+  setTimeout(() => URL.revokeObjectURL(link.href), 1000);
+}
+function showHistory() {
+  const correct = log.attempts.filter((attempt) => attempt.outcome === "correct").length;
+  $("history").textContent = log.attempts.length
+    ? log.attempts.length + " saved attempt(s), " + correct + " correct. Export them to import into the app."
+    : "No saved attempts yet.";
+}
+
+// --- Drill ---
+function shuffle(items) {
+  for (let i = items.length - 1; i > 0; i--) {
+    const j = Math.floor(Math.random() * (i + 1));
+    [items[i], items[j]] = [items[j], items[i]];
+  }
+  return items;
+}
+function startDrill() {
+  const topics = new Set(Array.from(document.querySelectorAll("#topics input:checked"), (box) => box.value));
+  const seen = new Set(log.attempts.map((attempt) => attempt.key));
+  const pool = shuffle(pack.questions.filter((question) => topics.has(question.topic)));
+  // Unseen questions first, then the rest
+  pool.sort((a, b) => seen.has(a.key) - seen.has(b.key));
+  const size = Math.max(1, parseInt($("size").value, 10) || pack.drill_size);
+  const minutes = Math.max(0, parseFloat($("minutes").value) || 0);
+  log.student = $("student").value.trim();
+  saveLog();
+  drill = {questions: pool.slice(0, size), index: 0, score: 0, answered: 0, missed: [], topics: {}, end: minutes ? Date.now() + minutes * 60000 : null};
+  if (!drill.questions.length) return;
+  $("start").classList.add("hidden");
+  $("summary").classList.add("hidden");
+  $("drill").classList.remove("hidden");
+  showQuestion();
+  tick();
+}
+function showQuestion() {
+  const question = drill.questions[drill.index];
+  drill.hinted = false;
+  drill.done = false;
+  $("counter").textContent = "Question " + (drill.index + 1) + " of " + drill.questions.length + " \\u00b7 Score " + drill.score;
+  $("topic").textContent = question.topic + (question.difficulty ? " \\u00b7 " + question.difficulty : "");
+  $("question").textContent = question.question;
+  const form = $("answer-form");
+  form.replaceChildren();
+  if (question.options.length) {
+    question.options.forEach((option, position) => {
+      const label = document.createElement("label");
+      label.className = "choice";
+      const input = document.createElement("input");
+      Object.assign(input, {type: "radio", name: "answer", value: option, id: "option-" + position});
+      label.append(input, " " + option);
+      form.append(label);
+    });
+  } else {
+    const input = document.createElement("input");
+    Object.assign(input, {type: "text", name: "answer", size: 40, autocomplete: "off"});
+    form.append(input);
+    input.focus();
+  }
+  $("hint").textContent = question.hint ? "Hint: " + question.hint : "";
+  $("hint").classList.add("hidden");
+  $("show-hint").classList.toggle("hidden", !question.hint);
+  $("feedback").classList.add("hidden");
+  $("submit").classList.remove("hidden");
+  $("next").classList.add("hidden");
+}
+function submitAnswer(event) {
+  if (event) event.preventDefault();
+  if (drill.done) return;
+  const question = drill.questions[drill.index];
+  const chosen = question.options.length ? document.querySelector("#answer-form input:checked") : document.querySelector("#answer-form input");
+  if (!chosen || !chosen.value.trim()) return;
+  const correct = isCorrect(question, chosen.value);
+  drill.done = true;
+  drill.answered += 1;
+  drill.score += correct ? 1 : 0;
+  const stats = drill.topics[question.topic] || (drill.topics[question.topic] = [0, 0]);
+  stats[0] += 1;
+  stats[1] += correct ? 1 : 0;
+  if (!correct) drill.missed.push(question);
+  log.attempts.push({id: attemptId(), key: question.key, outcome: correct ? "correct" : "incorrect", hint_used: drill.hinted, answered_at: Date.now() / 1000});
+  saveLog();
+
+  $("verdict").textContent = correct ? "\\u2705 Correct!" : "\\u274c Incorrect. The correct answer is: " + question.answer;
+  $("verdict").className = correct ? "correct" : "incorrect";
+  $("explanation").textContent = question.explanation ? "Explanation: " + question.explanation : "";
+  $("feedback").classList.remove("hidden");
+  $("submit").classList.add("hidden");
+  $("show-hint").classList.add("hidden");
+  $("next").classList.remove("hidden");
+}
+function nextQuestion() {
+  drill.index += 1;
+  if (drill.index >= drill.questions.length) finishDrill();
+  else showQuestion();
+}
+function finishDrill() {
+  if (!drill) return;
+  $("drill").classList.add("hidden");
+  $("summary").classList.remove("hidden");
+  $("score").textContent = "Score: " + drill.score + " of " + drill.answered + " answered" + (drill.answered ? " (" + (100 * drill.score / drill.answered).toFixed(1) + "%)" : "") + ".";
+  const table = $("topic-table");
+  table.replaceChildren();
+  const header = table.insertRow();
+  ["Topic", "Correct", "Answered"].forEach((text) => { const cell = document.createElement("th"); cell.textContent = text; header.append(cell); });
+  Object.entries(drill.topics).forEach(([topic, [answered, correct]]) => {
+    const row = table.insertRow();
+    [topic, correct, answered].forEach((text) => { row.insertCell().textContent = text; });
+  });
+  const missed = $("missed");
+  missed.replaceChildren();
+  if (drill.missed.length) {
+    const title = document.createElement("h3");
+    title.textContent = "Review These";
+    missed.append(title);
+    drill.missed.forEach((question) => {
+      const item = document.createElement("p");
+      item.textContent = question.question + " \\u2192 " + question.answer + (question.explanation ? " (" + question.explanation + ")" : "");
+      missed.append(item);
+    });
+  }
+  drill = null;
+  showHistory();
+}
+function tick() {
+  if (!drill || !drill.end) { $("timer").textContent = ""; return; }
+  const left = Math.max(0, Math.round((drill.end - Date.now()) / 1000));
+  $("timer").textContent = "\\u23f1 " + Math.floor(left / 60) + ":" + String(left % 60).padStart(2, "0");
+  $("timer").classList.toggle("low", left <= 60);
+  if (left === 0) finishDrill();
+  else setTimeout(tick, 1000);
+}
+
+async function loadPack() {
+  const bytes = Uint8Array.from(atob($("pack-data").textContent.trim()), (c) => c.charCodeAt(0));
+  const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("gzip"));
+  return JSON.parse(await new Response(stream).text());
+}
+loadPack().then((data) => {
+  pack = data;
+  loadLog();
+  $("student").value = log.student;
+  const topics = $("topics");
+  pack.topics.forEach((topic) => {
+    const label = document.createElement("label");
+    label.className = "choice";
+    const box = Object.assign(document.createElement("input"), {type: "checkbox", value: topic, checked: true});
+    label.append(box, " " + topic);
+    topics.append(label);
+  });
+  showHistory();
+  $("begin").onclick = startDrill;
+  $("answer-form").onsubmit = submitAnswer;
+  $("submit").onclick = () => submitAnswer();
+  $("show-hint").onclick = () => { drill.hinted = true; $("hint").classList.remove("hidden"); };
+  $("next").onclick = nextQuestion;
+  $("quit").onclick = finishDrill;
+  $("again").onclick = () => { $("summary").classList.add("hidden"); $("start").classList.remove("hidden"); };
+  $("export").onclick = exportResults;
+  $("export-summary").onclick = exportResults;
+  $("clear").onclick = () => {
+    if (confirm("Delete the attempts saved in this browser? Export them first if you have not imported them yet.")) {
+      log.attempts = [];
+      saveLog();
+      showHistory();
+    }
+  };
+}).catch(() => {
+  $("start").textContent = "This browser cannot open the practice pack; please use a recent Chrome, Edge, Firefox or Safari.";
+});
+</script>
+</body></html>
+"""
+
+
+def _text(value):
+    # Missing values come back as None or NaN depending on the storage format
+    return value if isinstance(value, str) else ''
+
+
+def pack_rows(index, event_name, topics):
+    """Every served row of the chosen topics of an event, in row order."""
+    topic_rows = index['topic_rows'].get(event_name, {})
+    rows = [topic_rows[topic] for topic in topics if topic in topic_rows]
+    return np.sort(np.concatenate(rows)) if rows else np.empty(0, dtype=np.int64)
+
+
+def rule_data(rule):
+    """
+    An AnswerRule as plain JSON: normalized forms, an optional [SI value,
+    dimension, unit factor, tolerance, significant figures], [form, typo
+    budget] pairs, and the real terms within typo range of a fuzzy form.
+    """
+    return {
+        'forms': sorted(rule.forms),
+        'quantity': list(rule.quantity) if rule.quantity is not None else None,
+        'fuzzy': [list(pair) for pair in rule.fuzzy],
+        'terms': sorted(
+            term for term in rule.terms
+            if term not in rule.forms and any(edit_distance(term, form, budget) <= budget for form, budget in rule.fuzzy)
+        ),
+    }
+
+
+def pack_data(bank, event_name, topics, minutes=0, drill_size=10):
+    """
+    Collects everything a practice pack needs: the questions of the chosen
+    topics (keyed by their stable question key, as a string so JavaScript
+    keeps every digit), compiled short-answer rules, and the unit table.
+    """
+    accepted = bank.columns.get('accepted_answers')
+    terms = answer_terms(bank)
+    questions = []
+    for row_id in pack_rows(bank.index, event_name, topics).tolist():
+        question_data = bank.question(row_id)
+        options = question_data['options'] if question_data['type'] == 'multiple-choice' else (
+            ['True', 'False'] if question_data['type'] == 'true/false' else [])
+        rule = None
+        if question_data['type'] == 'short-answer':
+            extra = _text(accepted[row_id]).split('|') if accepted is not None and _text(accepted[row_id]) else ()
+            rule = rule_data(compile_answer(question_data['answer'], extra, terms))
+        questions.append({
+            'key': str(int(bank.keys[row_id])),
+            'topic': question_data['topic'],
+            'difficulty': _text(question_data['difficulty']),
+            'question': _text(question_data['question']),
+            'options': options,
+            'answer': _text(question_data['answer']),
+            'hint': _text(question_data['hint']),
+            'explanation': _text(question_data['explanation']),
+            'rule': rule,
+        })
+    return {
+        'format': PACK_FORMAT,
+        'event': event_name,
+        'topics': [topic for topic in topics if topic in bank.index['topic_rows'].get(event_name, {})],
+        'minutes': minutes,
+        'drill_size': drill_size,
+        'units': {unit: list(spec) for unit, spec in UNITS.items()},
+        'float_slack': FLOAT_SLACK,
+        'min_student_figures': MIN_STUDENT_FIGURES,
+        'results_format': RESULTS_FORMAT,
+        'results_version': RESULTS_VERSION,
+        'questions': questions,
+    }
+
+
+def render_pack(bank, event_name, topics, minutes=0, drill_size=10, title=None):
+    """
+    Renders a practice pack as a single HTML page. The pack's ID is a hash
+    of its questions, so the same selection from the same bank always gets
+    the same ID (and the page finds its saved attempts again).
+    """
+    data = pack_data(bank, event_name, topics, minutes, drill_size)
+    data['id'] = hashlib.sha256(json.dumps([event_name, data['questions']], sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    payload = base64.b64encode(gzip.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'), mtime=0)).decode('ascii')
+    title = title or f"{event_name} Practice Pack"
+    replacements = {
+        '__TITLE__': html.escape(title),
+        '__COUNT__': str(len(data['questions'])),
+        '__DRILL_SIZE__': str(int(drill_size)),
+        '__MINUTES__': f"{minutes:g}",
+        '__DATA__': payload,
+    }
+    page = PACK_TEMPLATE
+    for placeholder, value in replacements.items():
+        page = page.replace(placeholder, value)
+    return page
+
+
+def read_results(data, student_id=None):
+    """
+    Parses a results file exported by a practice pack. Returns a dict with
+    the pack ID, event, student ID and a list of attempts, each with its
+    ID, question key, outcome, hint use and time. Raises ValueError for
+    anything that is not a valid results file, and, when `student_id` is
+    given, for a file exported under a different Student ID.
+    """
+    try:
+        results = json.loads(data)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"not a JSON file ({e})") from None
+    if not isinstance(results, dict) or results.get('format') != RESULTS_FORMAT:
+        raise ValueError("not a practice pack results file")
+    if results.get('version') != RESULTS_VERSION:
+        raise ValueError(f"results version {results.get('version')!r} is not supported; expected {RESULTS_VERSION}")
+    exported_by = str(results.get('student_id') or '').strip()
+    if student_id is not None and exported_by and exported_by != student_id:
+        raise ValueError(f"it was exported under Student ID {exported_by!r}, not {student_id!r}")
+    attempts = []
+    for position, attempt in enumerate(results.get('attempts') or [], start=1):
+        try:
+            attempt_id = str(attempt['id'])
+            answered_at = float(attempt['answered_at'])
+            parsed = {
+                'id': attempt_id,
+                'key': int(attempt['key']),
+                'outcome': attempt['outcome'],
+                'hint_used': bool(attempt.get('hint_used')),
+                'answered_at': answered_at,
+            }
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"attempt {position} is malformed") from None
+        if (parsed['outcome'] not in RESULT_OUTCOMES or not 0 < len(attempt_id) <= MAX_ATTEMPT_ID or not math.isfinite(answered_at)
+                or not 0 <= parsed['key'] <= MAX_QUESTION_KEY):
+            raise ValueError(f"attempt {position} is malformed")
+        attempts.append(parsed)
+    return {
+        'pack': str(results.get('pack', '')),
+        'event': str(results.get('event', '')),
+        'student_id': exported_by,
+        'attempts': attempts,
+    }
+
+
+def main():
+    from question_bank import load_bank
+
+    parser = argparse.ArgumentParser(description="Export an offline HTML practice pack for an event.")
+    parser.add_argument('event')
+    parser.add_argument('--topic', action='append', help="Topic to include; repeat for several (default: every topic)")
+    parser.add_argument('--questions', default=os.environ.get("SCIOLY_QUESTIONS_PATH", "questions_full.csv"))
+    parser.add_argument('--minutes', type=float, default=0, help="Default drill timer (0 for none)")
+    parser.add_argument('--drill-size', type=int, default=10, help="Default questions per drill")
+    parser.add_argument('--title')
+    parser.add_argument('-o', '--output', help="Output file (default: <event>_practice_pack.html)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    bank = load_bank(args.questions)
+    if args.event not in bank.index['topics']:
+        parser.error(f"unknown event {args.event!r}; the bank has {', '.join(bank.index['events'])}")
+    topics = args.topic or list(bank.index['topics'][args.event])
+    page = render_pack(bank, args.event, topics, args.minutes, args.drill_size, args.title)
+    output = args.output or f"{args.event.replace(' ', '_')}_practice_pack.html"
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write(page)
+    logger.info("Wrote %s (%.0f KB)", output, len(page.encode('utf-8')) / 1024)
+
+
+if __name__ == '__main__':
+    main()
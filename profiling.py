@@ -0,0 +1,149 @@
+"""
+Opt-in hot-path instrumentation. Set SCIOLY_PROFILE=1 to record timings and
+allocated-block deltas of named spans into a process-wide ring buffer;
+when it is unset every span is a shared no-op.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED = os.environ.get("SCIOLY_PROFILE", "") not in ("", "0")
+BUFFER_SIZE = int(os.environ.get("SCIOLY_PROFILE_BUFFER", "10000"))
+
+# (name, started_at, duration_ms, allocated_blocks) tuples, oldest dropped first
+_records = deque(maxlen=BUFFER_SIZE)
+
+
+class Span:
+    """Times one named section; use as a context manager or call stop()."""
+    __slots__ = ('name', 'started_at', 'started', 'blocks')
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = time.time()
+        self.blocks = sys.getallocatedblocks()
+        self.started = time.perf_counter()
+
+    def stop(self):
+        duration_ms = (time.perf_counter() - self.started) * 1000
+        _records.append((self.name, self.started_at, duration_ms, sys.getallocatedblocks() - self.blocks))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def stop(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def span(name):
+    """Starts a span, or returns the shared no-op span when profiling is off."""
+    return Span(name) if ENABLED else NOOP_SPAN
+
+
+def records():
+    """Returns a snapshot of the ring buffer."""
+    return list(_records)
+
+
+def clear():
+    _records.clear()
+
+
+def _percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summary():
+    """Aggregates the buffer per span name: count, mean/p50/p95/max ms and mean allocated blocks."""
+    by_name = {}
+    for name, _, duration_ms, blocks in list(_records):
+        by_name.setdefault(name, ([], []))
+        by_name[name][0].append(duration_ms)
+        by_name[name][1].append(blocks)
+
+    stats = {}
+    for name, (durations, blocks) in sorted(by_name.items()):
+        ordered = sorted(durations)
+        stats[name] = {
+            'count': len(durations),
+            'mean_ms': sum(durations) / len(durations),
+            'p50_ms': _percentile(ordered, 50),
+            'p95_ms': _percentile(ordered, 95),
+            'max_ms': ordered[-1],
+            'mean_alloc_blocks': sum(blocks) / len(blocks),
+        }
+    return stats
+
+
+def prometheus_text():
+    """Renders the summary in the Prometheus text exposition format."""
+    lines = [
+        "# HELP scioly_span_duration_ms Duration of instrumented sections in milliseconds.",
+        "# TYPE scioly_span_duration_ms summary",
+    ]
+    stats = summary()
+    for name, values in stats.items():
+        for quantile, key in (('0.5', 'p50_ms'), ('0.95', 'p95_ms')):
+            lines.append(f'scioly_span_duration_ms{{span="{name}",quantile="{quantile}"}} {values[key]:.3f}')
+        lines.append(f'scioly_span_duration_ms_sum{{span="{name}"}} {values["mean_ms"] * values["count"]:.3f}')
+        lines.append(f'scioly_span_duration_ms_count{{span="{name}"}} {values["count"]}')
+    lines.append("# HELP scioly_span_alloc_blocks Mean net allocated blocks per instrumented section.")
+    lines.append("# TYPE scioly_span_alloc_blocks gauge")
+    for name, values in stats.items():
+        lines.append(f'scioly_span_alloc_blocks{{span="{name}"}} {values["mean_alloc_blocks"]:.1f}')
+    return "\n".join(lines) + "\n"
+
+
+def jsonl():
+    """Renders the raw buffer as JSON lines."""
+    return "".join(
+        json.dumps({'span': name, 'started_at': started_at, 'duration_ms': duration_ms, 'alloc_blocks': blocks}) + "\n"
+        for name, started_at, duration_ms, blocks in records()
+    )
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/metrics':
+            body, content_type = prometheus_text(), 'text/plain; version=0.0.4'
+        elif self.path == '/spans.jsonl':
+            body, content_type = jsonl(), 'application/x-ndjson'
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port, host='127.0.0.1'):
+    """Serves /metrics (Prometheus text) and /spans.jsonl from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="profiling-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,374 @@
+import atexit
+import datetime
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY,
+    student_id TEXT NOT NULL,
+    question_id INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    difficulty TEXT,
+    outcome TEXT NOT NULL,
+    hint_used INTEGER NOT NULL DEFAULT 0,
+    answered_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attempts_by_student ON attempts (student_id, answered_at);
+
+CREATE TABLE IF NOT EXISTS student_topic_stats (
+    student_id TEXT NOT NULL,
+    event TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    attempted INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    revealed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (student_id, event, topic)
+);
+
+CREATE TABLE IF NOT EXISTS review_cards (
+    student_id TEXT NOT NULL,
+    question_id INTEGER NOT NULL,
+    ease REAL NOT NULL,
+    interval_days REAL NOT NULL,
+    repetitions INTEGER NOT NULL,
+    due_at REAL NOT NULL,
+    PRIMARY KEY (student_id, question_id)
+);
+
+-- Adaptive difficulty: the latest Elo-style rating per student and topic
+CREATE TABLE IF NOT EXISTS topic_abilities (
+    student_id TEXT NOT NULL,
+    event TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    rating REAL NOT NULL,
+    answered INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (student_id, event, topic)
+);
+
+-- Attempts imported from offline practice pack results, so importing a file twice counts them once
+CREATE TABLE IF NOT EXISTS imported_attempts (
+    student_id TEXT NOT NULL,
+    attempt_id TEXT NOT NULL,
+    PRIMARY KEY (student_id, attempt_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS student_question_stats (
+    student_id TEXT NOT NULL,
+    question_id INTEGER NOT NULL,
+    attempted INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (student_id, question_id)
+);
+
+-- Daily rollups behind the coach dashboard; day is the server's local calendar date
+-- as days since 1970-01-01 (see day_number). Clustered by day, so a date range is one contiguous scan
+CREATE TABLE IF NOT EXISTS daily_topic_stats (
+    student_id TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    attempted INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    revealed INTEGER NOT NULL DEFAULT 0,
+    hints INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, student_id, event, topic, difficulty)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS daily_question_stats (
+    question_id INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    attempted INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    revealed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, question_id)
+) WITHOUT ROWID;
+"""
+
+# Aggregates are bumped in the same transaction as the raw attempt, never recomputed
+UPSERT_TOPIC_STATS = """
+INSERT INTO student_topic_stats (student_id, event, topic, attempted, correct, revealed)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (student_id, event, topic) DO UPDATE SET
+    attempted = attempted + excluded.attempted,
+    correct = correct + excluded.correct,
+    revealed = revealed + excluded.revealed
+"""
+UPSERT_QUESTION_STATS = """
+INSERT INTO student_question_stats (student_id, question_id, attempted, correct, misses)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (student_id, question_id) DO UPDATE SET
+    attempted = attempted + excluded.attempted,
+    correct = correct + excluded.correct,
+    misses = misses + excluded.misses
+"""
+UPSERT_DAILY_TOPIC_STATS = """
+INSERT INTO daily_topic_stats (student_id, day, event, topic, difficulty, attempted, correct, revealed, hints)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (day, student_id, event, topic, difficulty) DO UPDATE SET
+    attempted = attempted + excluded.attempted,
+    correct = correct + excluded.correct,
+    revealed = revealed + excluded.revealed,
+    hints = hints + excluded.hints
+"""
+UPSERT_DAILY_QUESTION_STATS = """
+INSERT INTO daily_question_stats (question_id, day, event, topic, attempted, correct, revealed)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (day, question_id) DO UPDATE SET
+    attempted = attempted + excluded.attempted,
+    correct = correct + excluded.correct,
+    revealed = revealed + excluded.revealed
+"""
+
+OUTCOMES = ('correct', 'incorrect', 'revealed')
+
+EPOCH_DATE = datetime.date(1970, 1, 1)
+
+# Columns the daily topic rollup can be grouped by
+ROLLUP_DIMENSIONS = ('student_id', 'day', 'event', 'topic', 'difficulty')
+
+
+def day_number(date):
+    """Days since 1970-01-01, the day key of the daily rollups. Attempts are filed under their local date."""
+    return (date - EPOCH_DATE).days
+
+
+def connect(path):
+    """Opens a SQLite connection in WAL mode, so readers never block the writer."""
+    connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class ProgressStore:
+    """
+    Durable per-student attempt log. Writes are queued and committed in
+    batches by a background thread, so recording an answer never waits on
+    the disk; reads go through their own connection.
+    """
+
+    def __init__(self, path, batch_size=200, flush_interval=0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._local = threading.local()
+
+        connection = connect(path)
+        connection.executescript(SCHEMA)
+        connection.close()
+
+        self._writer = threading.Thread(target=self._write_loop, name="progress-store-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _reader(self):
+        if not hasattr(self._local, 'connection'):
+            self._local.connection = connect(self.path)
+        return self._local.connection
+
+    # --- Writes ---
+    def record_attempt(self, student_id, question_id, event, topic, difficulty, outcome, hint_used=False):
+        """
+        Queues one attempt ('correct', 'incorrect' or 'revealed') and returns
+        immediately. `question_id` is the question's stable key.
+        """
+        if outcome not in OUTCOMES:
+            raise ValueError(f"Unknown outcome {outcome!r}; expected one of {OUTCOMES}.")
+        self._queue.put(('attempt', (student_id, int(question_id), event, topic, difficulty, outcome, int(bool(hint_used)), time.time())))
+
+    def import_attempts(self, student_id, attempts):
+        """
+        Queues attempts made offline, each an (attempt ID, question key, event,
+        topic, difficulty, outcome, hint used, answered at) tuple. Attempts
+        whose ID was imported for the student before are ignored.
+        """
+        for attempt_id, question_id, event, topic, difficulty, outcome, hint_used, answered_at in attempts:
+            if outcome not in OUTCOMES:
+                raise ValueError(f"Unknown outcome {outcome!r}; expected one of {OUTCOMES}.")
+            self._queue.put(('imported_attempt', (attempt_id, (student_id, int(question_id), event, topic, difficulty, outcome,
+                                                               int(bool(hint_used)), float(answered_at)))))
+
+    def save_review_card(self, student_id, card):
+        """Queues the latest spaced-repetition state of one card (a review_scheduler.Card)."""
+        self._queue.put(('review_card', (student_id, int(card.card_id), card.ease, card.interval_days, card.repetitions, card.due_at)))
+
+    def save_ability(self, student_id, event, topic, ability):
+        """Queues the latest rating of a student in one topic (an adaptive.Ability)."""
+        self._queue.put(('ability', (student_id, event, topic, ability.rating, ability.answered, ability.updated_at)))
+
+    def flush(self):
+        """Blocks until everything queued so far has been committed."""
+        self._queue.join()
+
+    def close(self):
+        """Commits any queued writes and stops the writer thread."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
+    def _write_loop(self):
+        connection = connect(self.path)
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+
+            items = [item for item in batch if item is not None]
+            running = len(items) == len(batch)
+            try:
+                if items:
+                    self._commit(connection, items)
+            except sqlite3.Error:
+                logger.exception("Failed to write %d records to %s", len(items), self.path)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        connection.close()
+
+    def _commit(self, connection, items):
+        attempts = [row for kind, row in items if kind == 'attempt']
+        review_cards = [row for kind, row in items if kind == 'review_card']
+        abilities = [row for kind, row in items if kind == 'ability']
+        with connection:
+            for attempt_id, row in (row for kind, row in items if kind == 'imported_attempt'):
+                imported = connection.execute("INSERT OR IGNORE INTO imported_attempts (student_id, attempt_id) VALUES (?, ?)", (row[0], attempt_id))
+                if imported.rowcount:
+                    attempts.append(row)
+            connection.executemany(
+                "INSERT INTO attempts (student_id, question_id, event, topic, difficulty, outcome, hint_used, answered_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                attempts,
+            )
+            connection.executemany(UPSERT_TOPIC_STATS, [
+                (student_id, event, topic, int(outcome != 'revealed'), int(outcome == 'correct'), int(outcome == 'revealed'))
+                for student_id, _, event, topic, _, outcome, _, _ in attempts
+            ])
+            connection.executemany(UPSERT_QUESTION_STATS, [
+                (student_id, question_id, int(outcome != 'revealed'), int(outcome == 'correct'), int(outcome == 'incorrect'))
+                for student_id, question_id, _, _, _, outcome, _, _ in attempts
+            ])
+            connection.executemany(UPSERT_DAILY_TOPIC_STATS, [
+                (student_id, day_number(datetime.date.fromtimestamp(answered_at)), event, topic, difficulty or 'Unrated',
+                 int(outcome != 'revealed'), int(outcome == 'correct'), int(outcome == 'revealed'), hint_used)
+                for student_id, _, event, topic, difficulty, outcome, hint_used, answered_at in attempts
+            ])
+            connection.executemany(UPSERT_DAILY_QUESTION_STATS, [
+                (question_id, day_number(datetime.date.fromtimestamp(answered_at)), event, topic,
+                 int(outcome != 'revealed'), int(outcome == 'correct'), int(outcome == 'revealed'))
+                for _, question_id, event, topic, _, outcome, _, answered_at in attempts
+            ])
+            connection.executemany(
+                "INSERT OR REPLACE INTO review_cards (student_id, question_id, ease, interval_days, repetitions, due_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                review_cards,
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO topic_abilities (student_id, event, topic, rating, answered, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                abilities,
+            )
+
+    # --- Reads ---
+    def totals(self, student_id):
+        """Returns the student's all-time (attempted, correct) counts."""
+        attempted, correct = self._reader().execute(
+            "SELECT COALESCE(SUM(attempted), 0), COALESCE(SUM(correct), 0) FROM student_topic_stats WHERE student_id = ?",
+            (student_id,),
+        ).fetchone()
+        return attempted, correct
+
+    def miss_counts(self, student_id):
+        """Returns {question_id: misses} for every question the student has missed."""
+        return dict(self._reader().execute(
+            "SELECT question_id, misses FROM student_question_stats WHERE student_id = ? AND misses > 0",
+            (student_id,),
+        ))
+
+    def seen_questions(self, student_id):
+        """Returns the set of question IDs the student has attempted."""
+        return {row[0] for row in self._reader().execute(
+            "SELECT question_id FROM student_question_stats WHERE student_id = ?",
+            (student_id,),
+        )}
+
+    def review_cards(self, student_id):
+        """Returns the student's saved review cards as (question_id, ease, interval_days, repetitions, due_at) rows."""
+        return self._reader().execute(
+            "SELECT question_id, ease, interval_days, repetitions, due_at FROM review_cards WHERE student_id = ?",
+            (student_id,),
+        ).fetchall()
+
+    def abilities(self, student_id):
+        """Returns the student's saved topic ratings as (event, topic, rating, answered, updated_at) rows."""
+        return self._reader().execute(
+            "SELECT event, topic, rating, answered, updated_at FROM topic_abilities WHERE student_id = ?",
+            (student_id,),
+        ).fetchall()
+
+    # --- Team reads (daily rollups) ---
+    def students(self):
+        """Returns every student ID with recorded attempts, sorted."""
+        return [row[0] for row in self._reader().execute("SELECT DISTINCT student_id FROM student_topic_stats ORDER BY student_id")]
+
+    def team_rollup(self, group_by, student_ids=None, first_day=None, last_day=None):
+        """
+        Sums the daily topic rollup over a day range and, optionally, a set of
+        students, grouped by any of ROLLUP_DIMENSIONS. Returns rows of
+        (*group values, attempted, correct, revealed, hints).
+        """
+        unknown = set(group_by) - set(ROLLUP_DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Cannot group by {sorted(unknown)}; expected some of {ROLLUP_DIMENSIONS}.")
+        where, params = _day_range(first_day, last_day)
+        if student_ids is not None:
+            where.append(f"student_id IN ({', '.join('?' * len(student_ids))})")
+            params.extend(student_ids)
+        columns = ", ".join(group_by)
+        query = f"SELECT {columns + ', ' if columns else ''}SUM(attempted), SUM(correct), SUM(revealed), SUM(hints) FROM daily_topic_stats"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        if columns:
+            query += f" GROUP BY {columns} ORDER BY {columns}"
+        return self._reader().execute(query, params).fetchall()
+
+    def question_hit_rates(self, first_day=None, last_day=None, min_attempts=1, limit=50):
+        """
+        Returns (question_id, event, topic, attempted, correct, revealed) for
+        the questions with the lowest hit rate over a day range, skipping
+        questions with fewer than `min_attempts` attempts.
+        """
+        where, params = _day_range(first_day, last_day)
+        query = "SELECT question_id, MIN(event), MIN(topic), SUM(attempted), SUM(correct), SUM(revealed) FROM daily_question_stats"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " GROUP BY question_id HAVING SUM(attempted) >= ? ORDER BY 1.0 * SUM(correct) / SUM(attempted), SUM(attempted) DESC LIMIT ?"
+        return self._reader().execute(query, params + [max(min_attempts, 1), limit]).fetchall()
+
+
+def _day_range(first_day, last_day):
+    where, params = [], []
+    if first_day is not None:
+        where.append("day >= ?")
+        params.append(first_day)
+    if last_day is not None:
+        where.append("day <= ?")
+        params.append(last_day)
+    return where, params
@@ -0,0 +1,513 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from dedup import exact_duplicate_groups, find_duplicates
+
+logger = logging.getLogger(__name__)
+
+# Columns every question row is expected to carry besides the options
+TEXT_COLUMNS = ['event', 'topic', 'question', 'answer', 'subtopic', 'difficulty', 'hint', 'explanation']
+
+# Low-cardinality columns stored as category codes in the compiled format
+CATEGORY_COLUMNS = ['event', 'topic', 'difficulty']
+
+# Columns that are carried along only when the CSV has them; `image` refers to the asset store (see asset_store.py)
+OPTIONAL_COLUMNS = ['accepted_answers', 'image', 'image_caption']
+QUESTION_TYPES = ['multiple-choice', 'true/false', 'short-answer']
+# Only empty fields are missing; 'NA', 'None', 'null' and the like are kept as text,
+# since they can be real options or answers. The importer reads CSVs the same way.
+CSV_NA_OPTIONS = {'keep_default_na': False, 'na_values': ['']}
+
+# Compiled bank layout: magic, schema version, header length, JSON header, 8-byte aligned sections
+COMPILED_MAGIC = b'QBNK'
+SCHEMA_VERSION = 2
+COMPILED_SUFFIX = '.qbank'
+
+
+class QuestionBank:
+    """
+    Column-oriented, read-only question bank. Every column is a numpy array
+    indexed by row ID, and individual questions are only turned into Python
+    dicts when a page actually needs them.
+
+    Row IDs are compact but only valid within one bank; `keys` holds each
+    row's stable question key, which is what gets persisted. Exact
+    duplicates stay in the arrays but are left out of the index, so only
+    the first copy is ever served.
+    """
+
+    def __init__(self, columns, options, types, index, timings=None, keys=None, duplicates=None):
+        self.columns = columns
+        self.options = options
+        self.types = types
+        self.index = index
+        self.timings = timings or {}
+        self.keys = keys if keys is not None else np.zeros(len(types), dtype=np.int64)
+        self.duplicates = duplicates or {'exact': [], 'near': []}
+        self.repeated_rows = frozenset(row for group in self.duplicates['exact'] for row in group[1:])
+        self._key_order = None
+
+        # The bank is shared across sessions, so guard its arrays against writes
+        for array in (*columns.values(), options, types, self.keys):
+            if isinstance(array, np.ndarray):
+                array.flags.writeable = False
+
+    @classmethod
+    def empty(cls):
+        """Returns a bank with no questions, used when loading fails."""
+        columns = {column: np.empty(0, dtype=object) for column in TEXT_COLUMNS}
+        return cls(columns, np.empty((0, 0), dtype=str), np.empty(0, dtype=str), build_question_index([], [], []), keys=np.empty(0, dtype=np.int64))
+
+    def __len__(self):
+        return len(self.types)
+
+    def rows_for_keys(self, keys):
+        """
+        Maps stable question keys to row IDs in this bank, -1 for keys it no
+        longer has. Duplicated keys map to the copy that is served.
+        """
+        if self._key_order is None:
+            self._key_order = np.argsort(self.keys, kind='stable')
+        keys = np.asarray(keys, dtype=np.int64)
+        if not len(self.keys):
+            return np.full(len(keys), -1, dtype=np.int64)
+        sorted_keys = self.keys[self._key_order]
+        positions = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+        return np.where(sorted_keys[positions] == keys, self._key_order[positions], -1)
+
+    def question(self, row_id):
+        """Materializes a single row as the question dict used by the UI."""
+        row_id = int(row_id)
+        question_data = {name: column[row_id] for name, column in self.columns.items()}
+        question_data['options'] = [str(option) for option in self.options[row_id] if option]
+        question_data['type'] = str(self.types[row_id])
+        question_data['row_id'] = row_id
+        return question_data
+
+
+class StringColumn:
+    """A lazily decoded string column stored as an offsets array over a UTF-8 heap."""
+
+    def __init__(self, offsets, heap, nulls):
+        self.offsets = offsets
+        self.heap = heap
+        self.nulls = nulls
+
+    def __len__(self):
+        return len(self.nulls)
+
+    def __getitem__(self, row_id):
+        if self.nulls[row_id]:
+            return np.nan
+        return bytes(self.heap[self.offsets[row_id]:self.offsets[row_id + 1]]).decode('utf-8')
+
+
+class CategoryColumn:
+    """A column stored as integer codes into a small list of categories, -1 marking a null."""
+
+    def __init__(self, codes, categories):
+        self.codes = codes
+        self.categories = np.array(list(categories) + [np.nan], dtype=object)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, row_id):
+        return self.categories[self.codes[row_id]]
+
+    def values(self):
+        """Decodes the whole column at once (object references only, no string copies)."""
+        return self.categories[self.codes]
+
+
+class PackedOptions:
+    """Row access over several option StringColumns, mirroring a row of the options matrix."""
+
+    def __init__(self, option_columns):
+        self.option_columns = option_columns
+
+    def __len__(self):
+        return len(self.option_columns[0]) if self.option_columns else 0
+
+    def __getitem__(self, row_id):
+        return [column[row_id] for column in self.option_columns]
+
+
+def build_question_index(events, topics, difficulties, exclude=()):
+    """
+    Builds an event -> topic -> difficulty index of row IDs along with
+    precomputed counts, so the pages and the sampler never have to scan the
+    full question bank. Rows in `exclude` are left out. Row ID arrays are
+    read-only.
+    """
+    frame = pd.DataFrame({'event': events, 'topic': topics, 'difficulty': difficulties})
+    row_numbers = np.arange(len(frame))
+    if len(exclude):
+        row_numbers = np.setdiff1d(row_numbers, np.fromiter(exclude, dtype=np.int64))
+        frame = frame.iloc[row_numbers]
+    groups = frame.groupby(['event', 'topic', 'difficulty'], sort=True).indices
+
+    index = {'events': (), 'topics': {}, 'rows': {}, 'topic_rows': {}, 'counts': {}}
+    for (event_name, topic, difficulty), positions in groups.items():
+        row_ids = row_numbers[positions].astype(np.int32)
+        row_ids.flags.writeable = False
+        index['rows'].setdefault(event_name, {}).setdefault(topic, {})[difficulty] = row_ids
+
+    for event_name, by_topic in index['rows'].items():
+        index['topics'][event_name] = tuple(sorted(by_topic))
+        index['topic_rows'][event_name] = {}
+        index['counts'][event_name] = {}
+        for topic, by_difficulty in by_topic.items():
+            row_ids = np.sort(np.concatenate(list(by_difficulty.values())))
+            row_ids.flags.writeable = False
+            index['topic_rows'][event_name][topic] = row_ids
+            index['counts'][event_name][topic] = len(row_ids)
+    index['events'] = tuple(sorted(index['rows']))
+    return index
+
+
+def infer_question_types(options):
+    """Infers each row's question type from its packed options with vectorized masks."""
+    present = options != ''
+    option_counts = present.sum(axis=1)
+    is_true = options == 'True'
+    is_false = options == 'False'
+    true_false = is_true.any(axis=1) & is_false.any(axis=1) & (is_true | is_false | ~present).all(axis=1)
+    return np.where(true_false, 'true/false', np.where(option_counts > 1, 'multiple-choice', 'short-answer'))
+
+
+def read_csv_frame(path):
+    """
+    Reads a question CSV into a cleaned DataFrame (rows without event/topic
+    dropped) and returns it with its sorted 'options__' column names.
+    """
+    df = pd.read_csv(path, dtype=str, **CSV_NA_OPTIONS)
+
+    # Drop rows missing 'event' or 'topic' before any per-row objects exist
+    for column in ('event', 'topic'):
+        if column not in df.columns:
+            df[column] = np.nan
+    rows = len(df)
+    df = df.dropna(subset=['event', 'topic']).reset_index(drop=True)
+    if len(df) < rows:
+        logger.warning("%s: skipped %d row(s) without an event or topic; run question_import.py --check on it for details",
+                       path, rows - len(df))
+
+    option_cols = sorted(col for col in df.columns if col.startswith('options__'))
+    if not option_cols:
+        raise ValueError("'options__' columns not found in the CSV data.")
+    return df, option_cols
+
+
+def pack_options(df, option_cols):
+    """Packs a frame's option columns into a fixed-width string matrix, '' marking a missing option."""
+    if not len(df):
+        return np.empty((0, len(option_cols)), dtype=str)
+    return np.stack([df[col].str.strip().fillna('').to_numpy(dtype=str) for col in option_cols], axis=1)
+
+
+def normalize_difficulties(values):
+    """Strips difficulty labels and maps missing ones to 'Unrated'."""
+    return pd.Series(values, dtype='string').str.strip().replace('', pd.NA).fillna('Unrated').to_numpy(dtype=object)
+
+
+def load_csv_bank(path):
+    """
+    Loads a question CSV into a QuestionBank using column operations only.
+    Raises FileNotFoundError if the file is missing and ValueError if it has
+    no 'options__' columns.
+    """
+    timings = {}
+    started = last = time.perf_counter()
+
+    def lap(step):
+        nonlocal last
+        now = time.perf_counter()
+        timings[step] = (now - last) * 1000
+        last = now
+
+    df, option_cols = read_csv_frame(path)
+    lap('read_csv_ms')
+
+    options = pack_options(df, option_cols)
+    lap('options_ms')
+
+    types = infer_question_types(options)
+    lap('types_ms')
+
+    columns = {}
+    for column in TEXT_COLUMNS:
+        if column in df.columns:
+            columns[column] = df[column].to_numpy(dtype=object)
+        else:
+            columns[column] = np.full(len(df), np.nan, dtype=object)
+    for column in OPTIONAL_COLUMNS:
+        if column in df.columns:
+            columns[column] = df[column].to_numpy(dtype=object)
+
+    keys = question_keys(df, options)
+    lap('keys_ms')
+
+    # Only exact duplicates (shared keys) are found here; the near-duplicate pass runs
+    # when the bank is compiled, or with `python dedup.py`
+    duplicates = {'exact': exact_duplicate_groups(keys) if len(keys) else [], 'near': None}
+    report_duplicates(duplicates, path)
+    lap('dedup_ms')
+
+    repeated = [row for group in duplicates['exact'] for row in group[1:]]
+    index = build_question_index(columns['event'], columns['topic'], normalize_difficulties(columns['difficulty']), exclude=repeated)
+    lap('index_ms')
+
+    timings['total_ms'] = (time.perf_counter() - started) * 1000
+    logger.info("Loaded %d questions from %s in %.1f ms (%s)", len(df), path, timings['total_ms'],
+                ", ".join(f"{step}={ms:.1f}" for step, ms in timings.items() if step != 'total_ms'))
+    return QuestionBank(columns, options, types, index, timings, keys, duplicates)
+
+
+# --- Question Identity ---
+# Fields that identify a question (with its options); editing anything else keeps its key
+KEY_COLUMNS = ['event', 'topic', 'question']
+KEY_SEPARATOR = "\x1f"
+# Fixed SipHash key, so question keys are the same in every process and on every load
+KEY_HASH_KEY = "scioly-question1"
+
+
+def _joined_text(df, columns, options):
+    """Joins the given columns and the non-empty options of each row with KEY_SEPARATOR."""
+    text = pd.Series([''] * len(df), index=df.index, dtype=object)
+    for position, column in enumerate(columns):
+        values = df[column].fillna('').astype(str).str.strip() if column in df.columns else ''
+        text = text + (KEY_SEPARATOR if position else '') + values
+    for option in np.asarray(options, dtype=str).T:
+        text = text + np.where(option != '', KEY_SEPARATOR + option.astype(object), '')
+    return text.to_numpy(dtype=object)
+
+
+def question_keys(df, options):
+    """
+    Returns a stable 63-bit key per row, hashed from event, topic, question
+    text and options. The same question gets the same key in every version
+    of the bank, wherever its row ends up; keys are what the progress store
+    persists.
+    """
+    hashes = pd.util.hash_array(_joined_text(df, KEY_COLUMNS, options), hash_key=KEY_HASH_KEY, categorize=False)
+    return (hashes & np.uint64(0x7FFF_FFFF_FFFF_FFFF)).astype(np.int64)
+
+
+def question_texts(df, options):
+    """The text near-duplicate detection compares: the question and its options."""
+    return _joined_text(df, ['question'], options)
+
+
+def report_duplicates(duplicates, path):
+    """Logs a summary of the duplicates found in a bank ('near' is None when near duplicates were not looked for)."""
+    if duplicates['exact'] or duplicates['near']:
+        near = "" if duplicates['near'] is None else f", and {len(duplicates['near'])} near-duplicate pair(s)"
+        logger.warning("%s has %d exact duplicate group(s), serving the first copy of each%s; run dedup.py on its CSV for details",
+                       path, len(duplicates['exact']), near)
+
+
+# --- Compiled Bank Format ---
+def default_compiled_path(csv_path):
+    """Returns where the compiled bank for a CSV lives (next to it, with a .qbank suffix)."""
+    return os.path.splitext(csv_path)[0] + COMPILED_SUFFIX
+
+
+def file_fingerprint(path, with_hash=True):
+    """Returns the size, mtime and (optionally) SHA-256 of a file."""
+    stat = os.stat(path)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        fingerprint['sha256'] = digest.hexdigest()
+    return fingerprint
+
+
+def _encode_strings(values):
+    """Encodes an array of strings/nulls into (nulls, offsets, heap) buffers."""
+    series = pd.Series(values, dtype='string')
+    nulls = series.isna().to_numpy(dtype=np.uint8)
+    encoded = series.fillna('').str.encode('utf-8')
+    lengths = encoded.str.len().to_numpy(dtype=np.int64)
+    offsets = np.zeros(len(series) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return nulls, offsets, b''.join(encoded.tolist())
+
+
+def _encode_categories(values):
+    """Encodes an array of strings/nulls into int32 codes and a category list."""
+    codes, categories = pd.factorize(pd.Series(values, dtype=object), sort=True)
+    return codes.astype(np.int32), [str(category) for category in categories]
+
+
+def compile_bank(csv_path, compiled_path=None):
+    """
+    Compiles a question CSV into the binary .qbank format and returns its
+    path. The file is written to a temporary name and swapped in atomically,
+    so a worker reading the old file is never handed a half-written one.
+    """
+    compiled_path = compiled_path or default_compiled_path(csv_path)
+    df, option_cols = read_csv_frame(csv_path)
+    options = df[option_cols].apply(lambda column: column.str.strip()).fillna('')
+
+    sections = []
+    header = {
+        'schema_version': SCHEMA_VERSION,
+        'rows': len(df),
+        'source': file_fingerprint(csv_path),
+        'option_columns': option_cols,
+        'columns': {},
+    }
+
+    def add_section(data):
+        offset = sum(len(section) for section in sections)
+        data = bytes(data)
+        sections.append(data + b'\0' * (-len(data) % 8))
+        return {'offset': offset, 'length': len(data)}
+
+    optional_cols = [column for column in OPTIONAL_COLUMNS if column in df.columns]
+    for column in TEXT_COLUMNS + optional_cols + option_cols:
+        values = df[column] if column in df.columns else pd.Series([None] * len(df))
+        if column in option_cols:
+            values = options[column]
+        if column in CATEGORY_COLUMNS:
+            codes, categories = _encode_categories(values)
+            header['columns'][column] = {'kind': 'category', 'categories': categories, 'codes': add_section(codes.tobytes())}
+        else:
+            nulls, offsets, heap = _encode_strings(values)
+            header['columns'][column] = {
+                'kind': 'string',
+                'nulls': add_section(nulls.tobytes()),
+                'offsets': add_section(offsets.tobytes()),
+                'heap': add_section(heap),
+            }
+
+    types = infer_question_types(options.to_numpy(dtype=str))
+    type_codes = np.searchsorted(np.array(sorted(QUESTION_TYPES)), types).astype(np.uint8)
+    header['types'] = {'categories': sorted(QUESTION_TYPES), 'codes': add_section(type_codes.tobytes())}
+
+    # Keys and the duplicate report are worked out once here, not on every load
+    keys = question_keys(df, options.to_numpy(dtype=str))
+    header['keys'] = add_section(keys.tobytes())
+    header['duplicates'] = find_duplicates(keys, question_texts(df, options.to_numpy(dtype=str)))
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    header_bytes += b' ' * (-(len(header_bytes) + 16) % 8)
+    tmp_path = f"{compiled_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(COMPILED_MAGIC)
+        f.write(np.uint32(SCHEMA_VERSION).tobytes())
+        f.write(np.uint64(len(header_bytes)).tobytes())
+        f.write(header_bytes)
+        for section in sections:
+            f.write(section)
+    os.replace(tmp_path, compiled_path)
+    logger.info("Compiled %d questions from %s into %s", len(df), csv_path, compiled_path)
+    return compiled_path
+
+
+def read_compiled_header(compiled_path):
+    """Reads the JSON header of a compiled bank. Raises ValueError on a bad or outdated file."""
+    with open(compiled_path, 'rb') as f:
+        preamble = f.read(16)
+        if len(preamble) < 16 or preamble[:4] != COMPILED_MAGIC:
+            raise ValueError(f"{compiled_path} is not a compiled question bank.")
+        version = int(np.frombuffer(preamble[4:8], dtype=np.uint32)[0])
+        if version != SCHEMA_VERSION:
+            raise ValueError(f"{compiled_path} uses schema version {version}, expected {SCHEMA_VERSION}.")
+        header_length = int(np.frombuffer(preamble[8:16], dtype=np.uint64)[0])
+        header = json.loads(f.read(header_length))
+    header['data_start'] = 16 + header_length
+    return header
+
+
+def load_compiled_bank(compiled_path, header=None):
+    """
+    Memory-maps a compiled bank. Only the category codes are touched up
+    front to build the index; question text is decoded lazily per row.
+    """
+    started = time.perf_counter()
+    header = header or read_compiled_header(compiled_path)
+    data = np.memmap(compiled_path, dtype=np.uint8, mode='r', offset=header['data_start'])
+
+    def section(spec, dtype):
+        return data[spec['offset']:spec['offset'] + spec['length']].view(dtype)
+
+    columns = {}
+    for column, spec in header['columns'].items():
+        if spec['kind'] == 'category':
+            columns[column] = CategoryColumn(section(spec['codes'], np.int32), spec['categories'])
+        else:
+            columns[column] = StringColumn(section(spec['offsets'], np.int64), section(spec['heap'], np.uint8), section(spec['nulls'], np.uint8))
+    options = PackedOptions([columns.pop(column) for column in header['option_columns']])
+    types = np.array(header['types']['categories'])[section(header['types']['codes'], np.uint8)]
+    keys = section(header['keys'], np.int64)
+    duplicates = header['duplicates']
+    report_duplicates(duplicates, compiled_path)
+    mapped = time.perf_counter()
+
+    repeated = [row for group in duplicates['exact'] for row in group[1:]]
+    index = build_question_index(columns['event'].values(), columns['topic'].values(), normalize_difficulties(columns['difficulty'].values()), exclude=repeated)
+    timings = {'mmap_ms': (mapped - started) * 1000, 'index_ms': (time.perf_counter() - mapped) * 1000}
+    timings['total_ms'] = (time.perf_counter() - started) * 1000
+    logger.info("Memory-mapped %d questions from %s in %.1f ms", header['rows'], compiled_path, timings['total_ms'])
+    return QuestionBank(columns, options, types, index, timings, keys, duplicates)
+
+
+def compiled_bank_is_stale(header, csv_path):
+    """True when the CSV a compiled bank was built from has changed since."""
+    if not os.path.exists(csv_path):
+        return False
+    source = header['source']
+    current = file_fingerprint(csv_path, with_hash=False)
+    if current['size'] == source['size'] and current['mtime_ns'] == source['mtime_ns']:
+        return False
+    # The mtime moved (e.g. a fresh checkout); only rebuild if the contents changed
+    return file_fingerprint(csv_path)['sha256'] != source['sha256']
+
+
+def load_bank(csv_path, compiled_path=None):
+    """
+    Loads the question bank, preferring the memory-mapped compiled file.
+    A compiled file that is outdated or older than its CSV is rebuilt
+    first; without a compiled file the CSV is parsed directly.
+    """
+    compiled_path = compiled_path or default_compiled_path(csv_path)
+    if not os.path.exists(compiled_path):
+        return load_csv_bank(csv_path)
+
+    try:
+        header = read_compiled_header(compiled_path)
+        stale = compiled_bank_is_stale(header, csv_path)
+    except ValueError:
+        if not os.path.exists(csv_path):
+            raise
+        header, stale = None, True
+
+    if stale:
+        try:
+            compile_bank(csv_path, compiled_path)
+        except OSError as e:
+            logger.warning("Could not rebuild %s (%s), reading %s instead", compiled_path, e, csv_path)
+            return load_csv_bank(csv_path)
+        header = None
+    return load_compiled_bank(compiled_path, header)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compile a question CSV into the memory-mapped .qbank format.")
+    parser.add_argument('csv_path', nargs='?', default='questions_full.csv')
+    parser.add_argument('-o', '--output', help="Compiled file path (defaults to the CSV path with a .qbank suffix)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    compile_bank(args.csv_path, args.output)
@@ -0,0 +1,494 @@
+"""
+Bulk import of question sets into the bank CSV.
+
+Sources can be CSV, JSON (an array of objects, or JSON Lines) and .xlsx
+spreadsheets (every sheet; needs openpyxl). They are read in chunks, each
+chunk is validated in a worker process, and valid rows are merged into the
+bank without holding either the sources or the bank in memory:
+
+    python question_import.py sets/*.csv sets/*.json --bank questions_full.csv --report import_errors.csv
+
+Every row is checked against the bank's schema. Event, topic, question and
+answer are required. A multiple-choice answer must be one of the options
+(it is rewritten to the option's exact spelling), true/false questions are
+normalized to True/False options, and difficulties must be Easy, Medium or
+Hard. Options come from `options__NNN` (or `option N`) columns, or from an
+`options` list in JSON. Rows already in the bank (by question key) or
+repeated within the import are skipped. An `image` given as a file path
+must exist inside its source file's folder; it is added to the asset store
+and the row refers to it by content hash. A 'sha256:' reference to an
+object the store does not have yet is kept, with a warning.
+
+The report lists each problem with its source, row (spreadsheet numbering,
+the header being row 1; JSON items count from 1), field and value. Rows
+with errors are left out; with --strict nothing is merged unless every row
+is valid, and --check only validates. The merged bank is written next to
+the old one and swapped in atomically, so a running app hot-reloads it.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import tempfile
+from collections import deque
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from adaptive import DIFFICULTY_RATINGS
+from asset_store import AssetStore, contained_path, parse_digest
+from question_bank import CSV_NA_OPTIONS, OPTIONAL_COLUMNS, QUESTION_TYPES, TEXT_COLUMNS, pack_options, question_keys
+
+logger = logging.getLogger(__name__)
+
+# Rows per validation task; bounds the memory of each worker and of the parent
+DEFAULT_CHUNK_ROWS = 5000
+REQUIRED_FIELDS = ['event', 'topic', 'question', 'answer']
+DIFFICULTIES = list(DIFFICULTY_RATINGS)
+TRUE_FALSE_VALUES = {'true': 'True', 't': 'True', 'false': 'False', 'f': 'False'}
+# 'options__001', 'option_1', 'Option 2', ... (names are lowercased, spaces turned into underscores)
+OPTION_COLUMN_PATTERN = re.compile(r"options?_*(\d+)$")
+REPORT_COLUMNS = ['source', 'row', 'severity', 'field', 'message', 'value']
+SPREADSHEET_SUFFIXES = ('.xlsx', '.xlsm')
+# Values quoted in the report are cut to this many characters
+REPORT_VALUE_CHARS = 80
+
+
+# --- Reading sources ---
+def _csv_records(path, chunk_rows):
+    for chunk_no, frame in enumerate(pd.read_csv(path, dtype=str, chunksize=chunk_rows, **CSV_NA_OPTIONS)):
+        first_row = 2 + chunk_no * chunk_rows
+        yield from zip(range(first_row, first_row + len(frame)), frame.to_dict('records'))
+
+
+def _json_array_items(f, block_size=1 << 16):
+    # Decodes one array item at a time, so a large file is never parsed whole
+    decoder = json.JSONDecoder()
+    buffer = f.read(block_size).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError("expected a JSON array of questions, or JSON Lines (one object per line)")
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip()
+        if buffer.startswith(','):
+            buffer = buffer[1:].lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            more = f.read(block_size)
+            if not more:
+                raise
+            buffer += more
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def _json_records(path):
+    with open(path, encoding='utf-8') as f:
+        start = f.read(1 << 10).lstrip()
+        f.seek(0)
+        if start.startswith('['):
+            yield from enumerate(_json_array_items(f), start=1)
+            return
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_no, {'_error': f"invalid JSON: {e.msg} (column {e.colno})"}
+
+
+def _spreadsheet_records(path):
+    try:
+        import openpyxl
+    except ImportError:
+        raise ValueError("reading spreadsheets needs openpyxl (pip install openpyxl)") from None
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            header = ['' if name is None else str(name) for name in header]
+            for row_no, values in enumerate(rows, start=2):
+                if all(value is None or value == '' for value in values):
+                    continue
+                record = dict(zip(header, values))
+                if len(workbook.worksheets) > 1:
+                    record['_sheet'] = sheet.title
+                yield row_no, record
+    finally:
+        workbook.close()
+
+
+def read_records(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Yields (row number, record dict) for every question in a source file,
+    dispatching on its suffix. Rows of multi-sheet workbooks carry their
+    sheet name under '_sheet'.
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in ('.json', '.jsonl', '.ndjson'):
+        return _json_records(path)
+    if suffix in SPREADSHEET_SUFFIXES:
+        return _spreadsheet_records(path)
+    return _csv_records(path, chunk_rows)
+
+
+def record_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Groups a source's records into lists of at most chunk_rows."""
+    chunk = []
+    for item in read_records(path, chunk_rows):
+        chunk.append(item)
+        if len(chunk) == chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# --- Validation ---
+def clean_value(value):
+    """Turns a cell or JSON value into stripped text ('' for missing); whole floats lose their '.0'."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ''
+    if isinstance(value, bool):
+        return 'True' if value else 'False'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def _fold(text):
+    return ' '.join(text.split()).casefold()
+
+
+def record_options(record):
+    """A record's non-empty options, in column order, from an 'options' list or numbered option columns."""
+    if isinstance(record.get('options'), list):
+        values = record['options']
+    else:
+        numbered = []
+        for column, value in record.items():
+            match = OPTION_COLUMN_PATTERN.match(column)
+            if match:
+                numbered.append((int(match.group(1)), value))
+        values = [value for _, value in sorted(numbered)]
+    return [option for option in map(clean_value, values) if option]
+
+
+def validate_record(record):
+    """
+    Checks one raw record against the bank schema. Returns (question,
+    errors): the normalized question dict (with an 'options' list), and a
+    list of (field, message, value) problems; the question is only usable
+    when there are none.
+    """
+    if not isinstance(record, dict):
+        return None, [('', f"expected an object with question fields, got {type(record).__name__}", '')]
+    if '_error' in record:
+        return None, [('', record['_error'], '')]
+    record = {str(name).strip().lower().replace(' ', '_'): value for name, value in record.items()}
+    question = {column: clean_value(record.get(column)) for column in TEXT_COLUMNS + OPTIONAL_COLUMNS}
+    accepted = record.get('accepted_answers')
+    question['accepted_answers'] = '|'.join(map(clean_value, accepted)) if isinstance(accepted, list) else clean_value(accepted)
+    options = record_options(record)
+    errors = [(field, "is required", '') for field in REQUIRED_FIELDS if not question[field]]
+
+    declared = clean_value(record.get('type')).lower()
+    if declared and declared not in QUESTION_TYPES:
+        errors.append(('type', f"must be one of {', '.join(QUESTION_TYPES)}", declared))
+    answer = question['answer']
+    folded = [_fold(option) for option in options]
+
+    if declared == 'true/false' or (len(options) == 2 and {TRUE_FALSE_VALUES.get(option) for option in folded} == {'True', 'False'}):
+        options = ['True', 'False']
+        if answer:
+            if _fold(answer) in TRUE_FALSE_VALUES:
+                question['answer'] = TRUE_FALSE_VALUES[_fold(answer)]
+            else:
+                errors.append(('answer', "must be True or False for a true/false question", answer))
+    elif declared == 'short-answer' and options:
+        errors.append(('options', "short-answer questions take no options", ' | '.join(options)))
+    elif len(options) == 1 or (declared == 'multiple-choice' and len(options) < 2):
+        errors.append(('options', "multiple-choice questions need at least two options", ' | '.join(options)))
+    elif options:
+        if len(set(folded)) < len(folded):
+            errors.append(('options', "has the same option more than once", ' | '.join(options)))
+        if answer:
+            if _fold(answer) in folded:
+                question['answer'] = options[folded.index(_fold(answer))]
+            else:
+                errors.append(('answer', "is not one of the options", answer))
+
+    if question['difficulty']:
+        labels = {label.casefold(): label for label in DIFFICULTIES}
+        if question['difficulty'].casefold() in labels:
+            question['difficulty'] = labels[question['difficulty'].casefold()]
+        else:
+            errors.append(('difficulty', f"must be one of {', '.join(DIFFICULTIES)} (or empty)", question['difficulty']))
+    question['options'] = options
+    return question, errors
+
+
+def check_image(question, source):
+    """
+    Checks a question's image reference: a stored object ('sha256:<hex>') is
+    taken as is, a file path must exist inside the source file's folder and
+    is made absolute so the merge can add it to the asset store. Returns an
+    error tuple or None.
+    """
+    ref = question.get('image')
+    if not ref or parse_digest(ref):
+        return None
+    path = contained_path(os.path.dirname(os.path.abspath(source)), ref)
+    if path is None:
+        return ('image', "must be a path inside the source file's folder", ref)
+    if not os.path.isfile(path):
+        return ('image', "file not found", ref)
+    question['image'] = path
+    return None
+
+
+def option_matrix(option_lists, width=None):
+    """Packs option lists into a (rows, width) string matrix, '' marking a missing option."""
+    width = width if width is not None else max(map(len, option_lists), default=0)
+    matrix = np.full((len(option_lists), width), '', dtype=object)
+    for row, options in enumerate(option_lists):
+        matrix[row, :len(options)] = options
+    return matrix.astype(str)
+
+
+def validate_chunk(job):
+    """
+    Validates one chunk of (row, record) pairs from a source. Returns
+    (source, valid, keys, errors): the valid (row, question) pairs, their
+    question keys, and (row, field, message, value) errors. A chunk given
+    as a string is the reason its source could not be read.
+    """
+    source, chunk = job
+    if isinstance(chunk, str):
+        return source, [], [], [('', '', chunk, '')]
+    valid, errors = [], []
+    for row, record in chunk:
+        question, problems = validate_record(record)
+        if not problems:
+            problems = [problem for problem in [check_image(question, source)] if problem]
+        label = f"{record['_sheet']}!{row}" if isinstance(record, dict) and '_sheet' in record else row
+        if problems:
+            errors.extend((label, field, message, value) for field, message, value in problems)
+        else:
+            valid.append((label, question))
+    questions = [question for _, question in valid]
+    frame = pd.DataFrame(questions, columns=TEXT_COLUMNS)
+    keys = question_keys(frame, option_matrix([question['options'] for question in questions])).tolist() if questions else []
+    return source, valid, keys, errors
+
+
+def validated_chunks(paths, chunk_rows=DEFAULT_CHUNK_ROWS, processes=None):
+    """
+    Validates every source in order, one chunk per worker task, and yields
+    validate_chunk results in source order. Only a couple of chunks per
+    worker are in flight at once, so memory stays bounded however large
+    the sources are. A source that cannot be read at all yields a single
+    error with no row.
+    """
+    def jobs():
+        for path in paths:
+            try:
+                for chunk in record_chunks(path, chunk_rows):
+                    yield path, chunk
+            except (OSError, ValueError, pd.errors.ParserError) as e:
+                yield path, f"could not read the file: {e}"
+
+    processes = max(1, processes or os.cpu_count() or 1)
+    if processes == 1:
+        yield from map(validate_chunk, jobs())
+        return
+    # Spawned workers import only this module's dependencies
+    with get_context('spawn').Pool(processes) as pool:
+        pending = deque()
+        for job in jobs():
+            pending.append(pool.apply_async(validate_chunk, (job,)))
+            if len(pending) > 2 * processes:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+# --- Merging ---
+def option_column(position):
+    """Name of the bank's option column at a 1-based position."""
+    return f"options__{position:03d}"
+
+
+def read_bank_keys(bank_path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Streams an existing bank CSV and returns its header and the question keys of its rows."""
+    if not os.path.exists(bank_path):
+        return [], np.empty(0, dtype=np.int64)
+    header, keys = None, []
+    for frame in pd.read_csv(bank_path, dtype=str, chunksize=chunk_rows, **CSV_NA_OPTIONS):
+        header = header or list(frame.columns)
+        option_cols = sorted(col for col in frame.columns if col.startswith('options__'))
+        keys.append(question_keys(frame, pack_options(frame, option_cols)))
+    if header is None:
+        header = list(pd.read_csv(bank_path, dtype=str, nrows=0).columns)
+    return header, np.concatenate(keys) if keys else np.empty(0, dtype=np.int64)
+
+
+def merged_header(header, option_count, optional_columns=()):
+    """
+    The bank's header widened to option_count options and any new optional
+    columns; a new bank gets the standard column order.
+    """
+    if not header:
+        return (['event', 'topic', 'question'] + [option_column(n) for n in range(1, option_count + 1)]
+                + ['answer', 'subtopic', 'difficulty', 'hint', 'explanation'] + list(optional_columns))
+    option_cols = [col for col in header if col.startswith('options__')]
+    added = [option_column(n) for n in range(len(option_cols) + 1, option_count + 1)]
+    # New option columns go right after the last existing one
+    after = option_cols[-1] if option_cols else 'question'
+    position = header.index(after) + 1 if after in header else len(header)
+    header = header[:position] + added + header[position:]
+    return header + [column for column in TEXT_COLUMNS + list(optional_columns) if column not in header]
+
+
+def write_merged_bank(bank_path, header, spool_path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Writes the existing bank followed by the spooled new questions to a
+    temporary file next to bank_path, then swaps it in with os.replace.
+    """
+    directory = os.path.dirname(os.path.abspath(bank_path))
+    handle, temp_path = tempfile.mkstemp(prefix='.import-', suffix='.csv', dir=directory)
+    try:
+        with os.fdopen(handle, 'w', encoding='utf-8', newline='') as out:
+            out.write(','.join(f'"{column}"' for column in header) + '\n')
+            if os.path.exists(bank_path):
+                for frame in pd.read_csv(bank_path, dtype=str, chunksize=chunk_rows, **CSV_NA_OPTIONS):
+                    frame.reindex(columns=header, fill_value='').to_csv(out, header=False, index=False, quoting=csv.QUOTE_ALL)
+            with open(spool_path, encoding='utf-8') as spool:
+                batch = []
+                for line in spool:
+                    question = json.loads(line)
+                    row = {column: question.get(column, '') for column in header if not column.startswith('options__')}
+                    row.update((option_column(n), option) for n, option in enumerate(question['options'], start=1))
+                    batch.append(row)
+                    if len(batch) == chunk_rows:
+                        pd.DataFrame(batch).reindex(columns=header, fill_value='').to_csv(out, header=False, index=False, quoting=csv.QUOTE_ALL)
+                        batch = []
+                if batch:
+                    pd.DataFrame(batch).reindex(columns=header, fill_value='').to_csv(out, header=False, index=False, quoting=csv.QUOTE_ALL)
+        os.replace(temp_path, bank_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def import_questions(paths, bank_path, report_path=None, processes=None, chunk_rows=DEFAULT_CHUNK_ROWS, check=False, strict=False,
+                     asset_root='assets'):
+    """
+    Validates the source files and merges their valid, new questions into
+    the bank CSV at bank_path. Image files the questions refer to are added
+    to the asset store at asset_root. Writes every problem to report_path
+    (CSV, or JSON Lines for a .jsonl path) as it is found. Returns a
+    summary dict of row counts.
+    """
+    assets = AssetStore(asset_root, cache_bytes=0)
+    header, bank_keys = read_bank_keys(bank_path, chunk_rows)
+    in_bank = set(bank_keys.tolist())
+    imported = set()
+    summary = {'rows': 0, 'valid': 0, 'errors': 0, 'invalid_rows': 0, 'in_bank': 0, 'repeated': 0, 'added': 0}
+    option_count = sum(1 for column in header if column.startswith('options__'))
+    optional = set()
+
+    report = open(report_path, 'w', encoding='utf-8', newline='') if report_path else None
+    as_json = bool(report_path) and report_path.endswith(('.jsonl', '.json'))
+    writer = csv.writer(report) if report and not as_json else None
+    if writer:
+        writer.writerow(REPORT_COLUMNS)
+
+    def note(source, row, severity, field, message, value):
+        if severity == 'error':
+            logger.debug("%s row %s: %s %s", source, row, field, message)
+        if report is None:
+            return
+        entry = [source, row, severity, field, message, str(value)[:REPORT_VALUE_CHARS]]
+        if as_json:
+            report.write(json.dumps(dict(zip(REPORT_COLUMNS, entry))) + '\n')
+        else:
+            writer.writerow(entry)
+
+    spool = tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.jsonl', delete=False)
+    try:
+        with spool:
+            for source, valid, keys, errors in validated_chunks(paths, chunk_rows, processes):
+                invalid_rows = len({row for row, *_ in errors if row != ''})
+                summary['rows'] += len(valid) + invalid_rows
+                summary['valid'] += len(valid)
+                summary['invalid_rows'] += invalid_rows
+                summary['errors'] += len(errors)
+                for row, field, message, value in errors:
+                    note(source, row, 'error', field, message, value)
+                for (row, question), key in zip(valid, keys):
+                    if key in in_bank or key in imported:
+                        skipped = 'in_bank' if key in in_bank else 'repeated'
+                        summary[skipped] += 1
+                        note(source, row, 'skipped', 'question',
+                             "is already in the bank" if skipped == 'in_bank' else "repeats a question earlier in the import", question['question'])
+                        continue
+                    imported.add(key)
+                    summary['added'] += 1
+                    option_count = max(option_count, len(question['options']))
+                    optional.update(column for column in OPTIONAL_COLUMNS if question.get(column))
+                    digest = parse_digest(question['image']) if question['image'] else None
+                    if digest and assets.resolve(digest) is None:
+                        note(source, row, 'warning', 'image', "is not in the asset store", question['image'])
+                    elif question['image'] and not digest and not check:
+                        question['image'] = assets.add(question['image'])
+                    spool.write(json.dumps(question) + '\n')
+        if report:
+            report.close()
+
+        if check or (strict and summary['errors']):
+            if summary['added']:
+                logger.info("Not merging %d new question(s)%s", summary['added'], "" if check else " because of errors (--strict)")
+            summary['added'] = 0
+        elif summary['added']:
+            write_merged_bank(bank_path, merged_header(header, option_count, sorted(optional)), spool.name, chunk_rows)
+    finally:
+        if report and not report.closed:
+            report.close()
+        os.unlink(spool.name)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate question sets (CSV, JSON, JSON Lines, .xlsx) and merge them into the bank.")
+    parser.add_argument('sources', nargs='+', help="Files to import")
+    parser.add_argument('--bank', default=os.environ.get("SCIOLY_QUESTIONS_PATH", "questions_full.csv"), help="Bank CSV to merge into")
+    parser.add_argument('--assets', default=os.environ.get("SCIOLY_ASSET_DIR", "assets"), help="Asset store for the questions' images")
+    parser.add_argument('--report', help="Write every problem to this file (CSV, or JSON Lines for .jsonl)")
+    parser.add_argument('--processes', type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help="Rows per validation task")
+    parser.add_argument('--check', action='store_true', help="Only validate; leave the bank untouched")
+    parser.add_argument('--strict', action='store_true', help="Merge nothing unless every row is valid")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    summary = import_questions(args.sources, args.bank, args.report, args.processes, args.chunk_rows, args.check, args.strict, args.assets)
+    logger.info("%d row(s) read: %d valid, %d with %d error(s); %d already in the bank, %d repeated; %d added to %s",
+                summary['rows'], summary['valid'], summary['invalid_rows'], summary['errors'],
+                summary['in_bank'], summary['repeated'], summary['added'], args.bank)
+    return 1 if summary['errors'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
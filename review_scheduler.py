@@ -0,0 +1,187 @@
+import argparse
+import heapq
+import itertools
+import random
+import time
+from typing import NamedTuple
+
+# SM-2 parameters
+DAY_SECONDS = 86400
+DEFAULT_EASE = 2.5
+MINIMUM_EASE = 1.3
+# A failed card comes back within the same study session instead of tomorrow
+RELEARN_SECONDS = 600
+
+
+class Card(NamedTuple):
+    """One question's review state for one student."""
+    card_id: int
+    ease: float = DEFAULT_EASE
+    interval_days: float = 0.0
+    repetitions: int = 0
+    due_at: float = 0.0
+
+
+def new_card(card_id, now=None):
+    """Returns a card that has never been reviewed and is due immediately."""
+    return Card(int(card_id), due_at=time.time() if now is None else now)
+
+
+def grade_from_outcome(correct, hint_used=False):
+    """
+    Maps a drill outcome onto the SM-2 0-5 quality scale: a clean correct
+    answer is a 5, correct with a hint is a 3 (a pass, but hard), and a miss
+    is a 1.
+    """
+    if not correct:
+        return 1
+    return 3 if hint_used else 5
+
+
+def review(card, quality, now=None):
+    """
+    Applies one SM-2 review and returns the updated card. Qualities below 3
+    reset the repetition count and bring the card back after RELEARN_SECONDS.
+    """
+    now = time.time() if now is None else now
+    ease = max(MINIMUM_EASE, card.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    if quality < 3:
+        return card._replace(ease=ease, interval_days=0.0, repetitions=0, due_at=now + RELEARN_SECONDS)
+
+    repetitions = card.repetitions + 1
+    if repetitions == 1:
+        interval_days = 1.0
+    elif repetitions == 2:
+        interval_days = 6.0
+    else:
+        interval_days = round(card.interval_days * ease, 2)
+    return card._replace(ease=ease, interval_days=interval_days, repetitions=repetitions, due_at=now + interval_days * DAY_SECONDS)
+
+
+class ReviewQueue:
+    """
+    A student's cards ordered by due date. Backed by a binary heap with lazy
+    deletion: rescheduling a card pushes a new entry and marks the old one
+    stale, so push/pop are O(log n) and "next N due" is O(N log n).
+    """
+
+    def __init__(self, cards=()):
+        self._cards = {}
+        self._versions = {}
+        self._counter = itertools.count()
+        self._heap = []
+        for card in cards:
+            version = next(self._counter)
+            self._cards[card.card_id] = card
+            self._versions[card.card_id] = version
+            self._heap.append((card.due_at, version, card.card_id))
+        heapq.heapify(self._heap)
+
+    def __len__(self):
+        return len(self._cards)
+
+    def __contains__(self, card_id):
+        return card_id in self._cards
+
+    def get(self, card_id):
+        """Returns the card with this ID, or None."""
+        return self._cards.get(card_id)
+
+    def push(self, card):
+        """Adds a card or reschedules an existing one."""
+        version = next(self._counter)
+        self._cards[card.card_id] = card
+        self._versions[card.card_id] = version
+        heapq.heappush(self._heap, (card.due_at, version, card.card_id))
+        # Rebuild once stale entries dominate, so the heap stays O(n) in size
+        if len(self._heap) > 2 * len(self._cards) + 64:
+            self._compact()
+
+    def _is_current(self, entry):
+        _, version, card_id = entry
+        return self._versions.get(card_id) == version
+
+    def _discard_stale(self):
+        while self._heap and not self._is_current(self._heap[0]):
+            heapq.heappop(self._heap)
+
+    def _compact(self):
+        self._heap = [entry for entry in self._heap if self._is_current(entry)]
+        heapq.heapify(self._heap)
+
+    def next_due_at(self):
+        """Returns when the earliest card is due, or None if the queue is empty."""
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def due(self, now=None, limit=10):
+        """Returns up to `limit` cards due by `now`, earliest first, without removing them."""
+        now = time.time() if now is None else now
+        taken = []
+        cards = []
+        while len(cards) < limit:
+            self._discard_stale()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            entry = heapq.heappop(self._heap)
+            taken.append(entry)
+            cards.append(self._cards[entry[2]])
+        for entry in taken:
+            heapq.heappush(self._heap, entry)
+        return cards
+
+    def pop_due(self, now=None):
+        """Removes and returns the earliest card due by `now`, or None."""
+        now = time.time() if now is None else now
+        self._discard_stale()
+        if not self._heap or self._heap[0][0] > now:
+            return None
+        _, _, card_id = heapq.heappop(self._heap)
+        self._versions.pop(card_id)
+        return self._cards.pop(card_id)
+
+
+def run_benchmark(card_count=1_000_000, operations=100_000, seed=0):
+    """Times bulk load, 'next 20 due' lookups, reviews and pops on a queue of card_count cards."""
+    rng = random.Random(seed)
+    now = time.time()
+    cards = [Card(card_id, due_at=now + rng.uniform(-30, 30) * DAY_SECONDS) for card_id in range(card_count)]
+
+    def timed(label, func, count=1):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        print(f"{label:<32} {elapsed * 1000:10.1f} ms total {elapsed / count * 1e6:10.2f} us/op")
+
+    queue = None
+
+    def build():
+        nonlocal queue
+        queue = ReviewQueue(cards)
+
+    def peek():
+        for _ in range(operations // 10):
+            queue.due(now, limit=20)
+
+    def reschedule():
+        for _ in range(operations):
+            card = queue.get(rng.randrange(card_count))
+            queue.push(review(card, rng.choice((1, 3, 5)), now))
+
+    def pop():
+        for _ in range(operations):
+            queue.pop_due(now + 60 * DAY_SECONDS)
+
+    print(f"ReviewQueue benchmark: {card_count:,} cards, {operations:,} operations")
+    timed("build (heapify)", build, card_count)
+    timed("due(limit=20)", peek, operations // 10)
+    timed("review + push", reschedule, operations)
+    timed("pop_due", pop, operations)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the spaced-repetition review queue.")
+    parser.add_argument('--cards', type=int, default=1_000_000)
+    parser.add_argument('--operations', type=int, default=100_000)
+    args = parser.parse_args()
+    run_benchmark(args.cards, args.operations)
@@ -0,0 +1,206 @@
+import random
+
+import numpy as np
+
+# Defaults matching the original drill: up to 5 questions per topic, at most 10 in total
+DEFAULT_PER_TOPIC = 5
+DEFAULT_DRILL_SIZE = 10
+
+# Registered sampling strategies, keyed by the name shown in the UI
+STRATEGIES = {}
+
+
+def register_strategy(name):
+    """Decorator that registers a per-topic sampling strategy under a name."""
+    def decorator(func):
+        STRATEGIES[name] = func
+        return func
+    return decorator
+
+
+def make_rng(seed=None):
+    """Returns a random generator; pass a seed to make drills reproducible."""
+    return random.Random(seed)
+
+
+class AliasTable:
+    """
+    Walker/Vose alias table over a list of weights. Building costs O(n) once;
+    every draw afterwards is O(1).
+    """
+
+    def __init__(self, weights):
+        count = len(weights)
+        total = float(sum(weights))
+        scaled = [weight * count / total for weight in weights]
+        self.probability = [0.0] * count
+        self.alias = [0] * count
+
+        small = [i for i, weight in enumerate(scaled) if weight < 1.0]
+        large = [i for i, weight in enumerate(scaled) if weight >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+        for i in small + large:
+            self.probability[i] = 1.0
+
+    def __len__(self):
+        return len(self.probability)
+
+    def sample(self, rng):
+        """Draws one position, proportional to its weight."""
+        i = rng.randrange(len(self.probability))
+        return i if rng.random() < self.probability[i] else self.alias[i]
+
+
+def _sample_positions(count, k, rng, exclude=None):
+    """
+    Draws k distinct positions from range(count) in O(k), skipping positions
+    in `exclude`, and returns them in draw order. Falls back to a scan of the remaining positions when the
+    exclusions leave too few candidates for rejection sampling.
+    """
+    exclude = exclude or set()
+    available = count - len(exclude)
+    k = min(k, max(available, 0))
+    if k <= 0:
+        return []
+    if available < 2 * k:
+        remaining = [position for position in range(count) if position not in exclude]
+        return rng.sample(remaining, k)
+
+    # A dict keeps the draws in order (a set of small ints would come back sorted)
+    chosen = {}
+    while len(chosen) < k:
+        position = rng.randrange(count)
+        if position not in exclude:
+            chosen[position] = None
+    return list(chosen)
+
+
+@register_strategy('uniform')
+def sample_uniform(topic_rows, k, rng, context):
+    """Every question in the topic is equally likely."""
+    row_ids = topic_rows['all']
+    return [int(row_ids[position]) for position in rng.sample(range(len(row_ids)), min(k, len(row_ids)))]
+
+
+@register_strategy('difficulty-stratified')
+def sample_stratified(topic_rows, k, rng, context):
+    """Spreads the k questions as evenly as possible across the topic's difficulty levels."""
+    buckets = [row_ids for _, row_ids in sorted(topic_rows['by_difficulty'].items())]
+    quotas = [0] * len(buckets)
+    remaining = min(k, sum(len(row_ids) for row_ids in buckets))
+    while remaining:
+        for i, row_ids in enumerate(buckets):
+            if remaining and quotas[i] < len(row_ids):
+                quotas[i] += 1
+                remaining -= 1
+
+    selected = []
+    for row_ids, quota in zip(buckets, quotas):
+        selected.extend(int(row_ids[position]) for position in rng.sample(range(len(row_ids)), quota))
+    return selected
+
+
+@register_strategy('weighted-misses')
+def sample_weighted_misses(topic_rows, k, rng, context):
+    """
+    Questions the student has missed before are weighted by 1 + their miss
+    count. Unmissed questions share the base weight, so only the missed rows
+    need an alias table and each draw stays O(1).
+    """
+    row_ids = topic_rows['all']
+    misses = {row_id: count for row_id, count in (context.get('miss_counts') or {}).items() if count > 0}
+    missed = [(int(row_ids[position]), misses[int(row_ids[position])]) for position in positions_of(row_ids, misses)]
+    k = min(k, len(row_ids))
+    if not missed:
+        return sample_uniform(topic_rows, k, rng, context)
+
+    table = AliasTable([count for _, count in missed])
+    base_weight = len(row_ids)
+    total_weight = base_weight + sum(count for _, count in missed)
+
+    # Distinct picks in draw order
+    chosen = {}
+    attempts = 0
+    while len(chosen) < k and attempts < 20 * k:
+        attempts += 1
+        if rng.random() * total_weight < base_weight:
+            chosen[int(row_ids[rng.randrange(len(row_ids))])] = None
+        else:
+            chosen[int(missed[table.sample(rng)][0])] = None
+
+    # Top up with uniform picks if duplicates kept the weighted draws short
+    if len(chosen) < k:
+        positions = [position for position in range(len(row_ids)) if int(row_ids[position]) not in chosen]
+        chosen.update((int(row_ids[position]), None) for position in rng.sample(positions, k - len(chosen)))
+    return list(chosen)
+
+
+@register_strategy('unseen-first')
+def sample_unseen(topic_rows, k, rng, context):
+    """
+    Samples without replacement across drills: questions in `seen` are
+    skipped until the whole topic has been served, then the topic starts over.
+    """
+    row_ids = topic_rows['all']
+    k = min(k, len(row_ids))
+    excluded = set(positions_of(row_ids, context.get('seen') or ()))
+    if len(excluded) >= len(row_ids):
+        excluded = set()
+
+    positions = _sample_positions(len(row_ids), k, rng, excluded)
+    if len(positions) < k:
+        # The unseen pool ran dry partway through; fill from the rest of the topic
+        positions += _sample_positions(len(row_ids), k - len(positions), rng, set(positions))
+    return [int(row_ids[position]) for position in positions]
+
+
+def positions_of(row_ids, wanted):
+    """
+    Finds the positions of the wanted row IDs inside a sorted row-ID array
+    with binary search, so the cost depends on len(wanted), not the topic size.
+    """
+    wanted = np.fromiter(wanted, dtype=np.int64)
+    if not len(wanted) or not len(row_ids):
+        return []
+    positions = np.searchsorted(row_ids, wanted)
+    in_range = positions < len(row_ids)
+    positions, wanted = positions[in_range], wanted[in_range]
+    return positions[row_ids[positions] == wanted].tolist()
+
+
+def topic_rows_for(index, event_name, topic):
+    """Bundles the prebuilt row-ID arrays a strategy needs for one topic."""
+    row_ids = index['topic_rows'].get(event_name, {}).get(topic)
+    if row_ids is None or not len(row_ids):
+        return None
+    return {'all': row_ids, 'by_difficulty': index['rows'][event_name][topic]}
+
+
+def sample_drill(index, event_name, topics, strategy='uniform', per_topic=DEFAULT_PER_TOPIC,
+                 drill_size=DEFAULT_DRILL_SIZE, rng=None, context=None):
+    """
+    Picks up to `per_topic` questions from each topic with the named strategy,
+    then shuffles and caps the drill at `drill_size`. Returns row IDs.
+    `context` carries per-student state some strategies use ('miss_counts',
+    'seen').
+    """
+    rng = rng or make_rng()
+    context = context or {}
+    sample_topic = STRATEGIES[strategy]
+
+    final_questions = []
+    for topic in topics:
+        topic_rows = topic_rows_for(index, event_name, topic)
+        if topic_rows is not None:
+            final_questions.extend(sample_topic(topic_rows, per_topic, rng, context))
+
+    # Small drills keep the per-topic order; larger ones are shuffled and capped
+    if len(final_questions) < drill_size:
+        return final_questions
+    rng.shuffle(final_questions)
+    return final_questions[:drill_size]
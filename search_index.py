@@ -0,0 +1,147 @@
+import math
+import re
+import time
+from collections import Counter
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+", re.UNICODE)
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was what which who why with".split()
+)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Fuzzy matches score lower than exact ones, by edit distance
+FUZZY_WEIGHTS = {0: 1.0, 1: 0.7, 2: 0.5}
+
+
+def tokenize(text):
+    """Lowercases and splits text into word tokens, dropping stopwords."""
+    return [token for token in TOKEN_PATTERN.findall(str(text).lower()) if token not in STOPWORDS]
+
+
+def _deletes(term, distance):
+    """All strings reachable from term by deleting up to `distance` characters."""
+    results = {term}
+    frontier = {term}
+    for _ in range(distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word)) if len(word) > 1}
+        results |= frontier
+    return results
+
+
+def edit_distance(a, b, limit):
+    """Optimal-string-alignment distance between a and b, or limit + 1 once it exceeds limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous_previous is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def max_typos(term):
+    """How many typos a query term tolerates: none for short words, two for long ones."""
+    if len(term) <= 3:
+        return 0
+    return 1 if len(term) <= 7 else 2
+
+
+class SearchIndex:
+    """
+    Tokenized inverted index with BM25 ranking over a list of documents.
+    Postings are numpy arrays of document IDs and term frequencies; typos are
+    handled with a symmetric-delete table over the vocabulary.
+    """
+
+    def __init__(self, documents):
+        started = time.perf_counter()
+        postings = {}
+        doc_lengths = []
+        for doc_id, text in enumerate(documents):
+            counts = Counter(tokenize(text))
+            doc_lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(doc_id)
+                postings[term][1].append(count)
+
+        self.doc_count = len(doc_lengths)
+        self.doc_lengths = np.array(doc_lengths, dtype=np.float32)
+        self.average_length = float(self.doc_lengths.mean()) if self.doc_count else 0.0
+        self.postings = {
+            term: (np.array(doc_ids, dtype=np.int32), np.array(counts, dtype=np.float32))
+            for term, (doc_ids, counts) in postings.items()
+        }
+
+        # Symmetric-delete table: every one-character deletion of a term points back at the term
+        self.deletes = {}
+        for term in self.postings:
+            if len(term) > 3:
+                for deleted in _deletes(term, 1):
+                    self.deletes.setdefault(deleted, []).append(term)
+        self.build_seconds = time.perf_counter() - started
+
+    def __len__(self):
+        return self.doc_count
+
+    def expand(self, term):
+        """Returns {vocabulary term: edit distance} for the exact term and its close misspellings."""
+        matches = {term: 0} if term in self.postings else {}
+        limit = max_typos(term)
+        if not limit:
+            return matches
+        candidates = set()
+        for deleted in _deletes(term, limit):
+            candidates.update(self.deletes.get(deleted, ()))
+            if deleted in self.postings:
+                candidates.add(deleted)
+        for candidate in candidates:
+            if candidate not in matches:
+                distance = edit_distance(term, candidate, limit)
+                if distance <= limit:
+                    matches[candidate] = distance
+        return matches
+
+    def search(self, query, limit=20):
+        """Returns up to `limit` (doc_id, score) pairs, best first."""
+        if not self.doc_count:
+            return []
+        scores = np.zeros(self.doc_count, dtype=np.float32)
+        length_norm = K1 * (1 - B + B * self.doc_lengths / max(self.average_length, 1e-9))
+        for query_term in set(tokenize(query)):
+            for term, distance in self.expand(query_term).items():
+                doc_ids, frequencies = self.postings[term]
+                idf = math.log(1 + (self.doc_count - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+                weight = idf * FUZZY_WEIGHTS[distance]
+                scores[doc_ids] += weight * frequencies * (K1 + 1) / (frequencies + length_norm[doc_ids])
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        if len(matched) > limit:
+            matched = matched[np.argpartition(-scores[matched], limit - 1)[:limit]]
+        ordered = matched[np.argsort(-scores[matched], kind='stable')]
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in ordered]
+
+
+def question_documents(bank, fields=('question', 'hint', 'explanation')):
+    """Yields one searchable text per row of a QuestionBank; repeated copies of a question are left empty."""
+    columns = [bank.columns[field] for field in fields if field in bank.columns]
+    for row_id in range(len(bank)):
+        if row_id in bank.repeated_rows:
+            yield ""
+            continue
+        yield " ".join(str(value) for value in (column[row_id] for column in columns) if isinstance(value, str))
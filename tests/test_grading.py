@@ -0,0 +1,68 @@
+import pytest
+
+from grading import CONFUSABLE_TERMS, compile_answer, grade, normalize, parse_quantity
+
+
+@pytest.mark.parametrize("answer, given", [
+    ('alkane', 'alkene'),
+    ('alkene', 'alkane'),
+    ('nitrate', 'nitrite'),
+    ('sulfate', 'sulfite'),
+    ('afferent', 'efferent'),
+    ('exothermic', 'endothermic'),
+    ('hypertonic', 'hypotonic'),
+])
+def test_typo_that_spells_another_term_is_wrong(answer, given):
+    assert not grade(compile_answer(answer), given)
+
+
+@pytest.mark.parametrize("answer, given", [
+    ('alkane', 'alkanne'),
+    ('nitrate', 'nitrat'),
+    ('photosynthesis', 'photosynthsis'),
+])
+def test_plain_typo_is_forgiven(answer, given):
+    assert grade(compile_answer(answer), given)
+
+
+def test_typo_onto_another_bank_answer_is_wrong():
+    assert grade(compile_answer('ecliptic'), 'elliptic')
+    rule = compile_answer('ecliptic', (), CONFUSABLE_TERMS | {'ecliptic', 'elliptic'})
+    assert not grade(rule, 'elliptic')
+    assert grade(rule, 'eclptic')
+
+
+def test_confusable_terms_are_normalized():
+    assert all(normalize(term) == term for term in CONFUSABLE_TERMS)
+
+
+@pytest.mark.parametrize("answer, given, expected", [
+    ('6.022×10^23', '6.02e23', True),
+    ('6.022×10^23', '6.022e23', True),
+    ('6.022×10^23', '6.03e23', False),
+    ('6.022×10^23', '6.0e23', False),
+    ('6.022×10^23', '6e23', False),
+    ('9.81', '9.812', True),
+    ('9.81', '9.8', False),
+    ('1.496e11 m', '1.50e11', True),
+    ('1.496e11 m', '1.00 AU', True),
+    ('0.00512 kg', '5.12 g', True),
+    ('0.00512 kg', '0.0051 kg', False),
+    ('5 km', '5', True),
+    ('1990', '1990.0', True),
+    ('1990', '1991', False),
+    ('2.5 km', '2.5 kg', False),
+])
+def test_number_precision(answer, given, expected):
+    assert grade(compile_answer(answer), given) is expected
+
+
+@pytest.mark.parametrize("text, figures", [
+    ('6.022e23', 4),
+    ('6.02×10^23', 3),
+    ('0.0050', 2),
+    ('1.000e3', 4),
+    ('-3.10 km', 3),
+])
+def test_significant_figures(text, figures):
+    assert parse_quantity(text).figures == figures
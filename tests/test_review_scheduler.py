@@ -0,0 +1,64 @@
+import pytest
+
+from review_scheduler import (
+    DAY_SECONDS, DEFAULT_EASE, MINIMUM_EASE, RELEARN_SECONDS, Card, ReviewQueue, grade_from_outcome, new_card, review,
+)
+
+NOW = 1_700_000_000.0
+
+
+def test_intervals_grow_one_six_then_by_ease():
+    card = new_card(1, NOW)
+    card = review(card, 5, NOW)
+    assert (card.repetitions, card.interval_days, card.due_at) == (1, 1.0, NOW + DAY_SECONDS)
+    card = review(card, 5, NOW)
+    assert (card.repetitions, card.interval_days) == (2, 6.0)
+    ease = card.ease + 0.1
+    card = review(card, 5, NOW)
+    assert card.repetitions == 3
+    assert card.interval_days == pytest.approx(round(6.0 * ease, 2))
+    assert card.due_at == pytest.approx(NOW + card.interval_days * DAY_SECONDS)
+
+
+@pytest.mark.parametrize("quality, change", [(5, 0.1), (4, 0.0), (3, -0.14)])
+def test_ease_change_per_quality(quality, change):
+    assert review(new_card(1, NOW), quality, NOW).ease == pytest.approx(DEFAULT_EASE + change)
+
+
+def test_ease_never_drops_below_floor():
+    card = new_card(1, NOW)
+    for _ in range(20):
+        card = review(card, 0, NOW)
+    assert card.ease == MINIMUM_EASE
+    assert review(card, 3, NOW).ease == MINIMUM_EASE
+
+
+def test_failure_resets_and_comes_back_soon():
+    card = Card(1, ease=2.0, interval_days=15.0, repetitions=4, due_at=NOW)
+    failed = review(card, 1, NOW)
+    assert (failed.repetitions, failed.interval_days, failed.due_at) == (0, 0.0, NOW + RELEARN_SECONDS)
+    assert review(failed, 5, NOW).interval_days == 1.0
+
+
+def test_grade_from_outcome():
+    assert grade_from_outcome(True) == 5
+    assert grade_from_outcome(True, hint_used=True) == 3
+    assert grade_from_outcome(False) == 1
+    assert grade_from_outcome(False, hint_used=True) == 1
+
+
+def test_queue_returns_due_cards_earliest_first():
+    queue = ReviewQueue([Card(card_id, due_at=NOW + card_id * 10) for card_id in (3, 1, 2, 5)])
+    assert [card.card_id for card in queue.due(NOW + 30)] == [1, 2, 3]
+    assert [card.card_id for card in queue.due(NOW + 30, limit=2)] == [1, 2]
+    assert queue.next_due_at() == NOW + 10
+
+
+def test_rescheduled_card_leaves_its_old_slot():
+    queue = ReviewQueue([Card(1, due_at=NOW), Card(2, due_at=NOW + 5)])
+    queue.push(review(queue.get(1), 5, NOW))
+    assert [card.card_id for card in queue.due(NOW + 10)] == [2]
+    assert queue.next_due_at() == NOW + 5
+    assert queue.pop_due(NOW + 10).card_id == 2
+    assert queue.pop_due(NOW + 10) is None
+    assert len(queue) == 1 and 1 in queue
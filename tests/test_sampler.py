@@ -0,0 +1,74 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from sampler import AliasTable, _sample_positions, make_rng, sample_drill, sample_unseen, sample_weighted_misses
+
+
+@pytest.mark.parametrize("weights", [
+    [1, 1, 1, 1],
+    [1, 2, 3, 4],
+    [10, 1, 0.5, 0.1, 7],
+    [5],
+])
+def test_alias_table_matches_weights(weights):
+    table = AliasTable(weights)
+    rng = make_rng(1234)
+    draws = 200_000
+    counts = Counter(table.sample(rng) for _ in range(draws))
+    total = sum(weights)
+    for position, weight in enumerate(weights):
+        assert counts[position] / draws == pytest.approx(weight / total, abs=0.005)
+
+
+def test_alias_table_never_draws_zero_weight():
+    table = AliasTable([0, 3, 0, 1])
+    rng = make_rng(7)
+    assert {table.sample(rng) for _ in range(10_000)} == {1, 3}
+
+
+def test_sample_positions_distinct_in_draw_order():
+    positions = _sample_positions(1000, 50, make_rng(3), exclude={0, 1, 2})
+    assert len(set(positions)) == 50
+    assert not {0, 1, 2} & set(positions)
+    assert positions != sorted(positions)
+
+
+def _index(topic_sizes):
+    topic_rows, rows, start = {}, {}, 0
+    for topic, size in topic_sizes.items():
+        row_ids = np.arange(start, start + size, dtype=np.int64)
+        topic_rows[topic] = row_ids
+        rows[topic] = {'Easy': row_ids[::2], 'Hard': row_ids[1::2]}
+        start += size
+    return {'topic_rows': {'Event': topic_rows}, 'rows': {'Event': rows}}
+
+
+def test_same_seed_same_drill():
+    index = _index({'A': 40, 'B': 40, 'C': 3})
+    for strategy in ('uniform', 'difficulty-stratified', 'weighted-misses', 'unseen-first'):
+        drills = [
+            sample_drill(index, 'Event', ['A', 'B', 'C'], strategy=strategy, rng=make_rng(99),
+                         context={'miss_counts': {1: 2, 50: 1}, 'seen': {0, 41}})
+            for _ in range(2)
+        ]
+        assert drills[0] == drills[1]
+        assert len(drills[0]) == 10 and len(set(drills[0])) == 10
+
+
+def test_weighted_misses_favors_missed_rows():
+    topic_rows = {'all': np.arange(100, dtype=np.int64)}
+    rng = make_rng(5)
+    picks = Counter()
+    for _ in range(2000):
+        picks.update(sample_weighted_misses(topic_rows, 1, rng, {'miss_counts': {7: 99}}))
+    # Row 7 carries 100 of the 199 units of weight
+    assert picks[7] / 2000 == pytest.approx(100 / 199, abs=0.05)
+
+
+def test_unseen_first_skips_seen_until_topic_is_used_up():
+    topic_rows = {'all': np.arange(10, dtype=np.int64)}
+    rng = make_rng(11)
+    assert set(sample_unseen(topic_rows, 4, rng, {'seen': set(range(6))})) == {6, 7, 8, 9}
+    assert len(sample_unseen(topic_rows, 4, rng, {'seen': set(range(10))})) == 4
@@ -0,0 +1,231 @@
+"""
+Mock-tournament exams: one timed section per event, built with the same
+per-topic selection as a drill (sampler.sample_drill).
+
+Batches of exam variants are generated in a process pool. Every topic's
+questions are shuffled once and dealt out into disjoint shares, one per
+variant, so no two variants in a batch repeat a question (as long as the
+bank is big enough; short sections are reported).
+
+    python tournament.py --section Astronomy:20:25 --section "Anatomy:15:20:Skeletal|Muscular" --variants 30 --processes 4 -o exams
+"""
+import argparse
+import html
+import io
+import logging
+import math
+import os
+import string
+import zipfile
+from multiprocessing import get_context
+from typing import NamedTuple
+
+import numpy as np
+
+from question_bank import load_bank
+from sampler import make_rng, sample_drill
+
+logger = logging.getLogger(__name__)
+
+EXAM_HEAD = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: Georgia, serif; max-width: 48rem; margin: 2rem auto; line-height: 1.45; }}
+h1 {{ font-size: 1.6rem; border-bottom: 2px solid #333; }}
+h2 {{ font-size: 1.2rem; margin-top: 1.5rem; }}
+ol {{ padding-left: 1.6rem; }}
+li.question {{ margin-bottom: 0.9rem; break-inside: avoid; }}
+ul.options {{ list-style: none; padding-left: 0.8rem; margin: 0.3rem 0; }}
+.blank {{ display: inline-block; width: 16rem; border-bottom: 1px solid #333; }}
+.answer-key {{ break-before: page; }}
+@media print {{ body {{ margin: 0; font-size: 11pt; }} h2 {{ break-after: avoid; }} }}
+</style></head><body>
+<h1>{title}</h1>
+<p>Name: <span class="blank"></span> Team: <span class="blank"></span></p>
+"""
+
+
+class Section(NamedTuple):
+    """One timed exam section: an event, how many questions, how long, and which topics (empty: all)."""
+    event: str
+    questions: int
+    minutes: float
+    topics: tuple = ()
+
+
+def parse_section(spec):
+    """Parses 'EVENT:QUESTIONS:MINUTES[:TOPIC|TOPIC...]' into a Section."""
+    parts = spec.split(':')
+    if len(parts) not in (3, 4):
+        raise ValueError(f"Bad section {spec!r}; expected EVENT:QUESTIONS:MINUTES[:TOPIC|TOPIC...].")
+    topics = tuple(topic for topic in parts[3].split('|') if topic) if len(parts) == 4 else ()
+    return Section(parts[0], int(parts[1]), float(parts[2]), topics)
+
+
+def partition_index(index, part, parts, seed=0):
+    """
+    Restricts a question index to share `part` of `parts`: every topic's rows
+    are shuffled with `seed` and dealt out round-robin, so different parts
+    never share a question. Returns an index with the same layout.
+    """
+    rng = np.random.default_rng(seed)
+    shared = {'events': index['events'], 'topics': index['topics'], 'rows': {}, 'topic_rows': {}, 'counts': {}}
+    for event_name in index['events']:
+        shared['rows'][event_name] = {}
+        shared['topic_rows'][event_name] = {}
+        shared['counts'][event_name] = {}
+        for topic in index['topics'][event_name]:
+            # The shuffle is drawn for every topic in the same order, so each part sees the same deal
+            share = np.sort(rng.permutation(index['topic_rows'][event_name][topic])[part::parts])
+            shared['topic_rows'][event_name][topic] = share
+            shared['counts'][event_name][topic] = len(share)
+            shared['rows'][event_name][topic] = {
+                difficulty: np.intersect1d(row_ids, share, assume_unique=True)
+                for difficulty, row_ids in index['rows'][event_name][topic].items()
+            }
+    return shared
+
+
+def build_exam(index, sections, rng, strategy='uniform'):
+    """
+    Picks each section's questions like a drill does: up to an even share per
+    topic, shuffled and capped at the section length. Two sections on the
+    same event never repeat a question. Returns one list of row IDs per
+    section.
+    """
+    exam = []
+    for section in sections:
+        topics = section.topics or index['topics'].get(section.event, ())
+        per_topic = math.ceil(section.questions / max(len(topics), 1))
+        row_ids = sample_drill(index, section.event, topics, strategy=strategy, per_topic=per_topic,
+                               drill_size=section.questions, rng=rng)
+        rng.shuffle(row_ids)
+        exam.append(row_ids[:section.questions])
+        index = without_rows(index, section.event, exam[-1])
+    return exam
+
+
+def without_rows(index, event_name, row_ids):
+    """Returns a copy of a question index with row_ids taken out of one event (the original is untouched)."""
+    used = np.asarray(row_ids, dtype=np.int64)
+    topic_rows = {topic: np.setdiff1d(rows, used, assume_unique=True) for topic, rows in index['topic_rows'][event_name].items()}
+    rows = {
+        topic: {difficulty: np.setdiff1d(ids, used, assume_unique=True) for difficulty, ids in by_difficulty.items()}
+        for topic, by_difficulty in index['rows'][event_name].items()
+    }
+    return {
+        **index,
+        'topic_rows': {**index['topic_rows'], event_name: topic_rows},
+        'rows': {**index['rows'], event_name: rows},
+        'counts': {**index['counts'], event_name: {topic: len(ids) for topic, ids in topic_rows.items()}},
+    }
+
+
+def render_exam_html(bank, sections, exam, title):
+    """Renders one exam variant as a printable page with its answer key on a separate page."""
+    parts = [EXAM_HEAD.format(title=html.escape(title))]
+    key = []
+    number = 1
+    for section_no, (section, row_ids) in enumerate(zip(sections, exam), start=1):
+        parts.append(f"<h2>Section {section_no}: {html.escape(section.event)} "
+                     f"({len(row_ids)} questions, {section.minutes:g} minutes)</h2>\n<ol start=\"{number}\">\n")
+        for row_id in row_ids:
+            question_data = bank.question(row_id)
+            parts.append(f"<li class=\"question\">{html.escape(str(question_data['question']))}")
+            if question_data['type'] == 'short-answer':
+                parts.append("<br><span class=\"blank\"></span>")
+            else:
+                options = question_data['options'] if question_data['type'] == 'multiple-choice' else ['True', 'False']
+                parts.append("<ul class=\"options\">")
+                parts.extend(f"<li>{letter}. {html.escape(option)}</li>" for letter, option in zip(string.ascii_uppercase, options))
+                parts.append("</ul>")
+            parts.append("</li>\n")
+            key.append((number, question_data['answer']))
+            number += 1
+        parts.append("</ol>\n")
+
+    parts.append(f"<div class=\"answer-key\"><h2>Answer Key: {html.escape(title)}</h2>\n<ol>\n")
+    parts.extend(f"<li value=\"{n}\">{html.escape(str(answer))}</li>\n" for n, answer in key)
+    parts.append("</ol></div>\n</body></html>\n")
+    return ''.join(parts)
+
+
+# --- Batch generation ---
+_worker_bank = None
+
+
+def _init_worker(source):
+    # Each worker loads (memory-maps, when compiled) the bank once, unless it was handed one
+    global _worker_bank
+    _worker_bank = load_bank(source) if isinstance(source, str) else source
+
+
+def _build_variant(job):
+    variant, variants, sections, seed, strategy, title = job
+    index = partition_index(_worker_bank.index, variant, variants, seed)
+    exam = build_exam(index, sections, make_rng(seed * 1_000_003 + variant), strategy)
+    variant_title = f"{title}, Version {variant + 1}"
+    shortfalls = [section.questions - len(row_ids) for section, row_ids in zip(sections, exam)]
+    return {
+        'variant': variant + 1,
+        'title': variant_title,
+        'html': render_exam_html(_worker_bank, sections, exam, variant_title),
+        'question_keys': [[int(_worker_bank.keys[row_id]) for row_id in row_ids] for row_ids in exam],
+        'shortfalls': shortfalls,
+    }
+
+
+def generate_exams(source, sections, variants, processes=None, seed=0, strategy='uniform', title="Mock Tournament"):
+    """
+    Builds `variants` non-overlapping exams, one per pool task, from a
+    QuestionBank or the bank at a path (a bank is copied into each worker).
+    Returns a list of dicts with each variant's number, title, printable
+    HTML, question keys per section, and per-section shortfalls.
+    """
+    jobs = [(variant, variants, tuple(sections), seed, strategy, title) for variant in range(variants)]
+    processes = max(1, min(processes or os.cpu_count() or 1, variants))
+    if processes == 1:
+        _init_worker(source)
+        return [_build_variant(job) for job in jobs]
+    # Spawned workers import only this module's dependencies, never the Streamlit app
+    with get_context('spawn').Pool(processes, initializer=_init_worker, initargs=(source,)) as pool:
+        return pool.map(_build_variant, jobs)
+
+
+def exams_zip(exams):
+    """Packs generated exams into a zip archive of printable HTML files."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for exam in exams:
+            archive.writestr(f"exam_{exam['variant']:03d}.html", exam['html'])
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate printable, non-overlapping mock-tournament exams.")
+    parser.add_argument('--questions', default=os.environ.get("SCIOLY_QUESTIONS_PATH", "questions_full.csv"))
+    parser.add_argument('--section', action='append', required=True, type=parse_section,
+                        help="EVENT:QUESTIONS:MINUTES[:TOPIC|TOPIC...]; repeat for each section")
+    parser.add_argument('--variants', type=int, default=1, help="How many different exams to generate")
+    parser.add_argument('--processes', type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--strategy', default='uniform')
+    parser.add_argument('--title', default="Mock Tournament")
+    parser.add_argument('-o', '--output', default="exams", help="Directory for the exam files")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    exams = generate_exams(args.questions, args.section, args.variants, args.processes, args.seed, args.strategy, args.title)
+    os.makedirs(args.output, exist_ok=True)
+    for exam in exams:
+        with open(os.path.join(args.output, f"exam_{exam['variant']:03d}.html"), 'w', encoding='utf-8') as f:
+            f.write(exam['html'])
+        for section, shortfall in zip(args.section, exam['shortfalls']):
+            if shortfall:
+                logger.warning("Version %d: %s has %d question(s) fewer than asked; the bank has too few for %d variants",
+                               exam['variant'], section.event, shortfall, args.variants)
+    logger.info("Wrote %d exam(s) to %s", len(exams), args.output)
+
+
+if __name__ == '__main__':
+    main()